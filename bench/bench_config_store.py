@@ -0,0 +1,121 @@
+# Config consistency under concurrent updates. Writer tasks update guild
+# sections, a thread serializes whatever it reads and an outside editor
+# rewrites config.json for the watcher to pick up. Every snapshot a reader
+# sees has to be whole, and the file has to match memory at the end. Then a
+# riddle is solved through on_message and checked from /current and from
+# the file, and config reads are timed against the old load_json per command.
+# Run from the repo root: python bench/bench_config_store.py
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("NLP_EXECUTOR", "inline")
+os.environ["STORAGE_BACKEND"] = "json"
+sys.path.insert(0, os.path.dirname(BENCH))
+sys.path.insert(0, BENCH)
+import bot
+from fakes import FakeDiscord, FakeInteraction
+
+WRITERS = 50
+UPDATES = 200
+GUILDS = 1000
+
+def check(snapshot, torn):
+    # Writers always set riddle_channel and ticket_display together
+    for gid, section in snapshot.guilds.items():
+        if section.riddle_channel != section.ticket_display:
+            torn.append(gid)
+    json.dumps(snapshot.to_dict())
+
+async def store_run():
+    store = bot.config = bot.ConfigStore(bot.CONFIG_FILE, {"TOPIC_MAP": {}})
+    torn, errors, notified = [], [], []
+    store.subscribe(lambda old, new: notified.append(new))
+    stop = threading.Event()
+
+    def thread_reader():
+        while not stop.is_set():
+            try:
+                check(store.snapshot, torn)
+            except RuntimeError as e:
+                errors.append(e)
+
+    async def writer(w):
+        for i in range(UPDATES):
+            gid = (w * UPDATES + i) % GUILDS + 1
+            store.update_guild(gid, riddle_channel=i, ticket_display=i)
+            await asyncio.sleep(0)
+
+    async def outside_editor():
+        # Edits config.json between flushes, the way someone with a text editor would
+        for n in range(5):
+            await asyncio.sleep(0.01)
+            # Changes the bot hasn't written yet win over an outside edit, so edit right after a flush
+            await bot.persistence.flush()
+            while bot.persistence.pending_text(bot.CONFIG_FILE) is not None:
+                await bot.persistence.flush()
+            data = json.loads(open(bot.CONFIG_FILE).read())
+            data["EDITED_OUTSIDE"] = n
+            bot.write_json_atomic(bot.CONFIG_FILE, json.dumps(data))
+            os.utime(bot.CONFIG_FILE, ns=(time.time_ns() + n + 1, time.time_ns() + n + 1))
+            assert store.reload_if_changed() and store.get("EDITED_OUTSIDE") == n
+
+    reader = threading.Thread(target=thread_reader)
+    reader.start()
+    try:
+        await asyncio.gather(*(writer(w) for w in range(WRITERS)), outside_editor())
+    finally:
+        stop.set()
+        reader.join()
+    check(store.snapshot, torn)
+    await bot.persistence.flush()
+    on_disk = json.loads(open(bot.CONFIG_FILE).read())
+    assert on_disk == store.snapshot.to_dict(), "file and memory agree"
+    assert not torn and not errors
+    print(f"ConfigStore: {WRITERS * UPDATES:,} updates, {len(notified):,} notifications, "
+          f"{store.reloads} outside edits reloaded, 0 torn reads, 0 reader errors, file matches memory")
+
+async def solve_run():
+    world = FakeDiscord()
+    channel = world.channel(100)
+    bot.bot.process_commands = lambda message: asyncio.sleep(0)
+    bot.bot.get_channel = world.get_channel
+    bot.riddle_bank = bot.RiddleBank([{"question": "What gets wetter as it dries?", "answer": "a towel"}])
+    bot.config.update_guild(1, riddle_channel=channel.id)
+    await bot.post_riddle_to(1, channel)
+    await bot.on_message(channel.post(world.user(7), "a towel"))
+
+    interaction = FakeInteraction(world, channel, world.user(8))
+    await bot.current.callback(interaction)
+    await bot.persistence.flush()
+    on_disk = json.loads(open(bot.CONFIG_FILE).read())["1"]["riddle"]
+    assert interaction.response.content == "❌ No active riddle."
+    assert bot.config.guild(1).riddle.solved_by == on_disk["solved_by"] == "player7"
+    print(f"solve:       on_message, /current and config.json all see the riddle solved by {on_disk['solved_by']}")
+
+def read_timing():
+    calls = 2000
+    start = time.perf_counter()
+    for _ in range(calls):
+        bot.read_json_file(bot.CONFIG_FILE, {}).get("1", {}).get("riddle")
+    old_us = (time.perf_counter() - start) / calls * 1e6
+    start = time.perf_counter()
+    for _ in range(calls):
+        bot.config.guild(1).riddle
+    new_us = (time.perf_counter() - start) / calls * 1e6
+    print(f"reads:       load_json {old_us:.1f} us vs config.guild() {new_us:.2f} us per lookup "
+          f"({len(bot.config.snapshot.guilds):,} guilds, {os.path.getsize(bot.CONFIG_FILE) / 1e3:.0f} KB file)")
+
+async def main():
+    os.chdir(tempfile.mkdtemp(prefix="riddlebot-config-"))
+    await store_run()
+    await solve_run()
+    read_timing()
+
+if __name__ == "__main__":
+    asyncio.run(main())
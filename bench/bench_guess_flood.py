@@ -0,0 +1,84 @@
+# 500 players guessing the riddle at the same moment, against a fake channel
+# that counts REST calls. Compares the limiter switched off (huge limits)
+# with the default limits.
+# Run from the repo root: python bench/bench_guess_flood.py [players]
+import asyncio
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("NLP_EXECUTOR", "inline")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+class FakeGuild:
+    id = 1
+
+class FakeChannel:
+    guild = FakeGuild()
+    id = 50
+
+    def __init__(self, rest):
+        self.rest = rest
+
+    async def send(self, content=None, **kwargs):
+        self.rest["send"] += 1
+
+class FakeAuthor:
+    bot = False
+
+    def __init__(self, uid):
+        self.id = uid
+        self.name = self.display_name = f"player{uid}"
+        self.mention = f"<@{uid}>"
+
+class FakeMessage:
+    def __init__(self, channel, author, content):
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+
+    async def add_reaction(self, emoji):
+        self.channel.rest["reaction"] += 1
+
+    async def reply(self, content=None, **kwargs):
+        self.channel.rest["send"] += 1
+
+async def flood(players, limiter):
+    rest = {"send": 0, "reaction": 0}
+    channel = FakeChannel(rest)
+    bot.guess_limiter = limiter
+    bot.riddle_bank = bot.RiddleBank([{"question": "What gets wetter as it dries?", "answer": "a towel"}])
+    bot.riddle_matchers.clear()
+    bot.config.replace({"1": {"riddle_channel": channel.id, "riddle": {"id": bot.riddle_bank.next(), "solved_by": None}}})
+    messages = []
+    for uid in range(players):
+        # Every player sends a burst of 1-4 guesses; one in ten is right
+        for _ in range(random.randint(1, 4)):
+            messages.append(FakeMessage(channel, FakeAuthor(uid), "a towel" if random.random() < 0.1 else random.choice(["sponge", "water", "sun"])))
+    random.shuffle(messages)
+    start = time.perf_counter()
+    await asyncio.gather(*(bot.on_message(m) for m in messages))
+    await asyncio.sleep(bot.LATE_SOLVE_WINDOW + 0.1)
+    elapsed = time.perf_counter() - start
+    return len(messages), rest, elapsed, limiter
+
+async def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    bot.bot.process_commands = lambda message: asyncio.sleep(0)
+    for label, limiter in (
+        ("no limits", bot.GuessLimiter(1e9, 1e9, 1e9, 1e9)),
+        ("default limits", bot.GuessLimiter(1 / bot.COOLDOWN, bot.GUESS_BURST, bot.CHANNEL_GUESS_RATE, bot.REACTION_RATE)),
+    ):
+        random.seed(13)
+        bot.scores.clear()
+        guesses, rest, elapsed, limiter = await flood(players, limiter)
+        assert sum(bot.scores.values()) == 1
+        print(f"{label:>14}: {guesses} guesses from {players} players in {elapsed:.1f} s -> "
+              f"{rest['send']} messages + {rest['reaction']} reactions = {rest['send'] + rest['reaction']} REST calls")
+        print(f"{'':>14}  {limiter.summary()}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+# Top-10 and "my rank" with a full sort per request (the old /leaderboard)
+# vs the incremental RankIndex (JSON backend) vs TableRanks queries on the
+# SQLite points index, at 10k, 100k and 1M players.
+# Run from the repo root: python bench/bench_leaderboard.py
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+SIZES = [10_000, 100_000, 1_000_000]
+QUERIES = 200
+INCREMENTS = 100_000
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+def sort_rank(scores, uid):
+    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    points = scores[uid]
+    return next(i for i, (_, p) in enumerate(ranked) if p == points) + 1
+
+def sqlite_ranks(scores):
+    storage = bot.SQLiteStorage(os.path.join(tempfile.mkdtemp(prefix="riddlebot-ranks-"), "riddlebot.db"))
+    storage.write_points("scores", scores)
+    open_ms, table = timed(lambda: bot.PointsTable(storage, "scores"), 1)
+    return open_ms, bot.TableRanks(table)
+
+def main():
+    random.seed(6)
+    for n in SIZES:
+        scores = {str(i): random.randint(1, 200) for i in range(n)}
+        uid = str(random.randrange(n))
+        open_ms, table_ranks = sqlite_ranks(scores)
+        table_top_ms, table_top = timed(lambda: table_ranks.top(10), QUERIES)
+        table_rank_ms, table_rank = timed(lambda: table_ranks.rank(uid), QUERIES)
+        build_ms, ranks = timed(lambda: bot.RankIndex(scores.items()), 1)
+        sort_top_ms, sort_top = timed(lambda: sorted(scores.items(), key=lambda x: x[1], reverse=True)[:10], max(1, QUERIES * 10_000 // n))
+        index_top_ms, index_top = timed(lambda: ranks.top(10), QUERIES)
+        sort_rank_ms, expected = timed(lambda: sort_rank(scores, uid), max(1, QUERIES * 10_000 // n))
+        index_rank_ms, got = timed(lambda: ranks.rank(uid), QUERIES)
+        assert [p for _, p in sort_top] == [p for _, p in index_top] == [p for _, p in table_top]
+        assert got == expected == table_rank
+
+        players = [str(random.randrange(n * 2)) for _ in range(INCREMENTS)]
+        start = time.perf_counter()
+        for player in players:
+            scores[player] = scores.get(player, 0) + 1
+            ranks.increment(player)
+        inc_us = (time.perf_counter() - start) / INCREMENTS * 1e6
+        assert [p for _, p in ranks.top(10)] == sorted(scores.values(), reverse=True)[:10]
+
+        print(f"{n:>9,} players: build {build_ms:8.1f} ms | top-10 sort {sort_top_ms:8.2f} ms vs index {index_top_ms * 1000:6.2f} us"
+              f" | rank sort {sort_rank_ms:8.2f} ms vs index {index_rank_ms * 1000:6.2f} us | +1 {inc_us:.2f} us")
+        print(f"{'':>9}  sqlite: open {open_ms:8.1f} ms | top-10 {table_top_ms * 1000:6.0f} us | rank {table_rank_ms:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Compare AnswerMatcher against nltk_similarity on synthetic riddle guesses.
+# Run from the repo root: python bench/bench_matcher.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+ANSWERS = ["an echo", "a shadow", "time", "the letter m", "a candle", "your breath", "silence"]
+FILLER = ["is", "it", "maybe", "the", "wind", "river", "darkness", "a", "clock", "idk", "lol", "footsteps"]
+
+def typo(text):
+    if not text:
+        return text
+    i = random.randrange(len(text))
+    return text[:i] + random.choice("abcdefghijklmnopqrstuvwxyz") + text[i + 1:]
+
+def synthetic_guesses(answer, n):
+    guesses = []
+    for _ in range(n):
+        roll = random.random()
+        if roll < 0.05:
+            guesses.append(answer.upper())
+        elif roll < 0.15:
+            guesses.append(typo(answer))
+        elif roll < 0.25:
+            guesses.append("is it " + answer + "?")
+        else:
+            guesses.append(" ".join(random.choices(FILLER, k=random.randint(1, 8))))
+    return guesses
+
+def run(n=10_000, threshold=1.0):
+    random.seed(1)
+    answer = random.choice(ANSWERS)
+    guesses = synthetic_guesses(answer, n)
+
+    start = time.perf_counter()
+    expected = [bot.nltk_similarity(answer, g) >= threshold for g in guesses]
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = bot.AnswerMatcher(answer, threshold)
+    got = [matcher.matches(g) for g in guesses]
+    fast = time.perf_counter() - start
+
+    assert got == expected, "matcher disagrees with nltk_similarity"
+    print(f"threshold={threshold} answer={answer!r} guesses={n} accepted={sum(got)}")
+    print(f"  nltk_similarity: {baseline * 1000:8.1f} ms  ({n / baseline:,.0f} guesses/s)")
+    print(f"  AnswerMatcher:   {fast * 1000:8.1f} ms  ({n / fast:,.0f} guesses/s)  x{baseline / fast:.1f}")
+
+if __name__ == "__main__":
+    run(threshold=1.0)
+    run(threshold=0.8)
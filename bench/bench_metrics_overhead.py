@@ -0,0 +1,148 @@
+# Cost of the instrumentation: word-game guesses through on_message with
+# METRICS=true vs METRICS=false, each in a fresh interpreter, runs taking
+# turns so drift on the machine hits both alike. First with a fake channel
+# that answers instantly, the worst case; then with every reply POSTed
+# through aiohttp to a local HTTP server, as a real guess's reply is sent to
+# Discord (minus the network wait, which costs no CPU). Whole-run differences
+# are near the noise, so the wrapper is also timed on its own and set against
+# a message with its REST call.
+# Run from the repo root: python bench/bench_metrics_overhead.py
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import bot
+
+CHILD = """
+import asyncio, json, random, string, sys, time
+import aiohttp
+sys.path.insert(0, sys.argv[1])
+import bot
+
+URL = sys.argv[2] if len(sys.argv) > 2 else None
+session = None
+
+async def rest(content):
+    if URL:
+        async with session.post(URL, json={"content": content}) as response:
+            await response.json()
+
+class Channel:
+    id = 77
+    guild = None
+    async def send(self, content=None, **kwargs):
+        await rest(content)
+
+class Author:
+    bot = False
+    id = 1
+    name = display_name = "player"
+    mention = "<@1>"
+
+class Message:
+    def __init__(self, content):
+        self.channel = Channel()
+        self.guild = None
+        self.author = Author()
+        self.content = content
+    async def reply(self, content=None, **kwargs):
+        await rest(content)
+
+async def main():
+    global session
+    session = aiohttp.ClientSession()
+    bot.bot.process_commands = lambda message: asyncio.sleep(0)
+    bot.save_game_state = lambda game: None
+    bot.word_games[77] = bot.WordGame(77, "riddlebot", cursor=bot.word_pool.cursor())
+    random.seed(14)
+    messages = [Message(random.choice(string.ascii_lowercase)) for _ in range(10_000 if URL else 50_000)]
+    start = time.perf_counter()
+    for message in messages:
+        await bot.on_message(message)
+    elapsed = time.perf_counter() - start
+    await session.close()
+    print(json.dumps({"us_per_message": elapsed / len(messages) * 1e6, "timed": bot.metrics.timings["on_message"].count}))
+
+asyncio.run(main())
+"""
+
+SERVER = """
+import sys
+from aiohttp import web
+
+async def create_message(request):
+    await request.read()
+    return web.json_response({"id": "1"})
+
+app = web.Application()
+app.router.add_post("/{path:.*}", create_message)
+web.run_app(app, host="127.0.0.1", port=int(sys.argv[1]), print=None)
+"""
+
+def run(enabled, url=None):
+    env = dict(os.environ, METRICS="true" if enabled else "false", NLP_EXECUTOR="inline")
+    out = subprocess.run([sys.executable, "-c", CHILD, ROOT, *([url] if url else [])], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def wrapper_cost(calls=200_000, runs=5):
+    # The on_message wrapper around a coroutine that does nothing, against awaiting it directly
+    async def handler(message):
+        return message
+
+    async def per_call(fn):
+        start = time.perf_counter()
+        for i in range(calls):
+            await fn(i)
+        return (time.perf_counter() - start) / calls * 1e6
+
+    timed = bot.Metrics(True).timed("on_message")(handler)
+    plain = min(asyncio.run(per_call(handler)) for _ in range(runs))
+    wrapped = min(asyncio.run(per_call(timed)) for _ in range(runs))
+    return wrapped - plain
+
+def compare(label, url=None, runs=5):
+    results = {False: [], True: []}
+    for _ in range(runs):
+        for enabled in (False, True):
+            results[enabled].append(run(enabled, url))
+    off, on = (min(results[enabled], key=lambda r: r["us_per_message"]) for enabled in (False, True))
+    added = on["us_per_message"] - off["us_per_message"]
+    overhead = added / off["us_per_message"] * 100
+    print(f"{label}")
+    print(f"  METRICS=false: {off['us_per_message']:8.2f} us/message")
+    print(f"  METRICS=true:  {on['us_per_message']:8.2f} us/message ({on['timed']} on_message samples), {added:+.2f} us ({overhead:+.1f}%)")
+    return off["us_per_message"], added
+
+def start_server():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(port)])
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}/channels/77/messages"
+
+def main():
+    compare("instant fake channel (worst case):")
+    server, url = start_server()
+    try:
+        per_message, _ = compare("replies POSTed to a local HTTP server:", url)
+    finally:
+        server.terminate()
+        server.wait()
+    cost = wrapper_cost()
+    print(f"timed() wrapper on its own: {cost:.2f} us per call, {cost / per_message * 100:.2f}% of a {per_message:.0f} us "
+          f"message with its REST call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Flood the riddle matcher through each NLP executor mode and measure how
+# long other events (ticket clicks, word-game guesses) wait for the loop.
+# Run from the repo root: python bench/bench_nlp_pool.py [guesses]
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+WORDS = ["is", "it", "an", "echo", "shadow", "maybe", "the", "wind", "clock", "footsteps", "running", "geese"]
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+async def flood(mode, guesses, answer="an echo"):
+    pool = bot.NLPWorkerPool(mode, bot.NLP_WORKERS, bot.NLP_QUEUE_SIZE, bot.NLP_BATCH_SIZE)
+    matcher = bot.AnswerMatcher(answer)
+    lags = []
+    done = asyncio.Event()
+
+    async def other_events():
+        # Stand-in for unrelated events: each one should run 2 ms after it is due
+        while not done.is_set():
+            due = time.perf_counter() + 0.002
+            await asyncio.sleep(0.002)
+            lags.append(time.perf_counter() - due)
+
+    async def guess(i, text):
+        return await pool.run(i % 4, matcher.matches, text)
+
+    watcher = asyncio.create_task(other_events())
+    start = time.perf_counter()
+    results = await asyncio.gather(*(guess(i, g) for i, g in enumerate(guesses)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await watcher
+    pool.shutdown()
+    return results, elapsed, lags
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    random.seed(2)
+    guesses = [" ".join(random.choices(WORDS, k=random.randint(1, 6))) for _ in range(n)]
+    expected = None
+    for mode in ("inline", "thread", "process"):
+        results, elapsed, lags = asyncio.run(flood(mode, guesses))
+        if expected is None:
+            expected = results
+        assert results == expected, f"{mode} results differ from inline"
+        lags = lags or [0.0]
+        print(
+            f"{mode:8} {n / elapsed:9,.0f} guesses/s  event lag p50={statistics.median(lags) * 1000:6.2f} ms"
+            f"  p99={percentile(lags, 99) * 1000:7.2f} ms  max={max(lags) * 1000:7.2f} ms  samples={len(lags)}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Writes per second for a burst of 1,000 riddle guesses: the old synchronous
+# save_json (every mutation rewrites the file) vs the write-behind layer.
+# Run from the repo root: python bench/bench_persistence.py
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+GUESSES = 1_000
+PLAYERS = 5_000
+
+def old_save_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def burst(save, scores, config, riddles):
+    # Same saves on_message does for a correct answer
+    for i in range(GUESSES):
+        uid = str(i % PLAYERS)
+        config["CURRENT_RIDDLE"] = {"question": "q", "answer": "a", "solved_by": uid}
+        save("config.json", config)
+        scores[uid] = scores.get(uid, 0) + 1
+        save("scores.json", scores)
+        save("riddles.json", riddles)
+        config["CURRENT_RIDDLE"] = None
+        save("config.json", config)
+
+def fixtures():
+    scores = {str(i): i % 50 for i in range(PLAYERS)}
+    riddles = [{"question": f"Riddle {i}?", "answer": f"answer {i}"} for i in range(500)]
+    return scores, {}, riddles
+
+async def write_behind(tmp):
+    manager = bot.PersistenceManager()
+    scores, config, riddles = fixtures()
+    start = time.perf_counter()
+    burst(lambda p, d: manager.mark_dirty(os.path.join(tmp, p), d), scores, config, riddles)
+    loop_time = time.perf_counter() - start
+    await manager.flush()
+    total = time.perf_counter() - start
+    with open(os.path.join(tmp, "scores.json")) as f:
+        assert json.load(f) == scores
+    return loop_time, total, manager.stats()
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        scores, config, riddles = fixtures()
+        start = time.perf_counter()
+        burst(lambda p, d: old_save_json(os.path.join(tmp, p), d), scores, config, riddles)
+        sync_time = time.perf_counter() - start
+        sync_writes = GUESSES * 4
+        print(f"sync save_json:  {sync_writes} writes in {sync_time * 1000:8.1f} ms on the loop ({sync_writes / sync_time:,.0f} writes/s)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        loop_time, total, stats = asyncio.run(write_behind(tmp))
+        print(f"write-behind:    {stats['writes']} writes, {loop_time * 1000:8.1f} ms on the loop, {total * 1000:.1f} ms incl. flush")
+        print(f"                 {stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Posting and solving riddles with a 100k-riddle bank: the old random.choice
+# plus list rebuild on every solve vs RiddleBank's rotation. Then a whole
+# rotation cycle with riddles added and deleted along the way and a restart
+# from the saved rotation state halfway, which must post every riddle once.
+# Run from the repo root: python bench/bench_riddle_bank.py [riddles]
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+ROUNDS = 1_000
+
+def fixtures(count):
+    return [{"question": f"Riddle number {i}?", "answer": f"answer {i}"} for i in range(count)]
+
+def old_rounds(riddles):
+    posted = []
+    for _ in range(ROUNDS):
+        riddle = random.choice(riddles)
+        posted.append(riddle["question"])
+        riddles = [r for r in riddles if r.get("question") != riddle.get("question")]
+    return posted
+
+def new_rounds(bank):
+    posted = []
+    for _ in range(ROUNDS):
+        rid = bank.next()
+        posted.append(bank.get(rid)["question"])
+        bank.remove(rid)
+    return posted
+
+def cycle_check(count):
+    bank = bot.RiddleBank(fixtures(count))
+    original = set(bank.by_id)
+    posted = [bank.next() for _ in range(count // 2)]
+    state = json.dumps(bank.rotation_state())
+    bank = bot.RiddleBank(bank.to_list(), json.loads(state))
+    deleted = set(bank.rotation[:100])
+    for rid in deleted:
+        bank.remove(rid)
+    added = {bank.add({"question": f"New riddle {i}?", "answer": "new"})["id"] for i in range(100)}
+    while bank.rotation:
+        posted.append(bank.next())
+    assert len(posted) == len(set(posted)), "no riddle twice in a cycle"
+    assert set(posted) - added == original - deleted, "every riddle posted once"
+    print(f"  one cycle across a restart: {len(posted):,} posted, no repeats, "
+          f"{len(added & set(posted))}/100 added mid-cycle came up; rotation state {len(state)} bytes")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(12)
+
+    start = time.perf_counter()
+    old = old_rounds(fixtures(count))
+    old_ms = (time.perf_counter() - start) * 1000
+
+    riddles = fixtures(count)
+    start = time.perf_counter()
+    bank = bot.RiddleBank(riddles)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    new = new_rounds(bank)
+    new_ms = (time.perf_counter() - start) * 1000
+
+    assert len(set(old)) == len(set(new)) == ROUNDS and len(bank) == count - ROUNDS
+    print(f"{count:,} riddles, {ROUNDS:,} post+solve rounds")
+    print(f"  random.choice + rebuild: {old_ms:9.1f} ms ({old_ms / ROUNDS * 1000:8.1f} us/round)")
+    print(f"  RiddleBank:              {new_ms:9.1f} ms ({new_ms / ROUNDS * 1000:8.1f} us/round), built in {build_ms:.0f} ms at startup")
+    cycle_check(min(count, 20_000))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# Bulk riddle management with a big bank. Streams a 50k-line JSONL file
+# (with duplicates and broken lines mixed in) through import_riddles while
+# a ticker measures how long the event loop is held up, imports the same
+# riddles as a one-line .json array in chunks, then times /delriddle
+# autocomplete lookups and compares saving one new riddle by appending to the
+# journal with rewriting riddles.json.
+# Run from the repo root: python bench/bench_riddle_import.py [riddles]
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ["STORAGE_BACKEND"] = "json"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+WORDS = ("what has keys but can't open locks river bank mirror shadow echo candle "
+         "clock needle towel egg stamp piano map footsteps silence cold breath").split()
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1e6
+
+def write_fixture(path, count):
+    rng = random.Random(18)
+    questions = []
+    with open(path, "w") as f:
+        for i in range(count):
+            if questions and i % 20 == 0:
+                # Same riddle again, with different case and spacing
+                question = "  " + rng.choice(questions).upper()
+            elif i % 97 == 0:
+                f.write("{not json\n")
+                continue
+            else:
+                question = " ".join(rng.choices(WORDS, k=6)) + f" no. {i}?"
+                questions.append(question)
+            f.write(json.dumps({"question": question, "answer": f"answer {i}"}) + "\n")
+    return questions
+
+async def file_lines(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line
+
+async def file_chunks(path, size=64 * 1024):
+    with open(path, encoding="utf-8") as f:
+        while chunk := f.read(size):
+            yield chunk
+
+async def text_chunks(text, size=7):
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+def write_array(path, jsonl):
+    # The same riddles as one JSON array on a single line, broken lines as plain strings
+    items = []
+    with open(jsonl) as f:
+        for line in f:
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(line.strip())
+    with open(path, "w") as f:
+        json.dump(items, f)
+
+async def array_run(path, expected):
+    start = time.perf_counter()
+    counts = await bot.import_riddles(bot.RiddleBank([]), bot.json_array_items(file_chunks(path)), "json")
+    elapsed = time.perf_counter() - start
+    assert counts == expected, f"{dict(counts)} from the array vs {dict(expected)} from JSONL"
+    for broken in ('[{"question": "a", "answer": "b"}', '{"question": "a"}', '[1 2]'):
+        try:
+            await bot.import_riddles(bot.RiddleBank([]), bot.json_array_items(text_chunks(broken)), "json")
+        except ValueError:
+            continue
+        raise AssertionError(f"{broken!r} should not import cleanly")
+    print(f"json array:   same counts as JSONL in {elapsed:.2f} s ({os.path.getsize(path) / 1e6:.1f} MB on one line)")
+
+async def import_run(path):
+    stalls = []
+
+    async def ticker():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0)
+            stalls.append(time.perf_counter() - start)
+
+    bank = bot.RiddleBank([])
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    counts = await bot.import_riddles(bank, file_lines(path), "jsonl")
+    elapsed = time.perf_counter() - start
+    tick.cancel()
+
+    # Memory on a second pass, since tracemalloc slows everything down
+    tracemalloc.start()
+    await bot.import_riddles(bot.RiddleBank([]), file_lines(path), "jsonl")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"import:       {counts['added']:,} added, {counts['duplicates']:,} duplicates, {counts['invalid']:,} invalid "
+          f"in {elapsed:.2f} s, longest loop stall {max(stalls) * 1000:.1f} ms, "
+          f"peak {peak / 1e6:.1f} MB traced ({os.path.getsize(path) / 1e6:.1f} MB file)")
+    return bank, counts
+
+def autocomplete_run(bank, questions):
+    rng = random.Random(3)
+    queries = []
+    for _ in range(2000):
+        words = rng.choice(questions).split()
+        typed = " ".join(words[:rng.randint(1, 3)])
+        queries.append(typed[:rng.randint(2, len(typed))])
+    build = time.perf_counter()
+    bank.search("x")
+    build = time.perf_counter() - build
+    times, hits = [], 0
+    for query in queries:
+        t = time.perf_counter()
+        hits += bool(bank.search(query, 25))
+        times.append(time.perf_counter() - t)
+    old = []
+    for query in queries[:50]:
+        t = time.perf_counter()
+        [r for r in bank.to_list() if query.lower() in r["question"].lower()][:25]
+        old.append(time.perf_counter() - t)
+    print(f"autocomplete: index built in {build * 1000:.0f} ms, p50 {percentile(times, 50):.0f} / "
+          f"p99 {percentile(times, 99):.0f} us per lookup ({hits}/{len(queries)} with results); "
+          f"scanning the bank p50 {percentile(old, 50):.0f} us")
+
+def save_run(bank):
+    bank.rewrite = True
+    payload = bank.take_changes()
+    start = time.perf_counter()
+    bot.write_riddles(*payload[:2])
+    full_ms = (time.perf_counter() - start) * 1000
+    bank.changes_written(payload)
+
+    times = []
+    for i in range(200):
+        bank.add({"question": f"Brand new riddle {i}?", "answer": "yes"})
+        payload = bank.take_changes()
+        start = time.perf_counter()
+        bot.write_riddles(*payload[:2])
+        times.append(time.perf_counter() - start)
+        bank.changes_written(payload)
+    reloaded, journaled = bot.read_riddle_files()
+    assert len(reloaded) == len(bank) and journaled == 200, "journal replays on top of riddles.json"
+    print(f"save:         rewriting riddles.json {full_ms:.0f} ms ({os.path.getsize(bot.RIDDLES_FILE) / 1e6:.1f} MB) "
+          f"vs one journal append p50 {percentile(times, 50) / 1000:.2f} ms; reload sees all {len(reloaded):,}")
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    os.chdir(tempfile.mkdtemp(prefix="riddlebot-import-"))
+    questions = write_fixture("riddles.jsonl", count)
+    bank, counts = await import_run("riddles.jsonl")
+    assert counts["added"] == len(questions) == len(bank)
+    write_array("riddles.json", "riddles.jsonl")
+    await array_run("riddles.json", counts)
+    autocomplete_run(bank, questions)
+    save_run(bank)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+# /scoreboard reply latency with a stubbed Discord HTTP client: the old serial
+# fetch_user loop vs NameResolver, with cold and warm caches.
+# Run from the repo root: python bench/bench_scoreboard_names.py
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+REST_LATENCY = 0.25  # seconds per fetch_user round-trip
+
+class FakeUser:
+    def __init__(self, uid):
+        self.id = uid
+        self.name = f"player{uid}"
+
+class FakeHTTPClient:
+    # Empty gateway cache; every lookup goes to "REST"
+    def __init__(self):
+        self.calls = 0
+
+    def get_user(self, uid):
+        return None
+
+    async def fetch_user(self, uid):
+        self.calls += 1
+        await asyncio.sleep(REST_LATENCY)
+        return FakeUser(uid)
+
+class FakeResponse:
+    def __init__(self, inter):
+        self.inter = inter
+        self.deferred = False
+
+    def is_done(self):
+        return self.deferred or self.inter.content is not None
+
+    async def defer(self, thinking=False):
+        self.deferred = True
+        self.inter.first_reply = time.perf_counter()
+
+    async def send_message(self, content):
+        self.inter.content = content
+        self.inter.first_reply = time.perf_counter()
+
+class FakeFollowup:
+    def __init__(self, inter):
+        self.inter = inter
+
+    async def send(self, content):
+        self.inter.content = content
+
+class FakeInteraction:
+    guild = None
+
+    def __init__(self):
+        self.content = None
+        self.first_reply = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+async def old_scoreboard(client, inter):
+    lines = []
+    for i, (uid, score) in enumerate(bot.scoreboard_ranks.top(10), 1):
+        user = await client.fetch_user(int(uid))
+        lines.append(f"{i}. {user.name}: {score}")
+    await inter.response.send_message("🏆 **Top Word Guessers:**\n" + "\n".join(lines))
+
+async def timed(run):
+    inter = FakeInteraction()
+    start = time.perf_counter()
+    await run(inter)
+    return inter, (inter.first_reply - start) * 1000, (time.perf_counter() - start) * 1000
+
+async def main():
+    bot.scoreboard = {str(i): 100 - i for i in range(1, 51)}
+    bot.scoreboard_ranks = bot.RankIndex(bot.scoreboard.items())
+
+    client = FakeHTTPClient()
+    old, first_ms, total_ms = await timed(lambda inter: old_scoreboard(client, inter))
+    print(f"serial fetch_user:    first reply {first_ms:7.1f} ms, done {total_ms:7.1f} ms, {client.calls} REST calls")
+
+    client = FakeHTTPClient()
+    bot.name_resolver = bot.NameResolver(client, ttl=600, concurrency=5)
+    for label in ("resolver, cold cache:", "resolver, warm cache:"):
+        calls = client.calls
+        new, first_ms, total_ms = await timed(bot.scoreboard_command.callback)
+        assert new.content == old.content
+        deferred = " (deferred)" if new.response.deferred else ""
+        print(f"{label:22s}first reply {first_ms:7.1f} ms, done {total_ms:7.1f} ms, {client.calls - calls} REST calls{deferred}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+# Import time and first-guess latency for each NLP_PRELOAD mode. Each mode
+# runs in a fresh interpreter so nothing is already imported or cached.
+# eager sets NLTK up while bot.py is imported, like the old code did.
+# Run from the repo root: python bench/bench_startup.py
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, threading, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import bot
+imported = time.perf_counter()
+warm_ms = None
+if bot.NLP_PRELOAD == "background":
+    # What on_ready does: warm in a thread, the guess comes in once it's done
+    worker = threading.Thread(target=bot.warm_normalize_cache, args=([{"answer": "an echo"}],))
+    worker.start()
+    worker.join()
+    warm_ms = (time.perf_counter() - imported) * 1000
+guess_start = time.perf_counter()
+bot.AnswerMatcher("the letter m").matches("is it the letters m?")
+guess_ms = (time.perf_counter() - guess_start) * 1000
+print(json.dumps({"import_ms": (imported - start) * 1000, "phases": bot.startup.report(),
+                  "warm_ms": warm_ms, "guess_ms": guess_ms}))
+"""
+
+def run(mode):
+    env = dict(os.environ, NLP_PRELOAD=mode)
+    out = subprocess.run([sys.executable, "-c", CHILD, ROOT], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    for mode in ("eager", "background", "lazy"):
+        result = run(mode)
+        warm = f", background warm {result['warm_ms']:.0f} ms" if result["warm_ms"] is not None else ""
+        print(f"{mode:>10}: import {result['import_ms']:7.0f} ms{warm}, first guess {result['guess_ms']:7.1f} ms")
+        print(f"{'':>10}  {result['phases']}")
+
+if __name__ == "__main__":
+    main()
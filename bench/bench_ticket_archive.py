@@ -0,0 +1,165 @@
+# The closed-ticket archive with a few years' worth of tickets. Saves 20k
+# synthetic transcripts (mostly short, a few very long) and reports throughput,
+# compression and database size; times /searchtickets lookups by word, author,
+# month and combinations, first page and deeper pages, and checks word and
+# author counts against a scan of every transcript; then closes a big ticket
+# through ClaimView with the archive off and on, measuring how long the close
+# takes and the longest event-loop stall.
+# Run from the repo root: python bench/bench_ticket_archive.py [tickets]
+import asyncio
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import types
+import zlib
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH))
+sys.path.insert(0, BENCH)
+import bot
+from fakes import FakeDiscord, FakeInteraction
+
+GUILD = 1
+AUTHORS = [f"player{n}" for n in range(500)] + ["Support Staff", "Mod Team"]
+TOPICS = ["Account questions", "Event information"]
+WORDS = ("hello thanks login password reset email account banned appeal event prize reward schedule tournament "
+         "missing items refund purchase error crash lag server verify code linked discord twitch stream").split()
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000
+
+def tickets(count):
+    rng = random.Random(21)
+    for n in range(count):
+        authors = rng.sample(AUTHORS[:-2], rng.randint(1, 3)) + [rng.choice(AUTHORS[-2:])]
+        # Most tickets are a short exchange; one in 500 is a long-running one
+        messages = rng.randint(2000, 6000) if n % 500 == 0 else rng.randint(4, 60)
+        day = 1 + n * 3 * 365 // count
+        closed_at = f"{2023 + (day - 1) // 365}-{1 + (day - 1) % 365 // 31:02d}-{1 + (day - 1) % 31:02d}T12:00:00"
+        channel = types.SimpleNamespace(name=f"ticket-{authors[0]}", topic=rng.choice(TOPICS))
+        ticket = bot.ArchivedTicket(GUILD, channel, authors[-1])
+        ticket.closed_at = closed_at
+        for i in range(messages):
+            author = types.SimpleNamespace(display_name=rng.choice(authors))
+            text = " ".join(rng.choices(WORDS, k=rng.randint(3, 25)))
+            if rng.random() < 0.05:
+                text += f" order #A{rng.randrange(100_000)}"
+            ticket.add(types.SimpleNamespace(author=author), f"[{closed_at[:10]} 12:{i % 60:02d}] {author.display_name}: {text}\n")
+        yield ticket
+
+def archive_run(archive, count):
+    start = time.perf_counter()
+    for ticket in tickets(count):
+        archive.save(ticket)
+    elapsed = time.perf_counter() - start
+    raw, stored = archive.conn.execute("SELECT SUM(size), SUM(LENGTH(transcript)) FROM tickets").fetchone()
+    archive.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db = os.path.getsize(archive.path)
+    print(f"archive:  {count:,} tickets in {elapsed:.1f} s ({count / elapsed:,.0f} tickets/s, {raw / 1e6 / elapsed:.1f} MB/s); "
+          f"{raw / 1e6:.0f} MB of text stored as {stored / 1e6:.0f} MB ({raw / stored:.1f}x), "
+          f"database {db / 1e6:.0f} MB with the index")
+
+def scan(archive):
+    # Every ticket's authors and words, straight from the compressed transcripts
+    tickets = {}
+    for tid, authors, blob in archive.conn.execute("SELECT id, authors, transcript FROM tickets WHERE guild_id = ?", (GUILD,)):
+        text = zlib.decompress(blob).decode().lower()
+        tickets[tid] = (authors.lower().split(", "), set(re.findall(r"\w+", text)))
+    return tickets
+
+def search_run(archive):
+    rng = random.Random(4)
+    orders = [f"a{rng.randrange(100_000)}" for _ in range(200)]
+    queries = {
+        "rare word": [dict(query=order) for order in orders],
+        "common word": [dict(query=rng.choice(WORDS)) for _ in range(200)],
+        "two words": [dict(query=" ".join(rng.sample(WORDS, 2))) for _ in range(200)],
+        "author": [dict(author=rng.choice(AUTHORS[:-2])) for _ in range(200)],
+        "month": [dict(date=f"{rng.randint(2023, 2025)}-{rng.randint(1, 12):02d}") for _ in range(200)],
+        "word + month": [dict(query=rng.choice(WORDS), date=f"{rng.randint(2023, 2025)}-{rng.randint(1, 12):02d}")
+                         for _ in range(200)],
+        "word, page 20": [dict(query=rng.choice(WORDS), page=20) for _ in range(200)],
+    }
+    for name, searches in queries.items():
+        times = []
+        for search in searches:
+            start = time.perf_counter()
+            total, rows = archive.search(GUILD, **search)
+            times.append(time.perf_counter() - start)
+        print(f"search:   {name:<14} p50 {percentile(times, 50):6.2f} / p99 {percentile(times, 99):6.2f} ms "
+              f"(last: {total:,} matches)")
+
+    scanned = scan(archive)
+    for order in orders[:20]:
+        expected = sum(order in words for _, words in scanned.values())
+        assert archive.search(GUILD, query=order)[0] == expected, f"count for {order}"
+    for author in AUTHORS[:20]:
+        expected = sum(author.lower() in authors for authors, _ in scanned.values())
+        assert archive.search(GUILD, author=author)[0] == expected, f"count for {author}"
+    total, rows = archive.search(GUILD, query=orders[0])
+    assert all(orders[0] in row[-1].lower() for row in rows), "each result shows a matching line"
+    print(f"search:   word and author counts match a scan of all {len(scanned):,} transcripts")
+
+async def close_run(archived, messages):
+    bot.ticket_archive = bot.TicketArchive("close.db") if archived else None
+    bot.TICKET_CLOSE_DELAY = 0
+    world = FakeDiscord()
+    guild = world.guild(GUILD)
+    channel = world.channel(500 + archived, GUILD)
+    channel.topic = "Account questions"
+    rng = random.Random(messages)
+    for i in range(messages):
+        channel.post(world.user(rng.randrange(3)), " ".join(rng.choices(WORDS, k=rng.randint(3, 25))))
+    history = channel.history
+
+    async def paged_history(**kwargs):
+        # One await per 100 messages, like the paged API
+        n = 0
+        async for message in history(**kwargs):
+            n += 1
+            if n % 100 == 0:
+                await asyncio.sleep(0)
+            yield message
+
+    channel.history = paged_history
+    close = next(item.callback for item in bot.ClaimView().children if item.custom_id == "close_ticket")
+    interaction = FakeInteraction(world, channel, world.user(99, guild))
+
+    stalls = []
+
+    async def ticker():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0)
+            stalls.append(time.perf_counter() - start)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await close(interaction)
+    closed = time.perf_counter() - start
+    if archived:
+        await asyncio.gather(*bot.ticket_archive.saving)
+    saved = time.perf_counter() - start
+    tick.cancel()
+    if archived:
+        assert bot.ticket_archive.search(GUILD, author="player1")[0] == 1
+    print(f"close:    archive {'on ' if archived else 'off'} {messages:,} messages: closed in {closed * 1000:.0f} ms"
+          + (f", archived after {saved * 1000:.0f} ms" if archived else "")
+          + f", longest loop stall {max(stalls) * 1000:.1f} ms")
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    os.chdir(tempfile.mkdtemp(prefix="riddlebot-archive-"))
+    archive = bot.TicketArchive("tickets.db")
+    archive_run(archive, count)
+    search_run(archive)
+    for archived in (False, True):
+        await close_run(archived, 50_000)
+
+if __name__ == "__main__":
+    asyncio.run(main())
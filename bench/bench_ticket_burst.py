@@ -0,0 +1,83 @@
+# 200 users pressing a ticket button at the same moment, against a fake guild
+# where every REST call takes 50 ms. Compares the old create_ticket with
+# TicketService, without and with a pool of spare channels, and checks that
+# there is one "Tickets" category and exactly one channel per user. With
+# spares, the create_channel calls are the pool refilling in the background.
+# Run from the repo root: python bench/bench_ticket_burst.py [users]
+import asyncio
+import os
+import sys
+import time
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH))
+sys.path.insert(0, BENCH)
+import bot
+from fakes import FakeDiscord, FakeInteraction
+
+REST_LATENCY = 0.05
+
+async def old_create_ticket(interaction, topic):
+    role_id = bot.config.get("TOPIC_MAP", {}).get(topic.replace(" ", "_"))
+    guild = interaction.guild
+    overwrites = {
+        guild.default_role: bot.discord.PermissionOverwrite(view_channel=False),
+        interaction.user: bot.discord.PermissionOverwrite(view_channel=True, send_messages=True),
+        guild.me: bot.discord.PermissionOverwrite(view_channel=True)
+    }
+    if role_id:
+        role = guild.get_role(role_id)
+        if role:
+            overwrites[role] = bot.discord.PermissionOverwrite(view_channel=True)
+    category = bot.discord.utils.get(guild.categories, name="Tickets") or await guild.create_category("Tickets")
+    channel = await category.create_text_channel(name=f"ticket-{interaction.user.name}", overwrites=overwrites)
+    await channel.send(f"{interaction.user.mention}, your ticket has been created.", view=bot.ClaimView())
+    await interaction.response.send_message(f"✅ Created ticket: {channel.mention}", ephemeral=True)
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000
+
+async def burst(label, users, create, spares=0):
+    world = FakeDiscord(REST_LATENCY)
+    guild = world.guild(1)
+    panel = world.channel(300)
+    bot.tickets = bot.TicketService(spares)
+    if spares:
+        bot.tickets.refill(guild)
+        await bot.tickets.refills[guild.id]
+        world.rest_calls.clear()
+    interactions = [FakeInteraction(world, panel, world.user(uid, guild)) for uid in range(1000, 1000 + users)]
+    done = {}
+
+    async def click(interaction):
+        await create(interaction, "account questions")
+        done[interaction.user.id] = time.perf_counter()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(click(i) for i in interactions))
+    elapsed = time.perf_counter() - start
+    if spares:
+        await asyncio.gather(*bot.tickets.refills.values())
+
+    tickets = [c for c in world.channels.values() if c.name.startswith("ticket-")]
+    assert len({c.name for c in tickets}) == len(tickets) == users, "one channel per user"
+    assert all(i.response.is_done() for i in interactions), "every click answered"
+    ack = [i.response.responded_at - start for i in interactions]
+    ready = [t - start for t in done.values()]
+    print(f"{label:>16}: {len(guild.categories)} categories, {len(tickets)} tickets in {elapsed:.2f} s, "
+          f"answered p50 {percentile(ack, 50):.0f} / p99 {percentile(ack, 99):.0f} ms, "
+          f"ticket ready p50 {percentile(ready, 50):.0f} / p99 {percentile(ready, 99):.0f} ms")
+    print(f"{'':>16}  REST: " + ", ".join(f"{kind} {n}" for kind, n in sorted(world.rest_calls.items())))
+    return len(guild.categories)
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    panel = bot.TicketPanelView()
+    new_create = panel.create_ticket
+    await burst("old", users, old_create_ticket)
+    assert await burst("TicketService", users, new_create) == 1
+    assert await burst(f"+{users} spares", users, new_create, spares=users) == 1
+
+if __name__ == "__main__":
+    asyncio.run(main())
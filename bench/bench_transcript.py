@@ -0,0 +1,89 @@
+# Peak memory of ticket transcript export for a fake 100k-message history:
+# the old list + join + StringIO vs the streaming TranscriptWriter.
+# Each mode runs in its own process so peak RSS isn't shared between them.
+# The streaming modes must stay within STREAM_RSS_LIMIT_MB of the process's
+# RSS before the export, however long the history.
+# Run from the repo root: python bench/bench_transcript.py [messages]
+import asyncio
+import datetime
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+STREAM_RSS_LIMIT_MB = 8
+
+class FakeAuthor:
+    display_name = "player"
+
+class FakeAttachment:
+    filename = "screenshot.png"
+    url = "https://cdn.discordapp.com/attachments/1/2/screenshot.png"
+
+class FakeMessage:
+    author = FakeAuthor()
+
+    def __init__(self, i):
+        self.created_at = datetime.datetime(2025, 1, 1) + datetime.timedelta(seconds=i)
+        self.content = f"message {i}: " + "lorem ipsum dolor sit amet " * 6
+        self.attachments = [FakeAttachment()] if i % 50 == 0 else []
+        self.embeds = []
+
+class FakeChannel:
+    name = "ticket-player"
+
+    def __init__(self, count):
+        self.count = count
+
+    async def history(self, limit=None, oldest_first=True):
+        # Messages are created as they are consumed, like the paged API
+        for i in range(self.count):
+            yield FakeMessage(i)
+
+async def old_export(channel):
+    transcript = []
+    async for message in channel.history(limit=None, oldest_first=True):
+        timestamp = message.created_at.strftime('%Y-%m-%d %H:%M')
+        transcript.append(f"[{timestamp}] {message.author.display_name}: {message.content}")
+    transcript_text = "\n".join(transcript) or "(No messages in ticket)"
+    return [bot.discord.File(fp=io.StringIO(transcript_text), filename=f"transcript-{channel.name}.txt")]
+
+def child(mode, count):
+    channel = FakeChannel(count)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "old":
+        files = asyncio.run(old_export(channel))
+    else:
+        bot.TRANSCRIPT_GZIP = mode == "gzip"
+        files = asyncio.run(bot.build_transcript(channel))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss
+    size = 0
+    for f in files:
+        f.fp.seek(0, os.SEEK_END)
+        size += f.fp.tell()
+        f.close()
+    print(f"{mode:>6}: {elapsed * 1000:7.0f} ms, {len(files)} file(s), {size / 1e6:6.1f} MB out, "
+          f"peak traced {peak / 1e6:6.1f} MB, peak RSS +{rss / 1024:6.1f} MB")
+    assert mode == "old" or rss / 1024 < STREAM_RSS_LIMIT_MB, f"{mode} export grew RSS by {rss / 1024:.1f} MB"
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for mode in ("old", "stream", "gzip"):
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, str(count)], check=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
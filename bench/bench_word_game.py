@@ -0,0 +1,69 @@
+# Letter guesses across hundreds of concurrent word games: the old
+# list-scan + full display rebuild vs per-channel WordGame objects.
+# Run from the repo root: python bench/bench_word_game.py [games]
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+GUESSES = 200_000
+WORDS = ["".join(random.choices(string.ascii_lowercase, k=random.randint(4, 24))) for _ in range(2_000)]
+
+def old_display(word, guessed):
+    return ' '.join([c if c.lower() in guessed or not c.isalpha() else '\\_' for c in word])
+
+def old_guess(state, letter):
+    # The single-game hot path from on_message, per game
+    if letter in state["guessed"]:
+        return state["display"]
+    state["guessed"].append(letter)
+    if letter in state["word"].lower():
+        state["display"] = old_display(state["word"], state["guessed"])
+        if '\\_' not in state["display"]:
+            state.update(word=random.choice(WORDS), guessed=[], attempts=15)
+            state["display"] = old_display(state["word"], state["guessed"])
+    else:
+        state["attempts"] -= 1
+        if state["attempts"] <= 0:
+            state.update(word=random.choice(WORDS), guessed=[], attempts=15)
+            state["display"] = old_display(state["word"], state["guessed"])
+    return state["display"]
+
+def new_guess(game, letter):
+    hit = game.guess_letter(letter)
+    if hit is None:
+        return game.display
+    if (hit and game.solved) or game.attempts <= 0:
+        game.new_word(random.choice(WORDS))
+    return game.display
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    random.seed(9)
+    traffic = [(random.randrange(games), random.choice(string.ascii_lowercase)) for _ in range(GUESSES)]
+
+    random.seed(1)
+    old_games = {}
+    for cid in range(games):
+        word = random.choice(WORDS)
+        old_games[cid] = {"word": word, "guessed": [], "attempts": 15, "display": old_display(word, [])}
+    start = time.perf_counter()
+    old_out = [old_guess(old_games[cid], letter) for cid, letter in traffic]
+    old_s = time.perf_counter() - start
+
+    random.seed(1)
+    registry = {cid: bot.WordGame(cid, random.choice(WORDS)) for cid in range(games)}
+    start = time.perf_counter()
+    new_out = [new_guess(registry[cid], letter) for cid, letter in traffic]
+    new_s = time.perf_counter() - start
+
+    assert old_out == new_out
+    for label, elapsed in (("old globals", old_s), ("WordGame", new_s)):
+        print(f"{label:>11}: {GUESSES:,} guesses over {games} games in {elapsed * 1000:7.1f} ms ({elapsed / GUESSES * 1e6:.2f} us/guess)")
+
+if __name__ == "__main__":
+    main()
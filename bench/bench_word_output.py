@@ -0,0 +1,93 @@
+# 1,000 word-game guesses from 50 players in one minute, sent through
+# on_message against a fake channel: per-guess replies vs WORD_GAME_OUTPUT=live,
+# where one status message is edited at most every WORD_GAME_EDIT_INTERVAL
+# seconds. Both modes see the same guesses, so the games and the scoreboard
+# have to end up identical. The minute is squeezed into a few seconds, with
+# the edit interval and reaction rate scaled to match.
+# Run from the repo root: python bench/bench_word_output.py [seconds]
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+os.environ["STORAGE_BACKEND"] = "json"
+sys.path.insert(0, os.path.dirname(BENCH))
+sys.path.insert(0, BENCH)
+import bot
+from fakes import FakeDiscord
+
+GUESSES = 1000
+PLAYERS = 50
+WORDS = ["riddle", "lantern", "whisper", "compass", "harbor", "quilt", "meadow", "puzzle",
+         "thunder", "orchard", "saddle", "glacier", "mirror", "velvet", "cobweb", "falcon"]
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+
+class Cursor:
+    difficulty = None
+
+    def __init__(self):
+        self.n = 0
+
+    def next(self):
+        self.n += 1
+        return WORDS[(self.n - 1) % len(WORDS)]
+
+    def state(self):
+        return {"n": self.n}
+
+def guesses(seed):
+    rng = random.Random(seed)
+    weights = [len(LETTERS) - i for i in range(len(LETTERS))]
+    for _ in range(GUESSES):
+        # None stands for "the whole current word"
+        word = rng.random() < 0.03
+        yield rng.randrange(PLAYERS), None if word else rng.choices(LETTERS, weights)[0]
+
+async def run(mode, seconds):
+    world = FakeDiscord()
+    channel = world.channel(200)
+    bot.bot.get_channel = world.get_channel
+    bot.bot.process_commands = lambda message: asyncio.sleep(0)
+    bot.WORD_GAME_OUTPUT = mode
+    bot.WORD_GAME_EDIT_INTERVAL = 2 * seconds / 60
+    bot.guess_limiter = bot.GuessLimiter(1 / bot.COOLDOWN, bot.GUESS_BURST, bot.CHANNEL_GUESS_RATE,
+                                         bot.REACTION_RATE * 60 / seconds)
+    bot.scoreboard = {}
+    bot.scoreboard_ranks = bot.RankIndex.from_table({})
+    game = bot.word_games[channel.id] = bot.WordGame(channel.id, "", cursor=Cursor())
+    game.next_word()
+
+    handlers = []
+    for uid, letter in guesses(19):
+        content = game.word.upper() if letter is None else letter
+        handlers.append(asyncio.create_task(bot.on_message(channel.post(world.user(uid), content))))
+        await asyncio.sleep(seconds / GUESSES)
+    await asyncio.gather(*handlers)
+    if game.status:
+        while game.status.task and not game.status.task.done():
+            await game.status.task
+        shown = channel.get_partial_message(game.status.message_id).content
+        assert shown == game.status.render(), "status message shows the final state"
+    state = game.to_dict()
+    state.pop("status_message_id")
+    calls = sum(world.rest_calls.values())
+    print(f"{mode:>8}: {calls:5} REST calls ({', '.join(f'{k} {n}' for k, n in sorted(world.rest_calls.items()))}), "
+          f"{game.cursor.n - 1} words finished, {sum(bot.scoreboard.values())} points")
+    return state, dict(bot.scoreboard), calls
+
+async def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 6
+    os.chdir(tempfile.mkdtemp(prefix="riddlebot-words-"))
+    os.makedirs(bot.GAMESTATE_DIR, exist_ok=True)
+    replies = await run("replies", seconds)
+    live = await run("live", seconds)
+    assert replies[:2] == live[:2], "same game state and scoreboard in both modes"
+    # At most one send plus one edit per interval, and the rate-limited 🎉 reactions
+    assert live[2] <= 1 + 60 / 2 + 1 + bot.REACTION_RATE * 60
+    print(f"{GUESSES:,} guesses: game state and scoreboard identical; live mode used "
+          f"{live[2] / replies[2]:.1%} of the REST calls")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+# Startup cost and memory of the word list for a 500k-word dictionary: the
+# old json.load into a list vs WordPool (first build, then the cached index).
+# Run from the repo root: python bench/bench_word_pool.py [words]
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot
+
+PICKS = 100_000
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    if isinstance(result, list):
+        size = sys.getsizeof(result) + sum(sys.getsizeof(w) for w in result)
+    else:
+        size = sys.getsizeof(result.blob) + sys.getsizeof(result.offsets)
+    return result, elapsed * 1000, size / 1e6
+
+def old_load(path):
+    with open(path) as f:
+        return json.load(f)['words']
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    random.seed(10)
+    words = set()
+    while len(words) < count:
+        words.add("".join(random.choices(string.ascii_lowercase, k=random.randint(3, 14))))
+    words = sorted(words)
+    with tempfile.TemporaryDirectory() as tmp:
+        path, cache = os.path.join(tmp, "words.json"), os.path.join(tmp, "words.idx")
+        with open(path, "w") as f:
+            json.dump({"words": words}, f)
+        del words
+
+        flat, ms, mb = measure(lambda: old_load(path))
+        print(f"json.load list:    {ms:8.1f} ms, {mb:6.1f} MB held")
+        pool, ms, mb = measure(lambda: bot.WordPool.load(path, cache))
+        print(f"WordPool (build):  {ms:8.1f} ms, {mb:6.1f} MB held")
+        del pool
+        pool, ms, mb = measure(lambda: bot.WordPool.load(path, cache))
+        print(f"WordPool (cached): {ms:8.1f} ms, {mb:6.1f} MB held, cache file {os.path.getsize(cache) / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        for _ in range(PICKS):
+            random.choice(flat)
+        print(f"random.choice:     {(time.perf_counter() - start) / PICKS * 1e6:.2f} us/pick, repeats allowed")
+        for difficulty in bot.WORD_DIFFICULTIES:
+            cursor = pool.cursor(difficulty)
+            start = time.perf_counter()
+            picked = [cursor.next() for _ in range(min(PICKS, cursor.n))]
+            elapsed = time.perf_counter() - start
+            print(f"cursor {difficulty:>6}:    {elapsed / len(picked) * 1e6:.2f} us/pick, {len(picked) - len(set(picked))} repeats in {len(picked):,} picks")
+
+if __name__ == "__main__":
+    main()
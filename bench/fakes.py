@@ -0,0 +1,243 @@
+# Stand-ins for the parts of discord.py the handlers touch: guilds, channels,
+# members, messages and interactions. Every call that would be a REST request
+# goes through FakeDiscord.rest(), which counts it and can add a delay.
+# Used by bench/replay.py; not a script of its own.
+import asyncio
+import datetime
+import itertools
+import time
+from collections import Counter
+
+class FakeDiscord:
+    def __init__(self, rest_latency=0.0):
+        self.rest_latency = rest_latency
+        self.rest_calls = Counter()
+        self.ids = itertools.count(10_000)
+        self.clock = datetime.datetime(2025, 1, 1)
+        self.guilds = {}
+        self.channels = {}
+        self.users = {}
+
+    async def rest(self, kind):
+        self.rest_calls[kind] += 1
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+    def new_id(self):
+        return next(self.ids)
+
+    def now(self):
+        self.clock += datetime.timedelta(seconds=1)
+        return self.clock
+
+    def guild(self, gid):
+        if gid not in self.guilds:
+            self.guilds[gid] = FakeGuild(self, gid)
+        return self.guilds[gid]
+
+    def user(self, uid, guild=None):
+        if uid not in self.users:
+            self.users[uid] = FakeMember(uid)
+        member = self.users[uid]
+        if guild:
+            guild.members[uid] = member
+        return member
+
+    def channel(self, ref, guild_id=1):
+        # Channels are referred to by ID, or by name for ones the bot creates
+        if isinstance(ref, str):
+            return next((c for c in self.channels.values() if c.name == ref), None)
+        if ref not in self.channels:
+            FakeChannel(self.guild(guild_id), f"channel-{ref}", ref)
+        return self.channels[ref]
+
+    def get_channel(self, cid):
+        return self.channels.get(cid)
+
+    def get_user(self, uid):
+        # Empty gateway cache, like right after a restart
+        return None
+
+    async def fetch_user(self, uid):
+        await self.rest("fetch_user")
+        return self.user(uid)
+
+class FakeRole:
+    def __init__(self, rid, name):
+        self.id = rid
+        self.name = name
+        self.mention = f"<@&{rid}>"
+
+class FakeMember:
+    bot = False
+
+    def __init__(self, uid, name=None):
+        self.id = uid
+        self.name = self.display_name = name or f"player{uid}"
+        self.mention = f"<@{uid}>"
+
+    def __eq__(self, other):
+        return isinstance(other, FakeMember) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+class FakeGuild:
+    def __init__(self, world, gid):
+        self.world = world
+        self.id = gid
+        self.default_role = FakeRole(gid, "@everyone")
+        self.me = FakeMember(1, "riddlebot")
+        self.roles = {}
+        self.members = {}
+        self.categories = []
+
+    def get_role(self, rid):
+        return self.roles.get(rid)
+
+    def get_member(self, uid):
+        return self.members.get(uid)
+
+    def get_channel(self, cid):
+        channel = self.world.channels.get(cid)
+        return channel if channel and channel.guild is self else None
+
+    async def create_category(self, name, **kwargs):
+        await self.world.rest("create_category")
+        category = FakeCategory(self, name)
+        self.categories.append(category)
+        return category
+
+class FakeCategory:
+    def __init__(self, guild, name):
+        self.guild = guild
+        self.id = guild.world.new_id()
+        self.name = name
+        guild.world.channels[self.id] = self
+
+    @property
+    def text_channels(self):
+        return [c for c in self.guild.world.channels.values() if getattr(c, "category", None) is self]
+
+    async def create_text_channel(self, name, overwrites=None, topic=None, **kwargs):
+        await self.guild.world.rest("create_channel")
+        channel = FakeChannel(self.guild, name, category=self)
+        channel.topic = topic
+        return channel
+
+class FakeChannel:
+    def __init__(self, guild, name, cid=None, category=None):
+        self.world = guild.world
+        self.guild = guild
+        self.id = cid or self.world.new_id()
+        self.name = name
+        self.category = category
+        self.topic = None
+        self.mention = f"<#{self.id}>"
+        self.messages = []
+        self.world.channels[self.id] = self
+
+    def post(self, author, content, embeds=()):
+        message = FakeMessage(self, author, content, list(embeds))
+        self.messages.append(message)
+        return message
+
+    async def send(self, content=None, *, embed=None, embeds=(), **kwargs):
+        await self.world.rest("send")
+        return self.post(self.guild.me, content, [embed] if embed else embeds)
+
+    def get_partial_message(self, mid):
+        return next(m for m in self.messages if m.id == mid)
+
+    async def history(self, limit=None, oldest_first=True):
+        messages = self.messages if oldest_first else reversed(self.messages)
+        for message in itertools.islice(messages, limit):
+            yield message
+
+    async def set_permissions(self, target, **permissions):
+        await self.world.rest("set_permissions")
+
+    async def edit(self, *, name=None, topic=None, **kwargs):
+        await self.world.rest("edit_channel")
+        if name:
+            self.name = name
+        if topic is not None:
+            self.topic = topic
+
+    async def delete(self):
+        await self.world.rest("delete_channel")
+        self.world.channels.pop(self.id, None)
+
+class FakeAttachment:
+    def __init__(self, filename):
+        self.filename = filename
+        self.url = f"https://cdn.discordapp.com/attachments/1/2/{filename}"
+
+class FakeMessage:
+    def __init__(self, channel, author, content, embeds=(), attachments=()):
+        self.id = channel.world.new_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content or ""
+        self.embeds = list(embeds)
+        self.attachments = list(attachments)
+        self.created_at = channel.world.now()
+
+    async def reply(self, content=None, **kwargs):
+        await self.channel.world.rest("reply")
+        return self.channel.post(self.guild.me, content)
+
+    async def add_reaction(self, emoji):
+        await self.channel.world.rest("reaction")
+
+    async def edit(self, *, content=None, **kwargs):
+        await self.channel.world.rest("edit_message")
+        self.content = content
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.done = False
+        self.responded_at = None
+        self.content = None
+
+    def is_done(self):
+        return self.done
+
+    async def _respond(self, kind):
+        if self.done:
+            raise RuntimeError("interaction already responded to")
+        self.done = True
+        self.responded_at = time.perf_counter()
+        await self.interaction.world.rest(kind)
+
+    async def send_message(self, content=None, *, embed=None, ephemeral=False, **kwargs):
+        await self._respond("interaction_response")
+        self.content = content
+        if not ephemeral:
+            self.interaction.channel.post(self.interaction.guild.me, content, [embed] if embed else ())
+
+    async def defer(self, *, thinking=False, ephemeral=False):
+        await self._respond("interaction_defer")
+
+    async def edit_message(self, **kwargs):
+        await self._respond("interaction_edit")
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self.interaction.world.rest("followup")
+
+class FakeInteraction:
+    def __init__(self, world, channel, user):
+        self.world = world
+        self.channel = channel
+        self.channel_id = channel.id
+        self.guild = channel.guild
+        self.guild_id = channel.guild.id
+        self.user = user
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
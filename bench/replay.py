@@ -0,0 +1,318 @@
+# Offline replay harness: drives on_message, slash command callbacks and the
+# ticket buttons against the fakes in bench/fakes.py, with no Discord
+# connection. Reports throughput, latency percentiles per event type, REST
+# calls, saves and file writes per event, and memory from a second pass
+# under tracemalloc.
+#
+# Traffic is JSONL, one event per line:
+#   {"kind": "state", "config": {...}, "riddles": [...], "scores": {...}, "scoreboard": {...},
+#    "channels": [ids], "members": [ids]}        resets the bot's data
+#   {"kind": "message", "channel": 100, "user": 5, "content": "a towel"}
+#   {"kind": "command", "name": "startgame", "channel": 200, "user": 5, "args": {"difficulty": {"choice": "easy"}}}
+#   {"kind": "button", "custom_id": "claim_ticket", "channel": "ticket-player7", "user": 9}
+#   {"kind": "barrier"}                            waits for everything in flight
+# Channels are IDs, or names for channels the bot creates. Command args can be
+# {"channel": id}, {"role": id} or {"choice": value}. Permission checks are
+# not run. Data files are written to a temp directory, never the repo.
+#
+# Run from the repo root:
+#   python bench/replay.py [scenario ...] [--scale N] [--rest-ms MS] [--concurrency N] [--json]
+#   python bench/replay.py --dump word_rounds > rounds.jsonl
+#   python bench/replay.py --traffic rounds.jsonl
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+import traceback
+from collections import defaultdict
+
+# Guesses are checked inline so timings don't depend on thread scheduling,
+# and the JSON backend keeps everything inside the temp directory
+os.environ.setdefault("NLP_EXECUTOR", "inline")
+os.environ["STORAGE_BACKEND"] = "json"
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH))
+sys.path.insert(0, BENCH)
+import bot
+from fakes import FakeDiscord, FakeInteraction
+
+RIDDLE_CHANNEL = 100
+WORD_CHANNELS = (200, 201, 202, 203)
+TICKET_PANEL_CHANNEL = 300
+CLOSED_LOG_CHANNEL = 900
+ARCHIVE_CHANNEL = 901
+STAFF = 42
+
+# Synthetic traffic
+def riddle_flood(scale, rng):
+    riddles = [{"id": i, "question": f"Riddle {i}?", "answer": answer}
+               for i, answer in enumerate(["a towel", "an echo", "the letter m", "footsteps"], 1)]
+    yield {"kind": "state", "riddles": riddles,
+           "config": {"1": {"riddle_channel": RIDDLE_CHANNEL, "riddle": {"id": 1, "solved_by": None}}}}
+    for uid in rng.sample(range(1, 10 * 500 * scale), 500 * scale):
+        # A burst of 1-4 guesses per player; one in ten is right
+        for _ in range(rng.randint(1, 4)):
+            content = "a towel" if rng.random() < 0.1 else rng.choice(["sponge", "water", "the sun", "a towel?? no", "rain"])
+            yield {"kind": "message", "channel": RIDDLE_CHANNEL, "user": uid, "content": content}
+
+def word_rounds(scale, rng):
+    yield {"kind": "state"}
+    for channel in WORD_CHANNELS:
+        yield {"kind": "command", "name": "startgame", "channel": channel, "user": STAFF,
+               "args": {"difficulty": {"choice": rng.choice(bot.WORD_DIFFICULTIES)}}}
+    yield {"kind": "barrier"}
+    for _ in range(300 * scale):
+        channel = rng.choice(WORD_CHANNELS)
+        user = rng.randrange(1, 40)
+        if rng.random() < 0.05:
+            content = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+        else:
+            content = rng.choice(string.ascii_lowercase)
+        yield {"kind": "message", "channel": channel, "user": user, "content": content}
+
+def ticket_burst(scale, rng):
+    users = list(range(1000, 1000 + 50 * scale))
+    yield {"kind": "state", "channels": [TICKET_PANEL_CHANNEL, CLOSED_LOG_CHANNEL, ARCHIVE_CHANNEL],
+           "config": {"CLOSED_TICKETS_CHANNEL_ID": CLOSED_LOG_CHANNEL, "TICKET_ARCHIVE_CHANNEL_ID": ARCHIVE_CHANNEL,
+                      "1": {"ticket_display": TICKET_PANEL_CHANNEL}}}
+    for uid in users:
+        yield {"kind": "button", "custom_id": rng.choice(["ticket_account", "ticket_event"]),
+               "channel": TICKET_PANEL_CHANNEL, "user": uid}
+    yield {"kind": "barrier"}
+    for _ in range(20):
+        for uid in users:
+            yield {"kind": "message", "channel": f"ticket-player{uid}", "user": uid,
+                   "content": "lorem ipsum dolor sit amet " * rng.randint(1, 6)}
+    yield {"kind": "barrier"}
+    for uid in users:
+        yield {"kind": "button", "custom_id": "claim_ticket", "channel": f"ticket-player{uid}", "user": STAFF}
+    yield {"kind": "barrier"}
+    for uid in users:
+        yield {"kind": "button", "custom_id": "close_ticket", "channel": f"ticket-player{uid}-claimed", "user": STAFF}
+
+def commands_mix(scale, rng):
+    players = 5000 * scale
+    scores = {str(uid): rng.randint(1, 500) for uid in range(1, players)}
+    scoreboard = {str(uid): rng.randint(1, 500) for uid in range(1, players)}
+    yield {"kind": "state", "scores": scores, "scoreboard": scoreboard,
+           "riddles": [{"id": 1, "question": "What has keys but can't open locks?", "answer": "a piano"}],
+           # Half the players are in the member cache; the rest need a fetch
+           "members": list(range(1, players, 2)),
+           "config": {"1": {"riddle_channel": RIDDLE_CHANNEL, "riddle": {"id": 1, "solved_by": None}}}}
+    for _ in range(1000 * scale):
+        name = rng.choice(["score", "rank", "leaderboard", "scoreboard", "current"])
+        yield {"kind": "command", "name": name, "channel": RIDDLE_CHANNEL, "user": rng.randrange(1, players)}
+
+SCENARIOS = {
+    # name: (traffic, default concurrency)
+    "riddle_flood": (riddle_flood, 200),
+    "word_rounds": (word_rounds, 1),
+    "ticket_burst": (ticket_burst, 50),
+    "commands": (commands_mix, 1),
+}
+
+# Replay
+def apply_state(world, event):
+    for cid in event.get("channels", ()):
+        world.channel(cid)
+    for uid in event.get("members", ()):
+        world.user(uid, world.guild(1))
+    bot.persistence = bot.PersistenceManager()
+    bot.config.replace(copy.deepcopy(event.get("config", {})), persist=False)
+    bot.riddle_bank = bot.RiddleBank(copy.deepcopy(event.get("riddles", [])))
+    bot.riddle_matchers.clear()
+    for name, ranks in (("scores", "score_ranks"), ("scoreboard", "scoreboard_ranks")):
+        table = getattr(bot, name)
+        table.clear()
+        table.update(event.get(name, {}))
+        setattr(bot, ranks, bot.RankIndex.from_table(table))
+    bot.word_games.clear()
+    bot.late_solvers.clear()
+    bot.last_riddle_command_time = None
+    bot.guess_limiter = bot.GuessLimiter(1 / bot.COOLDOWN, bot.GUESS_BURST, bot.CHANNEL_GUESS_RATE, bot.REACTION_RATE)
+    bot.name_resolver = bot.NameResolver(world, bot.NAME_CACHE_TTL, bot.NAME_FETCH_CONCURRENCY)
+    bot.tickets = bot.TicketService(bot.TICKET_SPARES)
+
+def resolve_args(world, guild, args):
+    resolved = {}
+    for key, value in args.items():
+        if isinstance(value, dict) and "channel" in value:
+            value = world.channel(value["channel"], guild.id)
+        elif isinstance(value, dict) and "role" in value:
+            value = guild.get_role(value["role"])
+        elif isinstance(value, dict) and "choice" in value:
+            value = bot.app_commands.Choice(name=str(value["choice"]).title(), value=value["choice"])
+        resolved[key] = value
+    return resolved
+
+def button_callbacks():
+    # One instance of each persistent view, as registered with bot.add_view
+    return {item.custom_id: item.callback for view in (bot.TicketPanelView(), bot.ClaimView()) for item in view.children}
+
+async def dispatch(world, buttons, event):
+    channel = world.channel(event["channel"], event.get("guild", 1))
+    if channel is None:
+        raise LookupError(f"no channel {event['channel']!r}")
+    user = world.user(event["user"], channel.guild)
+    if event["kind"] == "message":
+        await bot.on_message(channel.post(user, event["content"]))
+    elif event["kind"] == "command":
+        command = bot.tree.get_command(event["name"])
+        await command.callback(FakeInteraction(world, channel, user), **resolve_args(world, channel.guild, event.get("args", {})))
+    elif event["kind"] == "button":
+        await buttons[event["custom_id"]](FakeInteraction(world, channel, user))
+    else:
+        raise ValueError(f"unknown event kind {event['kind']!r}")
+
+def label(event):
+    if event["kind"] == "command":
+        return "/" + event["name"]
+    if event["kind"] == "button":
+        return event["custom_id"]
+    return event["kind"]
+
+async def replay(events, concurrency, rest_latency):
+    world = FakeDiscord(rest_latency)
+    bot.bot.get_channel = world.get_channel
+    bot.bot.process_commands = lambda message: asyncio.sleep(0)
+    buttons = button_callbacks()
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    pending = set()
+
+    async def timed(event):
+        name = label(event)
+        start = time.perf_counter()
+        try:
+            await dispatch(world, buttons, event)
+        except Exception:
+            if not errors[name]:
+                traceback.print_exc()
+            errors[name] += 1
+        latencies[name].append((time.perf_counter() - start) * 1000)
+
+    async def flusher():
+        while True:
+            await asyncio.sleep(bot.PERSIST_INTERVAL)
+            await bot.persistence.flush()
+
+    background = set(asyncio.all_tasks())
+    flushing = asyncio.create_task(flusher())
+    count = 0
+    start = time.perf_counter()
+    for event in events:
+        if event["kind"] in ("state", "barrier") and pending:
+            await asyncio.wait(pending)
+            pending.clear()
+        if event["kind"] == "state":
+            apply_state(world, event)
+            start = time.perf_counter()
+            continue
+        if event["kind"] == "barrier":
+            continue
+        if len(pending) >= concurrency:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        pending.add(asyncio.create_task(timed(event)))
+        count += 1
+    if pending:
+        await asyncio.wait(pending)
+    elapsed = time.perf_counter() - start
+    flushing.cancel()
+    # Let follow-up work the handlers started (late-solve messages) finish too
+    leftover = asyncio.all_tasks() - background - {asyncio.current_task(), flushing}
+    if leftover:
+        await asyncio.wait(leftover)
+    await bot.persistence.flush()
+    return {
+        "events": count,
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "errors": dict(errors),
+        "rest": dict(world.rest_calls),
+        "saves": bot.persistence.marks,
+        "writes": bot.persistence.writes,
+    }
+
+def percentiles(values):
+    values = sorted(values)
+    return [values[min(len(values) - 1, int(len(values) * p / 100))] for p in (50, 95, 99)] + [values[-1]]
+
+async def measure(events, concurrency, rest_latency):
+    # Timing pass first, then the same traffic again under tracemalloc
+    result = await replay(events, concurrency, rest_latency)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    await replay(events, concurrency, rest_latency)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["peak_kb"] = (peak - base) / 1024
+    result["retained_bytes_per_event"] = (current - base) / max(result["events"], 1)
+    return result
+
+def report(name, result, concurrency):
+    n = max(result["events"], 1)
+    rest = sum(result["rest"].values())
+    print(f"{name}: {result['events']:,} events in {result['elapsed']:.2f} s "
+          f"({result['events'] / result['elapsed']:,.0f}/s), concurrency {concurrency}")
+    print(f"  {'latency ms':<18}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'count':>8}")
+    everything = [ms for values in result["latencies"].values() for ms in values]
+    for key, values in sorted(result["latencies"].items()) + [("all", everything)]:
+        if values:
+            print(f"  {key:<18}" + "".join(f"{ms:9.3f}" for ms in percentiles(values)) + f"{len(values):8d}")
+    print(f"  per event: {rest / n:.2f} REST calls, {result['saves'] / n:.2f} saves, {result['writes'] / n:.3f} file writes, "
+          f"{result['retained_bytes_per_event']:.0f} B retained; peak traced {result['peak_kb']:,.0f} KB")
+    print(f"  REST: " + ", ".join(f"{kind} {calls}" for kind, calls in sorted(result["rest"].items())))
+    if result["errors"]:
+        print(f"  ERRORS: {result['errors']}")
+
+def load_traffic(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic or recorded traffic against the bot's handlers")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--traffic", action="append", default=[], help="JSONL traffic file to replay")
+    parser.add_argument("--dump", help="print a scenario's traffic as JSONL instead of running it")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=15)
+    parser.add_argument("--concurrency", type=int, help="events in flight (default: per scenario)")
+    parser.add_argument("--rest-ms", type=float, default=0.0, help="simulated latency of each REST call")
+    parser.add_argument("--json", action="store_true", help="one JSON result per line instead of tables")
+    args = parser.parse_args()
+
+    if args.dump:
+        for event in SCENARIOS[args.dump][0](args.scale, random.Random(args.seed)):
+            print(json.dumps(event))
+        return
+
+    runs = [(path, load_traffic(path), 1) for path in args.traffic]
+    for name in args.scenarios or ([] if runs else SCENARIOS):
+        traffic, concurrency = SCENARIOS[name]
+        runs.append((name, list(traffic(args.scale, random.Random(args.seed))), concurrency))
+
+    os.chdir(tempfile.mkdtemp(prefix="riddlebot-replay-"))
+    os.makedirs(bot.GAMESTATE_DIR, exist_ok=True)
+    bot.TICKET_CLOSE_DELAY = 0
+    bot.nlp_resources.ensure()
+    for name, events, concurrency in runs:
+        concurrency = args.concurrency or concurrency
+        random.seed(args.seed)
+        result = await measure(events, concurrency, args.rest_ms / 1000)
+        if args.json:
+            summary = {key: value for key, value in result.items() if key != "latencies"}
+            summary["latency_ms"] = {key: dict(zip(("p50", "p95", "p99", "max"), percentiles(values)))
+                                     for key, values in result["latencies"].items()}
+            print(json.dumps({"scenario": name, "concurrency": concurrency, **summary}))
+        else:
+            report(name, result, concurrency)
+
+if __name__ == "__main__":
+    asyncio.run(main())
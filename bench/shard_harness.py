@@ -0,0 +1,192 @@
+# Several shard processes sharing one SQLite database, fed by a fake gateway.
+# Every process builds the same event stream and keeps the events for guilds
+# on its own shards ((guild_id >> 22) % shard count, like Discord). In each
+# guild a crowd answers the posted riddle at the same moment and players
+# guess letters in a word game; the same players play in guilds on every
+# shard. Riddle answers for every tenth guild are delivered to two processes,
+# as happens while shards move between processes. persistence_loop and
+# shard_sync run on short intervals throughout, with every points write held
+# up a little as if waiting on another process's lock, so flushes overlap.
+# Afterwards every player's points in the database have to match what the
+# processes awarded: one riddle point per guild and no word-game point lost
+# or counted twice.
+# Run from the repo root: python bench/shard_harness.py [processes] [guilds]
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+SHARDS = 4
+PLAYERS = 40
+SOLVERS = 8  # correct answers per riddle, all at once
+LETTER_GUESSES = 150  # per word game
+WORDS = ["riddle", "lantern", "whisper", "compass", "harbor", "quilt", "meadow", "puzzle"]
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+WRITE_DELAY = 0.02  # added to every points write
+
+def guild_ids(guilds):
+    return [(1000 + n) << 22 for n in range(guilds)]
+
+def shard_of(gid):
+    return (gid >> 22) % SHARDS
+
+def shard_groups(processes):
+    return [list(range(SHARDS))[i * SHARDS // processes:(i + 1) * SHARDS // processes] for i in range(processes)]
+
+def events(guilds, processes):
+    # (process indexes it's delivered to, guild, channel, player, text), shuffled the same way everywhere
+    rng = random.Random(20)
+    owner = {shard: i for i, group in enumerate(shard_groups(processes)) for shard in group}
+    stream = []
+    for n, gid in enumerate(guild_ids(guilds)):
+        home = owner[shard_of(gid)]
+        riddle_to = (home, (home + 1) % processes) if n % 10 == 0 and processes > 1 else (home,)
+        for uid in rng.sample(range(1, PLAYERS + 1), SOLVERS):
+            stream.append((riddle_to, gid, gid + 1, uid, "a towel"))
+        for _ in range(LETTER_GUESSES):
+            stream.append(((home,), gid, gid + 2, rng.randint(1, PLAYERS), rng.choice(LETTERS)))
+    rng.shuffle(stream)
+    return stream
+
+class Cursor:
+    difficulty = None
+
+    def __init__(self, seed):
+        self.n = seed
+
+    def next(self):
+        self.n += 1
+        return WORDS[self.n % len(WORDS)]
+
+    def state(self):
+        return {"n": self.n}
+
+def setup(db, guilds):
+    os.environ.update(STORAGE_BACKEND="sqlite", SQLITE_PATH=db)
+    sys.path.insert(0, os.path.dirname(BENCH))
+    import bot
+    for table in bot.POINTS_TABLES.values():
+        bot.storage.conn.execute(f"DELETE FROM {table}")
+    riddles, config = [], {}
+    for n, gid in enumerate(guild_ids(guilds)):
+        riddles.append({"id": n + 1, "question": f"What gets wetter as it dries? (#{n})", "answer": "a towel"})
+        config[str(gid)] = {"riddle_channel": gid + 1, "riddle": {"id": n + 1, "posted_at": "2025-01-01T00:00:00"}}
+    bot.storage.write_riddles(True, bot.riddle_rows(riddles))
+    bot.storage.write_text(bot.CONFIG_FILE, json.dumps(config))
+    return bot
+
+async def worker(index, processes, guilds, start_at):
+    sys.path.insert(0, os.path.dirname(BENCH))
+    sys.path.insert(0, BENCH)
+    import bot
+    from fakes import FakeDiscord
+    assert bot.SHARED_STATE and isinstance(bot.bot, bot.commands.AutoShardedBot)
+
+    bot.LATE_SOLVE_WINDOW = 0
+    world = FakeDiscord()
+    bot.bot.get_channel = world.get_channel
+    bot.bot.process_commands = lambda message: asyncio.sleep(0)
+    mine = [e for e in events(guilds, processes) if index in e[0]]
+    for _, gid, cid, _, _ in mine:
+        if cid not in world.channels:
+            world.channel(cid, gid)
+            if cid == gid + 2:
+                game = bot.word_games[cid] = bot.WordGame(cid, "", cursor=Cursor(gid))
+                game.next_word()
+
+    word_points = Counter()
+    award_point = bot.award_point
+
+    def counting_award_point(data, ranks, path, uid):
+        word_points[uid] += 1
+        award_point(data, ranks, path, uid)
+
+    bot.award_point = counting_award_point
+    write_points = bot.storage.write_points
+
+    def slow_write_points(*args, **kwargs):
+        time.sleep(WRITE_DELAY)
+        return write_points(*args, **kwargs)
+
+    bot.storage.write_points = slow_write_points
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    bot.persistence_loop.start()
+    bot.shard_sync.start()
+    start = time.perf_counter()
+    handlers = []
+    for _, gid, cid, uid, text in mine:
+        handlers.append(asyncio.create_task(bot.on_message(world.channel(cid).post(world.user(uid), text))))
+        if len(handlers) % 50 == 0:
+            await asyncio.sleep(0)
+    await asyncio.gather(*handlers)
+    for loop in (bot.persistence_loop, bot.shard_sync):
+        loop.stop()
+        await loop.get_task()
+    await bot.persistence.flush()
+    flushes = bot.persistence.flushes
+    riddle_wins = Counter()
+    for channel in world.channels.values():
+        for message in channel.messages:
+            if message.content.startswith("🎉 Correct, <@"):
+                riddle_wins[message.content.split("<@")[1].split(">")[0]] += 1
+    # Points this process awarded show up here without waiting for a sync
+    assert all(bot.scores[uid] >= wins for uid, wins in riddle_wins.items()), "riddle points visible locally"
+    await bot.shard_sync()
+    assert len(bot.scores) == bot.storage.count("scores"), "player count matches the database after a sync"
+    print("RESULT " + json.dumps({"events": len(mine), "seconds": time.perf_counter() - start,
+                                  "word_points": word_points, "riddle_wins": riddle_wins,
+                                  "flushes": flushes}), flush=True)
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    guilds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    workdir = tempfile.mkdtemp(prefix="riddlebot-shards-")
+    db = os.path.join(workdir, "riddlebot.db")
+    bot = setup(db, guilds)
+
+    start_at = time.time() + 5  # every process imports bot.py first, then they start together
+    env = dict(os.environ, SHARD_COUNT=str(SHARDS), NLP_EXECUTOR="inline", NLTK_DOWNLOAD="false",
+               GUESS_BURST="1000", CHANNEL_GUESS_RATE="100000", PERSIST_INTERVAL="0.02", SHARD_SYNC_INTERVAL="0.05")
+    children = [subprocess.Popen([sys.executable, __file__, "--worker", str(i), str(processes), str(guilds), str(start_at)],
+                                 env=dict(env, SHARD_IDS=",".join(map(str, group))), stdout=subprocess.PIPE, text=True)
+                for i, group in enumerate(shard_groups(processes))]
+    results = []
+    for child in children:
+        out, _ = child.communicate()
+        assert child.returncode == 0, f"worker exited with {child.returncode}"
+        results.append(json.loads(next(line for line in out.splitlines() if line.startswith("RESULT "))[7:]))
+
+    conn = bot.sqlite3.connect(db)
+    scores = dict(conn.execute("SELECT uid, points FROM scores"))
+    scoreboard = dict(conn.execute("SELECT uid, points FROM scoreboard"))
+    solves = dict(conn.execute("SELECT guild_id, solved_by FROM solves"))
+    config = json.loads(conn.execute("SELECT value FROM kv WHERE key = ?", (bot.CONFIG_FILE,)).fetchone()[0])
+    riddles_left = conn.execute("SELECT COUNT(*) FROM riddles").fetchone()[0]
+
+    word_points = sum((Counter(r["word_points"]) for r in results), Counter())
+    riddle_wins = sum((Counter(r["riddle_wins"]) for r in results), Counter())
+    for r, group in zip(results, shard_groups(processes)):
+        print(f"shards {group}: {r['events']:,} events in {r['seconds']:.2f} s, "
+              f"{sum(r['riddle_wins'].values())} riddles won, {sum(r['word_points'].values())} word points, {r['flushes']} flushes")
+    assert sum(riddle_wins.values()) == len(solves) == guilds, "one winner per riddle"
+    assert scores == dict(riddle_wins), "riddle points match the winners"
+    assert scoreboard == dict(word_points), "no word-game points lost or counted twice"
+    assert all(config[str(gid)]["riddle"]["solved_by"] == solves[gid] for gid in guild_ids(guilds)), "config agrees"
+    assert riddles_left == 0, "solved riddles retired"
+    overlapped = len(range(0, guilds, 10)) if processes > 1 else 0
+    print(f"{processes} processes, {guilds} guilds ({overlapped} delivered twice): {sum(scores.values())} riddle points "
+          f"for {guilds} riddles, {sum(scoreboard.values())} word points across {len(scoreboard)} players; "
+          f"database matches what every process awarded")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--worker"]:
+        index, processes, guilds, start_at = sys.argv[2:6]
+        asyncio.run(worker(int(index), int(processes), int(guilds), float(start_at)))
+    else:
+        main()
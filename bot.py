@@ -1,48 +1,413 @@
+import time as time_module
+STARTUP_STARTED = time_module.perf_counter()
 import os
+import sys
 import json
 import random
 import asyncio
 import io
-import time as time_module
-from datetime import time
+import gzip
+import math
+import pickle
+import tempfile
+import sqlite3
+import re
+import threading
+import functools
+import csv
+import bisect
+import codecs
+import zlib
+from array import array
+from itertools import accumulate, islice
+from collections import Counter, OrderedDict, defaultdict, deque
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, time, timedelta, timezone
+from types import MappingProxyType
+from typing import NamedTuple
 from dotenv import load_dotenv
+import aiohttp
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
 from discord.ui import View, Button, Select
-import nltk
-from nltk.corpus import stopwords 
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
+
+class StartupTimer:
+    # Time spent in each startup phase, printed once the bot is ready
+    def __init__(self, started):
+        self.started = started
+        self.last = started
+        self.phases = []
+        self.finished = False
+
+    def mark(self, phase):
+        now = time_module.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self):
+        total = (self.last - self.started) * 1000
+        return ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in self.phases) + f" (total {total:.0f} ms)"
+
+startup = StartupTimer(STARTUP_STARTED)
+startup.mark("imports")
 
 # Load environment variables
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN") or "YOUR_BOT_TOKEN"
 PORT = int(os.getenv("PORT", 4000))
+METRICS_ENABLED = os.getenv("METRICS", "true").lower() in ("1", "true", "yes")
+METRICS_HTTP = os.getenv("METRICS_HTTP", "false").lower() in ("1", "true", "yes")  # Prometheus text on 127.0.0.1:PORT
+NLP_EXECUTOR = os.getenv("NLP_EXECUTOR", "thread")  # inline, thread or process
+NLP_WORKERS = int(os.getenv("NLP_WORKERS", 2))
+NLP_QUEUE_SIZE = int(os.getenv("NLP_QUEUE_SIZE", 512))
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", 32))
+NLP_CACHE_SIZE = int(os.getenv("NLP_CACHE_SIZE", 4096))
+NLP_PRELOAD = os.getenv("NLP_PRELOAD", "background")  # background, lazy or eager
+NLTK_DOWNLOAD = os.getenv("NLTK_DOWNLOAD", "true").lower() in ("1", "true", "yes")
+NAME_CACHE_TTL = float(os.getenv("NAME_CACHE_TTL", 600))
+NAME_FETCH_CONCURRENCY = int(os.getenv("NAME_FETCH_CONCURRENCY", 5))
+NAME_DEFER_AFTER = 1.5  # seconds before a slow reply is deferred
+TRANSCRIPT_SPOOL_SIZE = int(os.getenv("TRANSCRIPT_SPOOL_SIZE", 1024 * 1024))
+TRANSCRIPT_PART_SIZE = int(os.getenv("TRANSCRIPT_PART_SIZE", 8 * 1024 * 1024))
+TRANSCRIPT_GZIP = os.getenv("TRANSCRIPT_GZIP", "false").lower() in ("1", "true", "yes")
+TICKET_ARCHIVE = os.getenv("TICKET_ARCHIVE", "tickets.db")  # searchable archive of closed tickets; empty turns it off
 
 # Game files
 RIDDLES_FILE = 'riddles.json'
+RIDDLES_JOURNAL = 'riddles.json.log'  # riddles added/removed since riddles.json was last rewritten
 SCORES_FILE = 'scores.json'
 CONFIG_FILE = 'config.json'
 SCOREBOARD_FILE = 'scoreboard.json'
-COOLDOWN = 5
-# Load words
-with open('words.json') as f:
-    words = json.load(f)['words']
-
-# NLTK setup
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
-    nltk.download('omw-1.4')
-    nltk.download("stopwords")
-    nltk.download("punkt_tab")
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words('english'))
+GAMESTATE_DIR = 'gamestates'  # one file (or SQLite key) per word-game channel
+PERSIST_INTERVAL = float(os.getenv("PERSIST_INTERVAL", 2))
+CONFIG_WATCH_INTERVAL = float(os.getenv("CONFIG_WATCH_INTERVAL", 5))  # seconds between checks for outside edits
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")  # json or sqlite
+SQLITE_PATH = os.getenv("SQLITE_PATH", "riddlebot.db")
+# Sharding. launcher.py starts one process per group of shards and passes
+# SHARD_COUNT and SHARD_IDS; the processes share state through SQLite.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0)) or None
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()] or None
+SHARD_SYNC_INTERVAL = float(os.getenv("SHARD_SYNC_INTERVAL", 10))  # seconds between picking up other shards' changes
+SHARED_STATE = bool(SHARD_COUNT and SHARD_IDS and len(SHARD_IDS) < SHARD_COUNT)  # other processes write the database too
+COOLDOWN = 5  # seconds for a player to earn back one riddle guess
+GUESS_BURST = int(os.getenv("GUESS_BURST", 3))
+CHANNEL_GUESS_RATE = float(os.getenv("CHANNEL_GUESS_RATE", 20))  # guesses checked per second per channel
+REACTION_RATE = float(os.getenv("REACTION_RATE", 4))  # reactions per second per channel
+GUESS_MAX_DEFER = 2.0  # longest a guess waits for the channel limit before it's dropped
+LATE_SOLVE_WINDOW = 3.0  # "already solved" replies within this many seconds become one message
+TICKET_CLOSE_DELAY = 15  # seconds between pressing Close Ticket and the channel going away
+TICKET_SPARES = int(os.getenv("TICKET_SPARES", 0))  # empty ticket channels kept ready per guild
+WORD_GAME_OUTPUT = os.getenv("WORD_GAME_OUTPUT", "replies")  # replies or live
+WORD_GAME_EDIT_INTERVAL = float(os.getenv("WORD_GAME_EDIT_INTERVAL", 2))  # seconds between edits of the live status message
+# Instrumentation. Timings keep the last `window` samples per name and work
+# out percentiles only when asked. With METRICS=false, timed() hands back the
+# function unchanged, so there is no cost at all.
+class RollingHistogram:
+    def __init__(self, window=2048):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        self.total += ms
+
+    def percentiles(self, *pcts):
+        values = sorted(self.samples)
+        if not values:
+            return [0.0] * len(pcts)
+        return [values[min(len(values) - 1, int(len(values) * p / 100))] for p in pcts]
+
+class Metrics:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.timings = defaultdict(RollingHistogram)
+        self.counters = Counter()
+
+    def observe(self, name, ms):
+        if self.enabled:
+            self.timings[name].add(ms)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def timed(self, name):
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+            # Look everything up once here, the wrapper runs on every call
+            add = self.timings[name].add
+            clock = time_module.perf_counter
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def wrapper(*args, **kwargs):
+                    start = clock()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        add((clock() - start) * 1000)
+            else:
+                @functools.wraps(fn)
+                def wrapper(*args, **kwargs):
+                    start = clock()
+                    try:
+                        return fn(*args, **kwargs)
+                    finally:
+                        add((clock() - start) * 1000)
+            return wrapper
+        return decorator
+
+    def count_rest_calls(self, http):
+        # discord.py has no hook for REST requests, so wrap the client's request method
+        if not self.enabled:
+            return
+        request = http.request
+
+        async def counted(route, **kwargs):
+            self.counters["rest_calls"] += 1
+            self.counters[f"rest_{route.method.lower()}"] += 1
+            return await request(route, **kwargs)
+        http.request = counted
+
+    async def sample_loop_lag(self, interval=1.0):
+        # How late a sleep wakes up is how long other work held the loop
+        while True:
+            start = time_module.perf_counter()
+            await asyncio.sleep(interval)
+            self.observe("loop_lag", (time_module.perf_counter() - start - interval) * 1000)
+
+    def report(self):
+        lines = [f"{'timing (ms)':<22}{'p50':>8}{'p95':>8}{'p99':>8}{'count':>9}"]
+        for name, hist in sorted(self.timings.items()):
+            p50, p95, p99 = hist.percentiles(50, 95, 99)
+            lines.append(f"{name:<22}{p50:8.2f}{p95:8.2f}{p99:8.2f}{hist.count:9d}")
+        lines.append("")
+        lines.extend(f"{name:<22}{n:>9d}" for name, n in sorted(self.counters.items()))
+        return "\n".join(lines)
+
+    def prometheus(self):
+        lines = ["# TYPE riddlebot_latency_ms summary"]
+        for name, hist in sorted(self.timings.items()):
+            for pct, value in zip(("0.5", "0.95", "0.99"), hist.percentiles(50, 95, 99)):
+                lines.append(f'riddlebot_latency_ms{{name="{name}",quantile="{pct}"}} {value:.3f}')
+            lines.append(f'riddlebot_latency_ms_sum{{name="{name}"}} {hist.total:.3f}')
+            lines.append(f'riddlebot_latency_ms_count{{name="{name}"}} {hist.count}')
+        lines.append("# TYPE riddlebot_events_total counter")
+        lines.extend(f'riddlebot_events_total{{name="{name}"}} {n}' for name, n in sorted(self.counters.items()))
+        return "\n".join(lines) + "\n"
+
+    def serve_http(self, port):
+        # Flask's dev server in a daemon thread is plenty for one local scraper
+        from flask import Flask, Response
+        app = Flask("riddlebot-metrics")
+        app.add_url_rule("/metrics", "metrics", lambda: Response(self.prometheus(), mimetype="text/plain; version=0.0.4"))
+        thread = threading.Thread(target=app.run, kwargs={"host": "127.0.0.1", "port": port}, daemon=True, name="metrics-http")
+        thread.start()
+        return thread
+
+metrics = Metrics(METRICS_ENABLED)
+
+WORDS_FILE = 'words.json'
+WORDS_CACHE = os.getenv("WORDS_CACHE", "words.idx")
+WORD_DIFFICULTIES = ("easy", "medium", "hard")
+
+# Word pool: words.json is preprocessed once into a single string plus an
+# offset array, sorted by difficulty, and pickled next to it. Later starts
+# load the pickle instead of parsing the JSON.
+class WordPool:
+    VERSION = 1
+
+    def __init__(self, blob, offsets, buckets):
+        self.blob = blob
+        self.offsets = offsets
+        self.buckets = buckets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def word_at(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+    def bucket(self, difficulty=None):
+        lo, hi = self.buckets.get(difficulty, (0, len(self)))
+        return (lo, hi) if hi > lo else (0, len(self))
+
+    def cursor(self, difficulty=None, state=None):
+        return WordCursor(self, difficulty, state)
+
+    @staticmethod
+    def difficulty(word, rarity):
+        # Rough hangman difficulty: rare letters are harder to guess, and fewer
+        # distinct letters means fewer hits to work with
+        letters = {c for c in word.lower() if c.isalpha()}
+        if not letters:
+            return 0.0
+        return sum(rarity[c] for c in letters) / len(letters) + (26 - len(letters)) / 4
+
+    @classmethod
+    def build(cls, word_list):
+        # Letter rarity is -log2 of the share of words containing the letter
+        letter_counts = Counter(c for w in word_list for c in set(w.lower()) if c.isalpha())
+        rarity = {c: -math.log2(n / len(word_list)) for c, n in letter_counts.items()}
+        ranked = sorted(word_list, key=lambda w: cls.difficulty(w, rarity))
+        offsets = array('I', accumulate(map(len, ranked), initial=0))
+        third = len(ranked) // 3
+        bounds = [0, third, len(ranked) - third, len(ranked)]
+        buckets = {d: (bounds[i], bounds[i + 1]) for i, d in enumerate(WORD_DIFFICULTIES)}
+        return cls("".join(ranked), offsets, buckets)
+
+    @classmethod
+    def load(cls, path, cache_path):
+        stat = os.stat(path)
+        source = (stat.st_mtime_ns, stat.st_size)
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+            if cached["version"] == cls.VERSION and tuple(cached["source"]) == source:
+                return cls(cached["blob"], cached["offsets"], cached["buckets"])
+        except Exception:
+            pass  # missing, corrupt or from another version: rebuilt below
+        with open(path) as f:
+            pool = cls.build(json.load(f)['words'])
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(os.path.abspath(cache_path)))
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump({"version": cls.VERSION, "source": source, "blob": pool.blob,
+                             "offsets": pool.offsets, "buckets": pool.buckets}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"⚠️ Could not cache word pool to {cache_path}: {e}")
+        return pool
+
+class WordCursor:
+    # Walks one bucket in shuffled order without repeats until every word has
+    # come up. The order is a random.shuffle of the bucket's indices seeded
+    # from `seed`, so the saved state is just the seed and the position; the
+    # shuffle is redone from the seed on the first pick after loading.
+    def __init__(self, pool, difficulty=None, state=None):
+        self.pool = pool
+        self.difficulty = difficulty
+        self.lo, hi = pool.bucket(difficulty)
+        self.n = hi - self.lo
+        self.order = None
+        if state and state.get("n") == self.n and "seed" in state:
+            self.seed, self.step = state["seed"], state["step"]
+        else:
+            self.reshuffle()
+
+    def reshuffle(self):
+        self.seed = random.getrandbits(64)
+        self.step = 0
+        self.order = None
+
+    def next(self):
+        if self.step >= self.n:
+            self.reshuffle()
+        if self.order is None:
+            self.order = array('I', range(self.n))
+            random.Random(self.seed).shuffle(self.order)
+        i = self.order[self.step]
+        self.step += 1
+        return self.pool.word_at(self.lo + i)
+
+    def state(self):
+        return {"n": self.n, "seed": self.seed, "step": self.step}
+
+word_pool = WordPool.load(WORDS_FILE, WORDS_CACHE)
+startup.mark("words")
+
+# NLTK setup. Nothing is imported or read from disk until the first guess,
+# or until on_ready warms it up in the background (NLP_PRELOAD=background).
+# Corpora in ./nltk_data are used first, so the bot can start offline.
+NLTK_RESOURCES = {
+    "wordnet": "corpora/wordnet",
+    "omw-1.4": "corpora/omw-1.4",
+    "stopwords": "corpora/stopwords",
+    "punkt_tab": "tokenizers/punkt_tab",
+}
+NLTK_BUNDLED_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data")
+
+class NLPResources:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.missing = []
+        self.load_ms = None
+        self.on_load = []  # called once loading is done, in the thread that did it
+
+    def ensure(self):
+        if not self.loaded:
+            with self.lock:
+                if self.loaded:
+                    return self
+                self._load()
+                self.loaded = True
+            for callback in self.on_load:
+                callback()
+        return self
+
+    def _find_missing(self, nltk):
+        missing = []
+        for name, path in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                missing.append(name)
+        return missing
+
+    def _load(self):
+        start = time_module.perf_counter()
+        import nltk
+        if os.path.isdir(NLTK_BUNDLED_DATA) and NLTK_BUNDLED_DATA not in nltk.data.path:
+            nltk.data.path.insert(0, NLTK_BUNDLED_DATA)
+        self.missing = self._find_missing(nltk)
+        if self.missing and NLTK_DOWNLOAD:
+            for name in self.missing:
+                nltk.download(name, quiet=True)
+            self.missing = self._find_missing(nltk)
+        if self.missing:
+            # Degrade instead of failing: both sides of a comparison go through
+            # the same fallback, so exact and near matches still work
+            print(f"⚠️ NLTK data missing ({', '.join(self.missing)}); using simple tokenizing")
+        self.edit_distance = nltk.edit_distance
+        if "stopwords" in self.missing:
+            self.stop_words = frozenset()
+        else:
+            from nltk.corpus import stopwords
+            self.stop_words = frozenset(stopwords.words('english'))
+        if "punkt_tab" in self.missing:
+            self.tokenize = lambda text: re.findall(r"\w+|[^\w\s]", text)
+        else:
+            from nltk.tokenize import word_tokenize
+            self.tokenize = word_tokenize
+            self.tokenize("warm up")
+        if "wordnet" in self.missing:
+            self.lemmatize = lambda word: word
+        else:
+            from nltk.stem import WordNetLemmatizer
+            self.lemmatize = WordNetLemmatizer().lemmatize
+            self.lemmatize("warming")  # WordNet itself loads on the first call
+        self.load_ms = (time_module.perf_counter() - start) * 1000
+
+nlp_resources = NLPResources()
+if NLP_PRELOAD == "eager":
+    nlp_resources.ensure()
+    startup.mark("nltk")
 
 # Load/save helpers
 def load_json(path, default):
+    # Writes still waiting in the persistence layer win over the file on disk
+    pending = persistence.pending_text(path)
+    if pending is DELETED:
+        return default
+    if pending is not None:
+        return json.loads(pending)
+    if storage:
+        return storage.load(path, default)
     if os.path.exists(path):
         with open(path, 'r') as f:
             try:
@@ -50,124 +415,2272 @@ def load_json(path, default):
             except json.JSONDecodeError:
                  return default
     return default
-    
+
+def write_json_atomic(path, text):
+    # Write to a temp file next to the target and rename, so a crash never leaves half a file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+# Optional SQLite backend (STORAGE_BACKEND=sqlite). Scores and the word-game
+# scoreboard become indexed tables, riddles are stored one row each and every
+# other file (config, game state) is kept as a JSON blob.
+POINTS_TABLES = {SCORES_FILE: "scores", SCOREBOARD_FILE: "scoreboard"}
+
+class SQLiteStorage:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.riddle_ids_stale = False
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA busy_timeout=5000")  # wait out other shard processes' writes
+            for table in POINTS_TABLES.values():
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (uid TEXT PRIMARY KEY, points INTEGER NOT NULL)")
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_points ON {table} (points DESC)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS riddles (id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT NOT NULL, data TEXT NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS solves (guild_id INTEGER NOT NULL, riddle_id INTEGER NOT NULL, "
+                              "posted_at TEXT NOT NULL, solved_by TEXT NOT NULL, PRIMARY KEY (guild_id, riddle_id, posted_at))")
+        # Lookups made on the event loop get a connection of their own: in WAL
+        # mode a read never waits for a writer, while `conn` can be held for up
+        # to busy_timeout in BEGIN IMMEDIATE when another process is writing
+        self.reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.read_lock = threading.Lock()
+
+    def read(self, sql, params=()):
+        with self.read_lock:
+            return self.reader.execute(sql, params).fetchall()
+
+    def load(self, path, default):
+        if path in POINTS_TABLES:
+            if path not in self.tables:
+                self.tables[path] = PointsTable(self, POINTS_TABLES[path])
+            return self.tables[path]
+        if path == RIDDLES_FILE:
+            with self.lock:
+                rows = self.conn.execute("SELECT id, data FROM riddles ORDER BY id").fetchall()
+            riddles = [json.loads(data) for _, data in rows]
+            # Rows written before riddles had stable IDs are numbered differently; rewrite them once
+            self.riddle_ids_stale = any(rid != r.get("id") for (rid, _), r in zip(rows, riddles))
+            return riddles
+        value = self.get_blob(path)
+        return json.loads(value) if value is not None else default
+
+    def get_blob(self, key):
+        rows = self.read("SELECT value FROM kv WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def keys_with_prefix(self, prefix):
+        return [key for (key,) in self.read("SELECT key FROM kv WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))]
+
+    def write_text(self, path, text):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (path, text))
+
+    def delete_text(self, path):
+        with self.lock:
+            self.conn.execute("DELETE FROM kv WHERE key = ?", (path,))
+
+    def merge_json(self, path, changes):
+        # Read-modify-write of a JSON blob in one transaction, touching only the
+        # given top-level keys (None removes one), so shard processes sharing
+        # the database keep each other's changes
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT value FROM kv WHERE key = ?", (path,)).fetchone()
+                data = json.loads(row[0]) if row else {}
+                for key, value in changes.items():
+                    if value is None:
+                        data.pop(key, None)
+                    else:
+                        data[key] = value
+                self.conn.execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (path, json.dumps(data, indent=2)))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def claim_solve(self, guild_id, posted, name, uid):
+        # The first correct answer to a posted riddle wins, whichever process
+        # saw it; the point is added in the same transaction. Returns whether
+        # this call won, the winner's name and the winner's points now.
+        key = (guild_id, posted.id, posted.posted_at or "")
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                claimed = self.conn.execute("INSERT OR IGNORE INTO solves (guild_id, riddle_id, posted_at, solved_by) VALUES (?, ?, ?, ?)",
+                                            (*key, name)).rowcount
+                points = None
+                if claimed:
+                    self.conn.execute("INSERT INTO scores (uid, points) VALUES (?, 1) ON CONFLICT(uid) DO UPDATE SET points = points + 1", (uid,))
+                    points = self.conn.execute("SELECT points FROM scores WHERE uid = ?", (uid,)).fetchone()[0]
+                winner = self.conn.execute("SELECT solved_by FROM solves WHERE guild_id = ? AND riddle_id = ? AND posted_at = ?", key).fetchone()[0]
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return bool(claimed), winner, points
+
+    def riddle_ids(self):
+        with self.lock:
+            return {rid for (rid,) in self.conn.execute("SELECT id FROM riddles")}
+
+    def get_riddles(self, ids):
+        ids = list(ids)
+        riddles = []
+        with self.lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = self.conn.execute(f"SELECT data FROM riddles WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                riddles.extend(json.loads(data) for (data,) in rows)
+        return riddles
+
+    def write_riddles(self, full, rows):
+        # rows are (id, question, data); data None deletes. A full write replaces the table.
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if full:
+                    self.conn.execute("DELETE FROM riddles")
+                self.conn.executemany("DELETE FROM riddles WHERE id = ?", [(rid,) for rid, _, data in rows if data is None])
+                self.conn.executemany("INSERT OR REPLACE INTO riddles (id, question, data) VALUES (?, ?, ?)",
+                                      [row for row in rows if row[2] is not None])
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        self.riddle_ids_stale = False
+
+    def count(self, table):
+        return self.read(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+    def get_points(self, table, uid):
+        rows = self.read(f"SELECT points FROM {table} WHERE uid = ?", (uid,))
+        return rows[0][0] if rows else None
+
+    def top_points(self, table, n):
+        return self.read(f"SELECT uid, points FROM {table} ORDER BY points DESC LIMIT ?", (n,))
+
+    def count_above(self, table, points, skip=()):
+        # Players with more than `points`, from the points index; uids in skip aren't counted
+        skip = list(skip)
+        above = self.read(f"SELECT COUNT(*) FROM {table} WHERE points > ?", (points,))[0][0]
+        for i in range(0, len(skip), 500):
+            chunk = skip[i:i + 500]
+            above -= self.read(f"SELECT COUNT(*) FROM {table} WHERE points > ? AND uid IN ({','.join('?' * len(chunk))})",
+                               (points, *chunk))[0][0]
+        return above
+
+    def iter_uids(self, table):
+        for uid, _ in self.iter_points(table):
+            yield uid
+
+    def iter_points(self, table):
+        # Separate read connection so a long scan never holds the write lock (WAL allows it)
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(f"SELECT uid, points FROM {table}")
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def write_points(self, table, changes, relative=False):
+        # relative: the values are increments, so processes sharing the table never overwrite each other
+        update = f"points = {table}.points + excluded.points" if relative else "points = excluded.points"
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    f"INSERT INTO {table} (uid, points) VALUES (?, ?) ON CONFLICT(uid) DO UPDATE SET {update}",
+                    [(uid, points) for uid, points in changes.items() if points is not None]
+                )
+                self.conn.executemany(f"DELETE FROM {table} WHERE uid = ?", [(uid,) for uid, points in changes.items() if points is None])
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def migrate_json_files(self, force=False):
+        # One-shot import of the existing JSON files; later runs are no-ops.
+        # The marker goes in first so shard processes starting together only import once.
+        with self.lock:
+            claimed = self.conn.execute("INSERT OR IGNORE INTO kv (key, value) VALUES ('__migrated__', 'null')").rowcount
+        if not claimed and not force:
+            return False
+        try:
+            for path, table in POINTS_TABLES.items():
+                data = read_json_file(path, {})
+                self.write_points(table, {str(uid): int(points) for uid, points in data.items()})
+            self.write_riddles(True, riddle_rows(read_riddle_files()[0]))
+            game_paths = []
+            if os.path.isdir(GAMESTATE_DIR):
+                game_paths = [f"{GAMESTATE_DIR}/{name}" for name in os.listdir(GAMESTATE_DIR) if name.endswith(".json")]
+            for path in [CONFIG_FILE] + game_paths:
+                data = read_json_file(path, None)
+                if data is not None:
+                    self.write_text(path, json.dumps(data, indent=2))
+        except BaseException:
+            with self.lock:
+                self.conn.execute("DELETE FROM kv WHERE key = '__migrated__'")
+            raise
+        self.write_text("__migrated__", json.dumps(discord.utils.utcnow().isoformat()))
+        return True
+
+def read_json_file(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return default
+
+# Riddles are saved incrementally. With JSON, riddles.json is rewritten only
+# now and then and changes in between are appended to RIDDLES_JOURNAL, one
+# line each; with SQLite only the changed rows are written.
+def riddle_rows(riddles):
+    return [(r.get("id"), r.get("question", ""), json.dumps(r, sort_keys=True)) for r in riddles]
+
+def read_riddle_files():
+    # riddles.json plus the journal on top; returns the riddles and the journal length
+    riddles = read_json_file(RIDDLES_FILE, [])
+    if not os.path.exists(RIDDLES_JOURNAL):
+        return riddles, 0
+    by_id = {r["id"]: r for r in riddles if isinstance(r.get("id"), int)}
+    entries = 0
+    with open(RIDDLES_JOURNAL) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break  # cut off mid-write; everything before it is good
+            entries += 1
+            if entry.get("riddle") is None:
+                by_id.pop(entry["id"], None)
+            else:
+                by_id[entry["id"]] = entry["riddle"]
+    return list(by_id.values()) + [r for r in riddles if not isinstance(r.get("id"), int)], entries
+
+def write_riddles(full, rows):
+    if storage:
+        storage.write_riddles(full, rows)
+    elif full:
+        write_json_atomic(RIDDLES_FILE, "[\n" + ",\n".join(data for _, _, data in rows) + "\n]\n")
+        if os.path.exists(RIDDLES_JOURNAL):
+            os.remove(RIDDLES_JOURNAL)
+    else:
+        with open(RIDDLES_JOURNAL, "a") as f:
+            f.writelines(f'{{"id": {rid}, "riddle": {data or "null"}}}\n' for rid, _, data in rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+class PointsTable(MutableMapping):
+    # Dict-like view over a points table. Only rows that were looked up or
+    # changed are in memory. Changes wait in `pending` as increments until the
+    # next flush, so shard processes sharing the table never overwrite each
+    # other's points; `known` has the totals this process set in the meantime.
+    # Increments being written move to `saving`, so no flush sends them twice.
+    def __init__(self, storage, table):
+        self.storage = storage
+        self.table = table
+        self.pending = {}
+        self.saving = {}
+        self.known = {}
+        self.size = storage.count(table)
+
+    def __getitem__(self, uid):
+        if uid in self.known:
+            points = self.known[uid]
+        else:
+            points = self.storage.get_points(self.table, uid)
+        if points is None:
+            raise KeyError(uid)
+        return points
+
+    def __setitem__(self, uid, points):
+        old = self.get(uid)
+        if old is None:
+            self.size += 1
+        self.pending[uid] = self.pending.get(uid, 0) + points - (old or 0)
+        self.known[uid] = points
+
+    def __delitem__(self, uid):
+        # Rare enough to write straight away
+        self[uid]
+        self.storage.write_points(self.table, {uid: None})
+        self.pending.pop(uid, None)
+        self.known.pop(uid, None)
+        self.size -= 1
+
+    def __iter__(self):
+        known = dict(self.known)
+        yield from known
+        for uid in self.storage.iter_uids(self.table):
+            if uid not in known:
+                yield uid
+
+    def __len__(self):
+        return self.size
+
+    def top(self, n):
+        rows = self.storage.top_points(self.table, n + len(self.known))
+        merged = {uid: points for uid, points in rows if uid not in self.known}
+        merged.update(self.known)
+        return sorted(((uid, points) for uid, points in merged.items() if points > 0), key=lambda x: x[1], reverse=True)[:n]
+
+    def rank(self, uid):
+        # Players on the same points share a rank (1, 2, 2, 4); totals set here
+        # but not saved yet are counted in place of the database's
+        points = self.get(uid)
+        if not points:
+            return None
+        known = dict(self.known)
+        return self.storage.count_above(self.table, points, known) + sum(p > points for p in known.values()) + 1
+
+    def point_saved(self, uid, points):
+        # A point written straight to the table (claim_solve), not through
+        # pending; `points` is the new total there
+        if uid in self.known:
+            self.known[uid] += 1  # saved totals plus this process's unsaved increments
+        elif points == 1:
+            self.size += 1
+
+    def take_changes(self):
+        changes, self.pending = self.pending, {}
+        for uid, added in changes.items():
+            self.saving[uid] = self.saving.get(uid, 0) + added
+        return changes
+
+    def changes_written(self, changes):
+        for uid, added in changes.items():
+            left = self.saving[uid] - added
+            if left:
+                self.saving[uid] = left
+            else:
+                del self.saving[uid]
+                if uid not in self.pending:
+                    self.known.pop(uid, None)
+
+    def changes_failed(self, changes):
+        # Back into pending, for the next flush to send again
+        for uid, added in changes.items():
+            self.pending[uid] = self.pending.get(uid, 0) + added
+        self.changes_written(changes)
+
+if SHARED_STATE and STORAGE_BACKEND != "sqlite":
+    sys.exit("❌ Shard processes share their data through SQLite; set STORAGE_BACKEND=sqlite")
+storage = SQLiteStorage(SQLITE_PATH) if STORAGE_BACKEND == "sqlite" else None
+if storage:
+    storage.migrate_json_files()
+
+class RankIndex:
+    # Players ordered by points, highest first, kept in step with the points
+    # table. Points only ever go up by one, so a +1 is a swap with the first
+    # player on the same points: O(1) updates, top-N is a slice and a rank is
+    # a dict lookup. `start[p]` is the index of the first player on p points.
+    def __init__(self, items=()):
+        ranked = sorted(((uid, points) for uid, points in items if points > 0), key=lambda x: x[1], reverse=True)
+        self.order = [uid for uid, _ in ranked]
+        self.points = dict(ranked)
+        self.pos = {uid: i for i, uid in enumerate(self.order)}
+        self.start = {}
+        for i, (_, points) in enumerate(ranked):
+            self.start.setdefault(points, i)
+
+    @classmethod
+    def from_table(cls, data):
+        return cls(data.items())
+
+    def __len__(self):
+        return len(self.order)
+
+    def increment(self, uid):
+        if uid not in self.pos:
+            self.points[uid] = 0
+            self.pos[uid] = len(self.order)
+            self.order.append(uid)
+            self.start.setdefault(0, self.pos[uid])
+        points = self.points[uid]
+        i, j = self.pos[uid], self.start[points]
+        other = self.order[j]
+        self.order[i], self.order[j] = other, uid
+        self.pos[other], self.pos[uid] = i, j
+        if j + 1 < len(self.order) and self.points[self.order[j + 1]] == points:
+            self.start[points] = j + 1
+        else:
+            del self.start[points]
+        self.start.setdefault(points + 1, j)
+        self.points[uid] = points + 1
+        return points + 1
+
+    def top(self, n):
+        return [(uid, self.points[uid]) for uid in self.order[:n]]
+
+    def rank(self, uid):
+        # Players on the same points share a rank (1, 2, 2, 4)
+        points = self.points.get(uid)
+        if not points:
+            return None
+        return self.start[points] + 1
+
+class TableRanks:
+    # Rankings for the SQLite backend, answered by the points index: players
+    # stay on disk instead of being loaded and sorted at startup, and shard
+    # processes sharing the database see each other's points
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def increment(self, uid):
+        pass  # the table already has the new points
+
+    def top(self, n):
+        return self.table.top(n)
+
+    def rank(self, uid):
+        return self.table.rank(uid)
+
+def ranking(data):
+    # RankIndex keeps JSON-backed points ranked in memory
+    return TableRanks(data) if isinstance(data, PointsTable) else RankIndex.from_table(data)
+
+DELETED = object()  # marks a file for deletion at the next flush (delete_json)
+
+class PersistenceManager:
+    # Write-behind store: save_json only marks a file dirty, and the latest data
+    # for each file is written once per flush, off the event loop.
+    def __init__(self):
+        self.dirty = {}
+        self.inflight = {}
+        self.lock = asyncio.Lock()  # one flush at a time (persistence_loop and shard_sync both flush)
+        self.writing = None
+        self.marks = 0
+        self.writes = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def mark_dirty(self, path, data):
+        self.dirty[path] = data
+        self.marks += 1
+
+    def pending_text(self, path):
+        data = self.dirty.get(path)
+        if saves_changes(data):
+            return None
+        if data is DELETED:
+            return DELETED
+        if data is not None:
+            return json.dumps(data, default=json_default)
+        return self.inflight.get(path)
+
+    def _take_dirty(self):
+        # Serialize on the loop so handlers can't mutate the data mid-write
+        batch = {}
+        for path, data in self.dirty.items():
+            if saves_changes(data):
+                batch[path] = (data, data.take_changes())
+            elif data is DELETED:
+                batch[path] = (data, DELETED)
+                self.inflight[path] = DELETED
+            else:
+                batch[path] = (data, json.dumps(data, indent=2, default=json_default))
+                self.inflight[path] = batch[path][1]
+        self.dirty.clear()
+        return batch
+
+    def _write_batch(self, batch, done):
+        # Each file is its own transaction; `done` says which ones made it
+        for path, (data, payload) in batch.items():
+            if isinstance(data, PointsTable):
+                storage.write_points(data.table, payload, relative=True)
+            elif isinstance(data, RiddleBank):
+                write_riddles(*payload[:2])
+            elif isinstance(data, ConfigStore) and storage:
+                storage.merge_json(path, payload)
+            elif data is DELETED and storage:
+                storage.delete_text(path)
+            elif data is DELETED:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            elif storage:
+                storage.write_text(path, payload)
+            else:
+                write_json_atomic(path, payload)
+            done.add(path)
+
+    def _finish(self, batch, done, start):
+        # Files that weren't written go back to dirty for the next flush
+        self.writing = None
+        for path, (data, payload) in batch.items():
+            if self.inflight.get(path) is payload:
+                del self.inflight[path]
+            if path in done:
+                if saves_changes(data):
+                    data.changes_written(payload)
+                continue
+            if isinstance(data, PointsTable):
+                data.changes_failed(payload)
+            self.dirty.setdefault(path, data)
+        self.writes += len(done)
+        metrics.count("file_writes", len(done))
+        self.flushes += 1
+        self.last_flush_ms = (time_module.perf_counter() - start) * 1000
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+
+    async def flush(self):
+        async with self.lock:
+            if not self.dirty:
+                return
+            start = time_module.perf_counter()
+            batch, done = self._take_dirty(), set()
+            self.writing = batch, done, start
+            try:
+                await asyncio.to_thread(self._write_batch, batch, done)
+            except Exception as e:
+                print(f"⚠️ Failed to save {', '.join(path for path in batch if path not in done)}: {e}")
+            self._finish(batch, done, start)
+
+    def flush_sync(self):
+        # Used on shutdown, when the event loop is already gone. A flush the
+        # shutdown cancelled has still finished its write thread; settle it first.
+        if self.writing:
+            self._finish(*self.writing)
+        if not self.dirty:
+            return
+        start = time_module.perf_counter()
+        batch, done = self._take_dirty(), set()
+        try:
+            self._write_batch(batch, done)
+        finally:
+            self._finish(batch, done, start)
+
+    def stats(self):
+        return {
+            "pending_writes": len(self.dirty),
+            "marks": self.marks,
+            "writes": self.writes,
+            "coalesced": self.marks - self.writes - len(self.dirty),
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+persistence = PersistenceManager()
+
+def saves_changes(data):
+    # Containers that hand over only what changed since the last save, not their whole JSON
+    return isinstance(data, (PointsTable, RiddleBank)) or (storage is not None and isinstance(data, ConfigStore))
+
+def json_default(obj):
+    # Containers that are saved as plain JSON
+    if isinstance(obj, RiddleBank):
+        return obj.to_list()
+    if isinstance(obj, ConfigStore):
+        return obj.snapshot.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+@metrics.timed("save_json")
 def save_json(path, data):
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=2)
+    persistence.mark_dirty(path, data)
+
+def delete_json(path):
+    persistence.mark_dirty(path, DELETED)
+
+@tasks.loop(seconds=PERSIST_INTERVAL)
+async def persistence_loop():
+    await persistence.flush()
+
+RIDDLE_WORD = re.compile(r"[a-z0-9']+")
+RIDDLE_JOURNAL_LIMIT = 1000  # journal lines before riddles.json is rewritten (at least half the bank)
+
+def riddle_words(text):
+    return RIDDLE_WORD.findall(text.lower())
+
+def normalize_question(text):
+    return " ".join(riddle_words(text))
+
+class RiddleSearch:
+    # Question words -> riddle IDs. Whole words are intersected; the word still
+    # being typed is matched as a prefix by bisecting the sorted vocabulary,
+    # which is only re-sorted after new words show up.
+    def __init__(self):
+        self.postings = defaultdict(set)
+        self.vocabulary = []
+        self.stale = False
+
+    def add(self, rid, question):
+        for word in set(riddle_words(question)):
+            if word not in self.postings:
+                self.stale = True
+            self.postings[word].add(rid)
+
+    def remove(self, rid, question):
+        for word in set(riddle_words(question)):
+            ids = self.postings.get(word)
+            if ids is not None:
+                ids.discard(rid)
+                if not ids:
+                    del self.postings[word]  # its vocabulary entry is skipped until the next sort
+
+    def search(self, query, limit):
+        words = riddle_words(query)
+        typing = words.pop() if words and not query[-1:].isspace() else None
+        ids = None
+        for word in sorted(words, key=lambda w: len(self.postings.get(w, ()))):
+            found = self.postings.get(word)
+            if not found:
+                return []
+            ids = found if ids is None else ids & found
+        if typing is None:
+            return list(islice(ids or (), limit))
+        if self.stale:
+            self.vocabulary = sorted(self.postings)
+            self.stale = False
+        results, seen = [], set()
+        for i in range(bisect.bisect_left(self.vocabulary, typing), len(self.vocabulary)):
+            word = self.vocabulary[i]
+            if not word.startswith(typing):
+                break
+            for rid in self.postings.get(word, ()):
+                if rid not in seen and (ids is None or rid in ids):
+                    seen.add(rid)
+                    results.append(rid)
+                    if len(results) == limit:
+                        return results
+        return results
+
+class RiddleBank:
+    # Riddles by stable ID, plus the rotation of IDs that haven't been posted
+    # this cycle. A cycle posts every riddle once, in order of a keyed hash of
+    # the ID (rotation_key), so the rotation is saved as just the cycle's
+    # number, its seed and the key of the last riddle posted. The rotation is
+    # kept sorted by key, highest first: picking the next riddle pops the end,
+    # adding or retiring one is a binary search.
+    # The search and duplicate indexes are built the first time they're needed.
+    # Changes wait in `changes` until they're saved, like PointsTable.
+    def __init__(self, riddle_list, rotation=None, journaled=0):
+        self.changes = {}
+        self.rewrite = False
+        self.journaled = journaled
+        self.id_step, self.id_offset = 1, 0
+        self.stored_ids = None  # IDs in the database at the last shard sync
+        self._search = None
+        self._questions = None
+        self.by_id = {}
+        self.next_id = max((r["id"] for r in riddle_list if isinstance(r.get("id"), int)), default=0) + 1
+        self.assigned = 0
+        for riddle in riddle_list:
+            if not isinstance(riddle.get("id"), int) or riddle["id"] in self.by_id:
+                riddle["id"] = self.next_id
+                self.next_id += 1
+                self.assigned += 1
+            self.by_id[riddle["id"]] = riddle
+        self.cycle = 0
+        self._start_cycle(rotation)
+
+    def rotation_key(self, rid):
+        # splitmix64 of the ID and the cycle's seed
+        z = (rid * 0x9E3779B97F4A7C15 + self.seed) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        return z ^ (z >> 31)
+
+    def _rotation_index(self, rid):
+        # Where rid is, or would go, in the rotation
+        return bisect.bisect_left(self.rotation, -self.rotation_key(rid), key=lambda r: -self.rotation_key(r))
+
+    def _start_cycle(self, state=None):
+        if state:
+            self.cycle, self.seed, self.after = state["cycle"], state["seed"], state["after"]
+        else:
+            self.cycle, self.seed, self.after = self.cycle + 1, random.getrandbits(64), -1
+        keys = {rid: self.rotation_key(rid) for rid in self.by_id}
+        self.rotation = sorted((rid for rid, key in keys.items() if key > self.after), key=keys.get, reverse=True)
+
+    def rotation_state(self):
+        return {"cycle": self.cycle, "seed": self.seed, "after": self.after}
+
+    def catch_up(self, state):
+        # Shard processes share one rotation; follow whichever got furthest
+        if state and (state["cycle"], state["after"]) > (self.cycle, self.after):
+            self._start_cycle(state)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def get(self, rid):
+        return self.by_id.get(rid)
+
+    def to_list(self):
+        return list(self.by_id.values())
+
+    def page(self, number, size):
+        return list(islice(self.by_id.values(), number * size, (number + 1) * size))
+
+    @property
+    def search_index(self):
+        if self._search is None:
+            self._search = RiddleSearch()
+            for rid, riddle in self.by_id.items():
+                self._search.add(rid, riddle.get("question", ""))
+        return self._search
+
+    @property
+    def question_hashes(self):
+        # hash of the normalized question -> riddle ID
+        if self._questions is None:
+            self._questions = {hash(normalize_question(r.get("question", ""))): rid for rid, r in self.by_id.items()}
+        return self._questions
+
+    def search(self, query, limit=25):
+        if not riddle_words(query):
+            return self.page(0, limit)
+        return [self.by_id[rid] for rid in self.search_index.search(query, limit)]
+
+    def find_duplicate(self, question):
+        key = normalize_question(question)
+        rid = self.question_hashes.get(hash(key))
+        if rid is not None and normalize_question(self.by_id[rid].get("question", "")) == key:
+            return self.by_id[rid]
+        return None
+
+    def _index(self, riddle):
+        if self._search is not None:
+            self._search.add(riddle["id"], riddle.get("question", ""))
+        if self._questions is not None:
+            self._questions.setdefault(hash(normalize_question(riddle.get("question", ""))), riddle["id"])
+
+    def _unindex(self, riddle):
+        if self._search is not None:
+            self._search.remove(riddle["id"], riddle.get("question", ""))
+        if self._questions is not None:
+            key = hash(normalize_question(riddle.get("question", "")))
+            if self._questions.get(key) == riddle["id"]:
+                del self._questions[key]
+
+    def new_id(self):
+        # Shard processes each take IDs from their own residue class, so two never hand out the same one
+        rid = self.next_id + (self.id_offset - self.next_id) % self.id_step
+        self.next_id = rid + 1
+        return rid
+
+    def add(self, riddle):
+        riddle["id"] = self.new_id()
+        self.changes[riddle["id"]] = riddle
+        return self._insert(riddle)
+
+    def _insert(self, riddle):
+        self.by_id[riddle["id"]] = riddle
+        self.next_id = max(self.next_id, riddle["id"] + 1)
+        self._index(riddle)
+        # Keyed past the last posted riddle: comes up this cycle, otherwise next
+        if self.rotation_key(riddle["id"]) > self.after:
+            self.rotation.insert(self._rotation_index(riddle["id"]), riddle["id"])
+        return riddle
+
+    def _unqueue(self, rid):
+        if self.rotation_key(rid) <= self.after:
+            return
+        i = self._rotation_index(rid)
+        key = self.rotation_key(rid)
+        while i < len(self.rotation) and self.rotation[i] != rid and self.rotation_key(self.rotation[i]) == key:
+            i += 1  # a 64-bit key collision
+        if i < len(self.rotation) and self.rotation[i] == rid:
+            del self.rotation[i]
+
+    def remove(self, rid):
+        riddle = self._drop(rid)
+        if riddle is not None:
+            self.changes[rid] = None
+        return riddle
+
+    def _drop(self, rid):
+        riddle = self.by_id.pop(rid, None)
+        self._unqueue(rid)
+        if riddle is not None:
+            self._unindex(riddle)
+        return riddle
+
+    def sync(self, stored_ids, riddles):
+        # Riddles other shard processes added (fetched by the caller) or deleted
+        # since the last sync; changes this process hasn't saved yet win
+        for riddle in riddles:
+            if riddle["id"] not in self.by_id and riddle["id"] not in self.changes:
+                self._insert(riddle)
+        for rid in self.stored_ids - stored_ids:
+            if rid in self.by_id and rid not in self.changes:
+                self._drop(rid)
+        self.stored_ids = stored_ids
+
+    def take_changes(self):
+        # Rewrite everything when asked to, or once the journal would outgrow half the bank
+        full = self.rewrite or (not storage and self.journaled + len(self.changes) > max(RIDDLE_JOURNAL_LIMIT, len(self) // 2))
+        if full:
+            rows = riddle_rows(self.by_id.values())
+        else:
+            rows = [(rid, r.get("question", ""), json.dumps(r, sort_keys=True)) if r else (rid, None, None)
+                    for rid, r in self.changes.items()]
+        return full, rows, dict(self.changes)
+
+    def changes_written(self, payload):
+        full, rows, taken = payload
+        for rid, riddle in taken.items():
+            if rid in self.changes and self.changes[rid] is riddle:
+                del self.changes[rid]
+        if full:
+            self.rewrite = False
+            self.journaled = 0
+        else:
+            self.journaled += len(rows)
+
+    def next(self):
+        if not self.by_id:
+            return None
+        if not self.rotation:
+            # Every riddle has been posted once; start a new cycle
+            self._start_cycle()
+        rid = self.rotation.pop()
+        self.after = self.rotation_key(rid)
+        return rid
+
+# Config. One store holds it in memory. Readers get an immutable snapshot,
+# and writers build a changed copy and swap it in, so a reader (or the
+# persistence layer) never sees half an update. Listeners are told about
+# every change. config.json is only read at startup and when the watcher
+# sees it edited outside the bot.
+class PostedRiddle(NamedTuple):
+    id: int
+    solved_by: str = None
+    posted_at: str = None
+    solved_at: str = None
+
+class GuildConfig(NamedTuple):
+    riddle_channel: int = None
+    riddle_time: str = None  # HH:MM in UTC
+    riddle_role: int = None
+    ticket_display: int = None
+    riddle: PostedRiddle = None
+    extra: tuple = ()  # keys this version doesn't know about, kept as they were
+
+    @classmethod
+    def from_dict(cls, data):
+        known = {k: v for k, v in data.items() if k in cls._fields and k != "extra"}
+        riddle = known.get("riddle")
+        if isinstance(riddle, dict) and "id" in riddle:
+            known["riddle"] = PostedRiddle(**{k: v for k, v in riddle.items() if k in PostedRiddle._fields})
+        elif riddle is not None:
+            known["riddle"] = None
+        return cls(**known, extra=tuple((k, v) for k, v in data.items() if k not in cls._fields))
+
+    def to_dict(self):
+        data = {k: v for k, v in zip(self._fields, self) if v is not None and k != "extra"}
+        if self.riddle:
+            data["riddle"] = self.riddle._asdict()
+        data.update(self.extra)
+        return data
+
+class ConfigSnapshot:
+    __slots__ = ("guilds", "settings")
+    EMPTY_GUILD = GuildConfig()
+
+    def __init__(self, guilds, settings):
+        self.guilds = MappingProxyType(guilds)
+        self.settings = MappingProxyType(settings)
+
+    @classmethod
+    def from_dict(cls, data):
+        # Guild sections are keyed by guild ID; anything else is a global setting
+        guilds, settings = {}, {}
+        for key, value in data.items():
+            if key.isdigit() and isinstance(value, dict):
+                guilds[key] = GuildConfig.from_dict(value)
+            else:
+                settings[key] = value
+        return cls(guilds, settings)
+
+    def guild(self, guild_id):
+        return self.guilds.get(str(guild_id), self.EMPTY_GUILD)
+
+    def get(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def to_dict(self):
+        data = dict(self.settings)
+        data.update((gid, section.to_dict()) for gid, section in self.guilds.items())
+        return data
+
+class ConfigStore:
+    def __init__(self, path, data):
+        self.path = path
+        self.snapshot = ConfigSnapshot.from_dict(data)
+        self.listeners = []
+        self.mtime = self._mtime()
+        self.reloads = 0
+        self.changed = set()  # top-level keys not saved yet (SQLite only writes these)
+
+    def guild(self, guild_id):
+        return self.snapshot.guild(guild_id)
+
+    def get(self, key, default=None):
+        return self.snapshot.get(key, default)
+
+    def subscribe(self, listener):
+        # listener(old_snapshot, new_snapshot), called after every change
+        self.listeners.append(listener)
+
+    def _commit(self, snapshot, persist=True, keys=()):
+        old, self.snapshot = self.snapshot, snapshot
+        if persist:
+            if storage:
+                self.changed.update(keys)
+            save_json(self.path, self)
+        for listener in self.listeners:
+            listener(old, snapshot)
+
+    def update_guild(self, guild_id, **changes):
+        gid = str(guild_id)
+        guilds = dict(self.snapshot.guilds)
+        guilds[gid] = self.snapshot.guild(gid)._replace(**changes)
+        self._commit(ConfigSnapshot(guilds, dict(self.snapshot.settings)), keys=(gid,))
+        return guilds[gid]
+
+    def set(self, key, value):
+        settings = dict(self.snapshot.settings)
+        settings[key] = value
+        self._commit(ConfigSnapshot(dict(self.snapshot.guilds), settings), keys=(key,))
+
+    def unset(self, key):
+        if key in self.snapshot.settings:
+            settings = dict(self.snapshot.settings)
+            del settings[key]
+            self._commit(ConfigSnapshot(dict(self.snapshot.guilds), settings), keys=(key,))
+
+    def replace(self, data, persist=True):
+        snapshot = ConfigSnapshot.from_dict(data)
+        keys = {*self.snapshot.guilds, *self.snapshot.settings, *snapshot.guilds, *snapshot.settings}
+        self._commit(snapshot, persist, keys)
+
+    def _saved_value(self, key):
+        if key in self.snapshot.guilds:
+            return self.snapshot.guilds[key].to_dict()
+        return self.snapshot.settings.get(key)
+
+    def take_changes(self):
+        return {key: self._saved_value(key) for key in self.changed}
+
+    def changes_written(self, changes):
+        for key, value in changes.items():
+            if self._saved_value(key) == value:
+                self.changed.discard(key)
+
+    def merge_from(self, data):
+        # What the other shard processes saved, with this process's unsaved changes on top
+        snapshot = ConfigSnapshot.from_dict(data)
+        guilds, settings = dict(snapshot.guilds), dict(snapshot.settings)
+        for key in self.changed:
+            guilds.pop(key, None)
+            settings.pop(key, None)
+            if key in self.snapshot.guilds:
+                guilds[key] = self.snapshot.guilds[key]
+            elif key in self.snapshot.settings:
+                settings[key] = self.snapshot.settings[key]
+        snapshot = ConfigSnapshot(guilds, settings)
+        if snapshot.to_dict() == self.snapshot.to_dict():
+            return False
+        self._commit(snapshot, persist=False)
+        return True
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload_if_changed(self):
+        # While the bot has changes waiting to be written, those win over an outside edit
+        if storage or persistence.pending_text(self.path) is not None:
+            return False
+        mtime = self._mtime()
+        if mtime == self.mtime:
+            return False
+        self.mtime = mtime
+        data = read_json_file(self.path, None)
+        if not isinstance(data, dict):
+            return False
+        snapshot = ConfigSnapshot.from_dict(data)
+        if snapshot.to_dict() == self.snapshot.to_dict():
+            return False  # our own write
+        self.reloads += 1
+        self._commit(snapshot, persist=False)
+        return True
+
+@tasks.loop(seconds=CONFIG_WATCH_INTERVAL)
+async def config_watcher():
+    if config.reload_if_changed():
+        print(f"🔄 Reloaded {CONFIG_FILE} after an outside edit")
 
 # Global state
-riddles = load_json(RIDDLES_FILE, [])
 scores = load_json(SCORES_FILE, {})
-config = load_json(CONFIG_FILE, {})
+config = ConfigStore(CONFIG_FILE, load_json(CONFIG_FILE, {}))
+if storage:
+    riddle_bank = RiddleBank(storage.load(RIDDLES_FILE, []), config.get("RIDDLE_ROTATION"))
+else:
+    riddles, journaled = read_riddle_files()
+    riddle_bank = RiddleBank(riddles, config.get("RIDDLE_ROTATION"), journaled)
+config.unset("RIDDLE_ROTATION_USED")  # the old list of every posted ID; the rotation starts over once
+if riddle_bank.assigned or (storage and storage.riddle_ids_stale):
+    riddle_bank.rewrite = True
+    save_json(RIDDLES_FILE, riddle_bank)
+if SHARED_STATE:
+    riddle_bank.id_step, riddle_bank.id_offset = SHARD_COUNT, min(SHARD_IDS)
+    riddle_bank.stored_ids = set(riddle_bank.by_id)
 scoreboard = load_json(SCOREBOARD_FILE, {})
+score_ranks = ranking(scores)
+scoreboard_ranks = ranking(scoreboard)
+startup.mark("state")
+
+def read_shared_state():
+    # Runs in a thread: what other shard processes may have changed since the last sync
+    return (storage.get_blob(CONFIG_FILE), storage.riddle_ids(),
+            storage.count(POINTS_TABLES[SCORES_FILE]), storage.count(POINTS_TABLES[SCOREBOARD_FILE]))
+
+@tasks.loop(seconds=SHARD_SYNC_INTERVAL)
+async def shard_sync():
+    # Each process keeps its own copy of the config and riddle bank; catch up
+    # with the others. Leaderboards are read from the database as they are.
+    await persistence.flush()
+    sizes = scores.size, scoreboard.size
+    config_text, riddle_ids, score_count, scoreboard_count = await asyncio.to_thread(read_shared_state)
+    # Players this process added while the counts were read aren't lost
+    scores.size = score_count + scores.size - sizes[0]
+    scoreboard.size = scoreboard_count + scoreboard.size - sizes[1]
+    if config_text:
+        config.merge_from(json.loads(config_text))
+        riddle_bank.catch_up(config.get("RIDDLE_ROTATION"))
+    added = riddle_ids - riddle_bank.stored_ids - riddle_bank.by_id.keys()
+    riddle_bank.sync(riddle_ids, await asyncio.to_thread(storage.get_riddles, added) if added else [])
 last_riddle_command_time = None
 
-# Word guessing game state
-game_running = False
-game_channel = None
-current_word = ""
-display_word = ""
-guessed_letters = []
-attempts_remaining = 15
-guess_timestamps = {}
-current_riddle = {"question": None, "answer": None}
+# Word guessing games, keyed by channel ID
+WORD_GAME_ATTEMPTS = 15
+word_games = {}
 # Discord bot setup
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 intents.members = True
-bot = commands.Bot(command_prefix=commands.when_mentioned_or('!'), intents=intents)
+activity = discord.Game(name="Solving Riddles!")
+if SHARD_COUNT:
+    bot = commands.AutoShardedBot(command_prefix=commands.when_mentioned_or('!'), intents=intents, activity=activity,
+                                  shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+else:
+    bot = commands.Bot(command_prefix=commands.when_mentioned_or('!'), intents=intents, activity=activity)
 tree = bot.tree
-client = discord.Client(intents=intents)
 
 # Utility for word game
-def update_display_word():
-    return ' '.join([c if c.lower() in guessed_letters or not c.isalpha() else '\_' for c in current_word])
-
-def pick_new_word():
-    global current_word, guessed_letters, attempts_remaining, display_word
-    current_word = random.choice(words)
-    guessed_letters = []
-    attempts_remaining = 15
-    display_word = update_display_word()
-
-def save_data():
-    save_json(SCORES_FILE, scores)
-    save_json(RIDDLES_FILE, riddles)
-    save_json(LISTENED_FILE, LISTENED_CHANNELS)
-
-def save_game_state():
-    with open("gamestate.json", "w") as f:
-        json.dump({
-            "current_word": current_word,
-            "guessed_letters": guessed_letters,
-            "attempts_remaining": attempts_remaining,
-            "game_running": game_running
-        }, f)
-
-def load_game_state():
-    global current_word, guessed_letters, attempts_remaining, game_running, display_word
-    try:
-        with open("gamestate.json", "r") as f:
-            data = json.load(f)
-            current_word = data.get("current_word", "")
-            guessed_letters = data.get("guessed_letters", [])
-            attempts_remaining = data.get("attempts_remaining", 15)
-            game_running = data.get("game_running", False)
-            display_word = update_display_word()
-    except FileNotFoundError:
-        pass
+class WordGame:
+    # One hangman round per channel. Guessed letters are a set and every letter
+    # maps to its positions in the word, so a guess only touches the cells it
+    # reveals and the masked word is never rebuilt from scratch.
+    def __init__(self, channel_id, word, running=True, cursor=None):
+        self.channel_id = channel_id
+        self.running = running
+        self.cursor = cursor
+        self.status = None  # WordGameStatus, in live output mode
+        self.new_word(word)
+
+    def next_word(self):
+        self.new_word(self.cursor.next())
+
+    def new_word(self, word, guessed=(), attempts=WORD_GAME_ATTEMPTS):
+        self.word = word
+        self.lower = word.lower()
+        self.guessed = set()
+        self.attempts = attempts
+        self.positions = defaultdict(list)
+        self.cells = []
+        for i, c in enumerate(word):
+            if c.isalpha():
+                self.positions[c.lower()].append(i)
+                self.cells.append('\_')
+            else:
+                self.cells.append(c)
+        self.hidden = sum(len(p) for p in self.positions.values())
+        self._display = None
+        for letter in guessed:
+            self.guess_letter(letter, count_miss=False)
+
+    @property
+    def display(self):
+        if self._display is None:
+            self._display = ' '.join(self.cells)
+        return self._display
+
+    @property
+    def solved(self):
+        return self.hidden == 0
+
+    def guess_letter(self, letter, count_miss=True):
+        # None if already guessed, otherwise whether the letter is in the word
+        if letter in self.guessed:
+            return None
+        self.guessed.add(letter)
+        positions = self.positions.get(letter)
+        if not positions:
+            if count_miss:
+                self.attempts -= 1
+            return False
+        for i in positions:
+            self.cells[i] = self.word[i]
+        self.hidden -= len(positions)
+        self._display = None
+        return True
+
+    def to_dict(self):
+        return {
+            "channel_id": self.channel_id,
+            "current_word": self.word,
+            "guessed_letters": sorted(self.guessed),
+            "attempts_remaining": self.attempts,
+            "game_running": self.running,
+            "difficulty": self.cursor.difficulty if self.cursor else None,
+            "cursor": self.cursor.state() if self.cursor else None,
+            "status_message_id": self.status.message_id if self.status else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        cursor = word_pool.cursor(data.get("difficulty"), data.get("cursor"))
+        game = cls(data["channel_id"], data.get("current_word", ""), data.get("game_running", False), cursor)
+        game.new_word(game.word, data.get("guessed_letters", []), data.get("attempts_remaining", WORD_GAME_ATTEMPTS))
+        if data.get("status_message_id"):
+            game.status = WordGameStatus(game, data["status_message_id"])
+        return game
+
+class WordGameStatus:
+    # WORD_GAME_OUTPUT=live: one message per game, edited instead of replying
+    # to every guess. A guess only marks it stale; a single task edits it at
+    # most every WORD_GAME_EDIT_INTERVAL seconds with the game as it is by
+    # then, so a burst of guesses costs one edit.
+    def __init__(self, game, message_id=None):
+        self.game = game
+        self.message_id = message_id
+        self.recent = deque(maxlen=8)   # latest letter guesses
+        self.results = deque(maxlen=3)  # latest finished words
+        self.stale = False
+        self.task = None
+        self.last_edit = 0.0
+
+    def guess(self, name, letter, hit):
+        self.recent.append(f"{'✅' if hit else '❌'} {letter} ({name})")
+        self.refresh()
+
+    def finish(self, line):
+        self.results.append(line)
+        self.recent.clear()
+        self.refresh()
+
+    def refresh(self):
+        self.stale = True
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.publish())
+
+    def render(self):
+        game = self.game
+        lines = [*self.results, f"🔤 {game.display}", f"Attempts remaining: {game.attempts}"]
+        if game.guessed:
+            lines.append("Guessed: " + " ".join(sorted(game.guessed)))
+        if self.recent:
+            lines.append("Recent: " + " · ".join(self.recent))
+        if not game.running:
+            lines.append("🛑 Game stopped.")
+        return "\n".join(lines)
+
+    async def publish(self):
+        loop = asyncio.get_running_loop()
+        while self.stale:
+            await asyncio.sleep(max(0.0, self.last_edit + WORD_GAME_EDIT_INTERVAL - loop.time()))
+            self.stale = False
+            self.last_edit = loop.time()
+            channel = bot.get_channel(self.game.channel_id)
+            if channel is None:
+                return
+            content = self.render()
+            try:
+                if self.message_id:
+                    try:
+                        await channel.get_partial_message(self.message_id).edit(content=content)
+                        continue
+                    except discord.NotFound:
+                        self.message_id = None  # deleted; post a new one
+                self.message_id = (await channel.send(content)).id
+                if self.game.running:
+                    save_game_state(self.game)
+            except discord.HTTPException as e:
+                print(f"⚠️ Couldn't update the word game status in {self.game.channel_id}: {e}")
+
+async def live_word_guess(game, message, guess):
+    # The same rules as the reply mode in on_message, but the outcome only goes
+    # into the status message, plus a rate-limited 🎉 on the winning guess
+    if game.status is None:
+        game.status = WordGameStatus(game)
+    name = message.author.display_name
+    won = False
+    if guess == game.lower:
+        won = True
+        game.status.finish(f"🎉 {name} guessed **{game.word}**! +1 point.")
+    elif len(guess) == 1 and guess.isalpha():
+        hit = game.guess_letter(guess)
+        if hit is None:
+            return  # already listed under Guessed
+        game.status.guess(name, guess, hit)
+        if game.solved:
+            won = True
+            game.status.finish(f"🎉 {name} completed **{game.word}**! +1 point.")
+        elif game.attempts <= 0:
+            game.status.finish("💀 Out of attempts! Moving to the next word...")
+            game.next_word()
+    else:
+        return
+    if won:
+        award_point(scoreboard, scoreboard_ranks, SCOREBOARD_FILE, str(message.author.id))
+        game.next_word()
+    save_game_state(game)
+    if won:
+        await react(message, "🎉")
+
+def award_point(data, ranks, path, uid):
+    data[uid] = data.get(uid, 0) + 1
+    ranks.increment(uid)
+    save_json(path, data)
+
+def game_state_path(channel_id):
+    return f"{GAMESTATE_DIR}/{channel_id}.json"
+
+def save_game_state(game):
+    save_json(game_state_path(game.channel_id), game.to_dict())
+
+def delete_game_state(channel_id):
+    delete_json(game_state_path(channel_id))
+
+def load_game_states():
+    if storage:
+        paths = storage.keys_with_prefix(GAMESTATE_DIR + "/")
+    else:
+        os.makedirs(GAMESTATE_DIR, exist_ok=True)
+        paths = [game_state_path(name[:-5]) for name in os.listdir(GAMESTATE_DIR) if name.endswith(".json")]
+    for path in paths:
+        data = load_json(path, None)
+        if data and data.get("game_running"):
+            game = WordGame.from_dict(data)
+            word_games[game.channel_id] = game
+        else:
+            delete_json(path)  # stopped before stopping deleted the state
 
 def lemmatized_word_set(text):
+    nlp = nlp_resources.ensure()
     return {
-        lemmatizer.lemmatize(word.lower())
+        nlp.lemmatize(word.lower())
         for word in text.split()
-        if word.lower() not in stop_words
+        if word.lower() not in nlp.stop_words
     }
-class RiddleSelect(discord.ui.Select):
-    def __init__(self, inter: discord.Interaction):
-        options = [
-            discord.SelectOption(label=f"{i+1}. {r['question'][:50]}", value=str(i))
-            for i, r in enumerate(riddles)
+class RiddleDeleteView(View):
+    # The bank one page at a time: a select menu holds at most 25 options
+    PAGE_SIZE = 25
+
+    def __init__(self, user, page=0):
+        super().__init__(timeout=120)
+        self.user = user
+        self.page = page
+        self.select = Select(placeholder="Select a riddle to delete...", min_values=1, max_values=1)
+        self.select.callback = self.delete
+        self.prev = Button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+        self.prev.callback = self.flip(-1)
+        self.next = Button(label="Next ▶", style=discord.ButtonStyle.secondary)
+        self.next.callback = self.flip(1)
+        for item in (self.select, self.prev, self.next):
+            self.add_item(item)
+
+    def render(self):
+        pages = max(1, math.ceil(len(riddle_bank) / self.PAGE_SIZE))
+        self.page = max(0, min(self.page, pages - 1))
+        first = self.page * self.PAGE_SIZE
+        self.select.options = [
+            discord.SelectOption(label=f"{first + i + 1}. {r['question']}"[:100], value=str(r["id"]))
+            for i, r in enumerate(riddle_bank.page(self.page, self.PAGE_SIZE))
         ]
-        super().__init__(placeholder="Select a riddle to delete...", min_values=1, max_values=1, options=options)
-        self.inter = inter
-
-    async def callback(self, interaction: discord.Interaction):
-        if interaction.user != self.inter.user:
-            return await interaction.response.send_message("❌ Only the command user can select.", ephemeral=True)
-        index = int(self.values[0])
-        removed = riddles.pop(index)
-        save_json(RIDDLES_FILE, riddles)
-        await interaction.response.edit_message(content=f"🗑️ Deleted: {removed['question']}", view=None)
-
-class RiddleSelectView(View):
-    def __init__(self, inter):
-        super().__init__(timeout=60)
-        self.add_item(RiddleSelect(inter))
-        
+        self.prev.disabled = self.page == 0
+        self.next.disabled = self.page >= pages - 1
+        return f"🧩 Select a riddle to delete (page {self.page + 1}/{pages}, {len(riddle_bank)} riddles):"
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.user.id:
+            await interaction.response.send_message("❌ Only the command user can select.", ephemeral=True)
+            return False
+        return True
+
+    def flip(self, step):
+        async def callback(interaction: discord.Interaction):
+            self.page += step
+            if not riddle_bank:
+                return await interaction.response.edit_message(content="❌ No riddles to delete.", view=None)
+            await interaction.response.edit_message(content=self.render(), view=self)
+        return callback
+
+    async def delete(self, interaction: discord.Interaction):
+        removed = riddle_bank.remove(int(self.select.values[0]))
+        if removed:
+            save_json(RIDDLES_FILE, riddle_bank)
+        status = f"🗑️ Deleted: {removed['question']}" if removed else "❌ That riddle was already deleted."
+        if not riddle_bank:
+            return await interaction.response.edit_message(content=status, view=None)
+        await interaction.response.edit_message(content=f"{status}\n{self.render()}", view=self)
+
+# Bulk riddle import: the file is read line by line as it downloads, so
+# memory stays flat however big it is. JSONL lines are {"question", "answer"}
+# objects; CSV needs question and answer columns (a header row is optional)
+# and one riddle per line.
+RIDDLE_IMPORT_FORMATS = {".jsonl": "jsonl", ".json": "json", ".csv": "csv"}
+
+def parse_riddle_line(line, fmt, columns=(0, 1)):
+    if fmt in ("json", "jsonl"):
+        # A .json array arrives already decoded, one element at a time
+        data = json.loads(line) if fmt == "jsonl" else line
+        question, answer = (data.get("question"), data.get("answer")) if isinstance(data, dict) else (None, None)
+    else:
+        row = next(csv.reader([line]))
+        question, answer = (row[columns[0]], row[columns[1]]) if len(row) > max(columns) else (None, None)
+    if not isinstance(question, str) or not isinstance(answer, str) or not question.strip() or not answer.strip():
+        raise ValueError("needs a question and an answer")
+    return {"question": question.strip(), "answer": answer.strip()}
+
+async def import_riddles(bank, lines, fmt):
+    counts = Counter()
+    columns = (0, 1)
+    first = True
+    async for line in lines:
+        if fmt != "json":
+            line = line.strip()
+            if not line:
+                continue
+        if first and fmt == "csv":
+            header = [h.strip().lower() for h in next(csv.reader([line]))]
+            if "question" in header and "answer" in header:
+                columns = (header.index("question"), header.index("answer"))
+                first = False
+                continue
+        first = False
+        try:
+            riddle = parse_riddle_line(line, fmt, columns)
+        except (ValueError, csv.Error):
+            counts["invalid"] += 1
+            continue
+        if bank.find_duplicate(riddle["question"]):
+            counts["duplicates"] += 1
+        else:
+            bank.add(riddle)
+            counts["added"] += 1
+        if sum(counts.values()) % 250 == 0:
+            await asyncio.sleep(0)  # let other events through during a big import
+    return counts
+
+async def attachment_lines(attachment):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(attachment.url) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                yield line.decode("utf-8-sig")
+
+async def attachment_text(attachment, chunk_size=64 * 1024):
+    # Fixed-size chunks, since a .json array is often all on one line
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async with aiohttp.ClientSession() as session:
+        async with session.get(attachment.url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+async def json_array_items(chunks):
+    # Streams the elements of a top-level JSON array without holding the whole file
+    decoder = json.JSONDecoder()
+    buf, pos = "", 0
+    started = need_comma = False
+    async for chunk in chunks:
+        buf = buf[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("expected a JSON array")
+                started = True
+                pos += 1
+            elif buf[pos] == "]":
+                return
+            elif need_comma:
+                if buf[pos] != ",":
+                    raise ValueError(f"expected ',' or ']' in the JSON array, got {buf[pos]!r}")
+                need_comma = False
+                pos += 1
+            else:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    break  # element continues in the next chunk
+                if end == len(buf):
+                    break  # a number may continue in the next chunk
+                yield item
+                pos = end
+                need_comma = True
+    raise ValueError("the JSON array is incomplete")
+
+class LRUCache:
+    # Shared by the event loop and the NLP worker threads, hence the lock
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            try:
+                value = self.data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{len(self.data)}/{self.maxsize} entries, {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)"
+
+normalize_cache = LRUCache(NLP_CACHE_SIZE)
+
+def normalize_text(text):
+    # Tokenize and lowercase, remove stopwords, lemmatize
+    key = text.lower()
+    lemmas = normalize_cache.get(key)
+    if lemmas is None:
+        nlp = nlp_resources.ensure()
+        tokens = nlp.tokenize(key)
+        lemmas = tuple(nlp.lemmatize(t) for t in tokens if t.isalpha() and t not in nlp.stop_words)
+        normalize_cache.put(key, lemmas)
+    return lemmas
+
+def warm_normalize_cache(riddle_list):
+    nlp_resources.ensure()
+    print(f"📚 NLTK loaded in {nlp_resources.load_ms:.0f} ms")
+    start = time_module.perf_counter()
+    for r in riddle_list:
+        if r.get("answer"):
+            normalize_text(r["answer"])
+    elapsed = (time_module.perf_counter() - start) * 1000
+    print(f"🔥 Warmed NLP cache with {len(riddle_list)} riddle answers in {elapsed:.0f} ms: {normalize_cache.stats()}")
+
+@metrics.timed("nltk_similarity")
 def nltk_similarity(a, b):
-    # Tokenize and lowercase
-    tokens_a = word_tokenize(a.lower())
-    tokens_b = word_tokenize(b.lower())
-
-    # Remove stopwords
-    tokens_a = [t for t in tokens_a if t.isalpha() and t not in stop_words]
-    tokens_b = [t for t in tokens_b if t.isalpha() and t not in stop_words]
-
-    # Lemmatize
-    lemmas_a = [lemmatizer.lemmatize(token) for token in tokens_a]
-    lemmas_b = [lemmatizer.lemmatize(token) for token in tokens_b]
-
-    # Join back into strings
-    lemma_str_a = " ".join(lemmas_a)
-    lemma_str_b = " ".join(lemmas_b)
+    # Join lemmas back into strings
+    lemma_str_a = " ".join(normalize_text(a))
+    lemma_str_b = " ".join(normalize_text(b))
 
     # Edit distance similarity
     if not lemma_str_a or not lemma_str_b:
         return 0.0  # Avoid division by zero if nothing left after stopword removal
 
-    return 1 - nltk.edit_distance(lemma_str_a, lemma_str_b) / max(len(lemma_str_a), len(lemma_str_b))
+    return 1 - nlp_resources.ensure().edit_distance(lemma_str_a, lemma_str_b) / max(len(lemma_str_a), len(lemma_str_b))
+
+def bounded_edit_distance(a, b, max_dist):
+    # Levenshtein distance (same as nltk.edit_distance) limited to a band of
+    # width max_dist around the diagonal. Gives up with max_dist + 1 as soon
+    # as no cell in a row is within the bound.
+    over = max_dist + 1
+    if abs(len(a) - len(b)) > max_dist:
+        return over
+    if len(a) > len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        lo = max(1, i - max_dist)
+        hi = min(len(b), i + max_dist)
+        cur = [over] * (len(b) + 1)
+        cur[0] = i
+        row_min = i
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            v = min(prev[j - 1] + (ca != b[j - 1]), prev[j] + 1, cur[j - 1] + 1)
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > max_dist:
+            return over
+        prev = cur
+    return min(prev[len(b)], over)
+
+def char_bag_distance(bag, text):
+    # Cheap lower bound on the edit distance from letter counts alone
+    diff = Counter(bag)
+    diff.subtract(text)
+    extra = sum(n for n in diff.values() if n > 0)
+    missing = -sum(n for n in diff.values() if n < 0)
+    return max(extra, missing)
+
+class AnswerMatcher:
+    # Built once per posted riddle so guesses only pay for their own side of
+    # nltk_similarity. "a/b" answers accept either alternative.
+    def __init__(self, answer, threshold=1.0):
+        self.answer = answer
+        self.threshold = threshold
+        parts = [answer] + answer.split("/") if "/" in answer else [answer]
+        variants = {" ".join(normalize_text(p)) for p in parts}
+        self.variants = tuple(v for v in variants if v)
+        self.bags = {v: Counter(v) for v in self.variants}
+
+    def _score_ok(self, dist, longest):
+        return 1 - dist / longest >= self.threshold
+
+    def matches(self, guess):
+        if not self.variants or not any(c.isalpha() for c in guess):
+            return False
+        lemma_str = " ".join(normalize_text(guess))
+        if not lemma_str:
+            return False
+        if lemma_str in self.variants:
+            return True
+        if self.threshold >= 1.0:
+            return False
+        for variant in self.variants:
+            longest = max(len(variant), len(lemma_str))
+            # Length filter, then letter-count filter, then the banded distance
+            if not self._score_ok(abs(len(variant) - len(lemma_str)), longest):
+                continue
+            if not self._score_ok(char_bag_distance(self.bags[variant], lemma_str), longest):
+                continue
+            max_dist = int((1 - self.threshold) * longest) + 1
+            if self._score_ok(bounded_edit_distance(variant, lemma_str, max_dist), longest):
+                return True
+        return False
+
+# Matchers for the riddles currently posted, by riddle ID. A solved riddle
+# leaves the bank but keeps its matcher until the next one is posted, so late
+# answers still get "already solved".
+riddle_matchers = {}
+
+def riddle_matcher_for(rid):
+    # A task building the matcher in a thread, since the first one may have to
+    # wait for NLTK to load; awaiting it once it's done costs nothing
+    matcher = riddle_matchers.get(rid)
+    if matcher is None:
+        riddle = riddle_bank.get(rid)
+        if riddle is None:
+            return None
+        matcher = riddle_matchers[rid] = asyncio.ensure_future(asyncio.to_thread(AnswerMatcher, riddle["answer"]))
+    return matcher
+
+# Riddle schedule: each guild has its own channel, post time (UTC), optional
+# role to ping and current riddle, stored in its config section
+LEGACY_RIDDLE_CHANNEL_ID = 1378486916407758888
+LEGACY_RIDDLE_ROLE_ID = 1395573526823440464
+
+def parse_post_time(text):
+    hours, minutes = (int(part) for part in (text or "00:00").split(":"))
+    return time(hours, minutes)
+
+def riddle_due(section, now):
+    # Due once the latest scheduled time has passed without a riddle posted
+    # since, so a late wake-up (loop lag, reconnect) posts late instead of
+    # skipping the day
+    scheduled = datetime.combine(now.date(), parse_post_time(section.riddle_time), timezone.utc)
+    if scheduled > now:
+        scheduled -= timedelta(days=1)
+    if not section.riddle or not section.riddle.posted_at:
+        return True
+    posted_at = datetime.fromisoformat(section.riddle.posted_at)
+    if posted_at.tzinfo is None:
+        posted_at = posted_at.replace(tzinfo=timezone.utc)
+    return posted_at < scheduled
+
+def riddle_guild_sections():
+    return [(gid, section) for gid, section in config.snapshot.guilds.items() if section.riddle_channel]
+
+def riddle_post_times():
+    return sorted({parse_post_time(section.riddle_time) for _, section in riddle_guild_sections()}) or [time(0, 0)]
+
+def reschedule_riddles(old, new):
+    # Config listener: keep riddle_loop's times in step with every guild's post time
+    if [s.riddle_time for s in old.guilds.values() if s.riddle_channel] != [s.riddle_time for s in new.guilds.values() if s.riddle_channel]:
+        riddle_loop.change_interval(time=riddle_post_times())
+
+config.subscribe(reschedule_riddles)
+
+def migrate_legacy_riddle_config():
+    # There used to be one global riddle channel (partly hardcoded) and a full
+    # copy of the current riddle in CURRENT_RIDDLE
+    if config.get("RIDDLE_CHANNEL_ID") is None and config.get("CURRENT_RIDDLE") is None:
+        return
+    data = config.snapshot.to_dict()
+    channel = bot.get_channel(data.get("RIDDLE_CHANNEL_ID") or LEGACY_RIDDLE_CHANNEL_ID)
+    legacy = data.pop("CURRENT_RIDDLE", None)
+    data.pop("RIDDLE_CHANNEL_ID", None)
+    data.pop("LAST_RIDDLE_TIME", None)
+    if channel:
+        section = data.setdefault(str(channel.guild.id), {})
+        section.setdefault("riddle_channel", channel.id)
+        if channel.guild.get_role(LEGACY_RIDDLE_ROLE_ID):
+            section.setdefault("riddle_role", LEGACY_RIDDLE_ROLE_ID)
+        if legacy and not legacy.get("solved_by"):
+            rid = next((r["id"] for r in riddle_bank if r.get("question") == legacy.get("question")), None)
+            if rid is not None:
+                section["riddle"] = {"id": rid, "solved_by": None, "posted_at": discord.utils.utcnow().isoformat()}
+    config.replace(data)
+
+async def post_riddle_to(guild_id, channel, announce_previous=False):
+    prev = config.guild(guild_id).riddle
+    if prev:
+        if announce_previous and not prev.solved_by:
+            riddle = riddle_bank.get(prev.id)
+            if riddle:
+                await channel.send(f"⏱️ Time's up! The correct answer was: **{riddle['answer']}**")
+        riddle_matchers.pop(prev.id, None)
+    rid = riddle_bank.next()
+    if rid is None:
+        return None
+    riddle = riddle_bank.get(rid)
+    section = config.update_guild(guild_id, riddle=PostedRiddle(rid, posted_at=discord.utils.utcnow().isoformat()))
+    config.set("RIDDLE_ROTATION", riddle_bank.rotation_state())
+    riddle_matcher_for(rid)
+
+    mention = f"<@&{section.riddle_role}>" if section.riddle_role else ""
+    await channel.send(f"{mention} 🧠 **Riddle of the Day:** {riddle['question']}")
+    return riddle
+
+# NLP worker pool: keeps tokenizing/lemmatizing/scoring off the event loop
+def run_nlp_batch(jobs):
+    results = []
+    for fn, args in jobs:
+        try:
+            results.append((True, fn(*args)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+class NLPWorkerPool:
+    def __init__(self, mode="thread", workers=2, queue_size=512, batch_size=32):
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(f"Unknown NLP executor mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.executor = None
+        self.queue = None
+        self.dispatcher = None
+        self.channel_locks = defaultdict(asyncio.Lock)
+        self.inflight = None
+
+    def start(self):
+        if self.mode == "inline" or self.dispatcher:
+            return
+        if self.mode == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="nlp")
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.inflight = asyncio.Semaphore(self.workers * 2)
+        self.dispatcher = asyncio.create_task(self._dispatch())
+
+    async def run(self, channel_id, fn, *args):
+        # Synchronous fallback, used by tests and NLP_EXECUTOR=inline
+        if self.mode == "inline":
+            return fn(*args)
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        # Blocks here when the queue is full, which slows down a flood at the source
+        await self.queue.put((channel_id, fn, args, future))
+        return await future
+
+    async def _dispatch(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            groups = defaultdict(list)
+            for item in batch:
+                groups[item[0]].append(item)
+            for channel_id, items in groups.items():
+                await self.inflight.acquire()
+                asyncio.create_task(self._run_group(self.channel_locks[channel_id], items))
+
+    async def _run_group(self, lock, items):
+        # Groups are created in queue order and asyncio locks are FIFO, so results
+        # for one channel come back in the order the messages arrived
+        try:
+            async with lock:
+                await self._run_jobs(items)
+        finally:
+            self.inflight.release()
+
+    async def _run_jobs(self, items):
+        jobs = [(fn, args) for _, fn, args, _ in items]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, run_nlp_batch, jobs)
+        except Exception as e:
+            results = [(False, e)] * len(items)
+        for (_, _, _, future), (ok, value) in zip(items, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def shutdown(self):
+        if self.dispatcher:
+            self.dispatcher.cancel()
+            self.dispatcher = None
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+nlp_pool = NLPWorkerPool(NLP_EXECUTOR, NLP_WORKERS, NLP_QUEUE_SIZE, NLP_BATCH_SIZE)
+
+# Riddle channel flood control
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time_module.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        self._refill(time_module.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def reserve(self, max_wait):
+        # Take a token now, going into debt if needed, and return how long to
+        # wait for it. Nothing is taken if the wait would exceed max_wait.
+        self._refill(time_module.monotonic())
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+    def idle(self):
+        self._refill(time_module.monotonic())
+        return self.tokens >= self.capacity
+
+class GuessLimiter:
+    # Token buckets in front of riddle answer checking: one per player, one per
+    # channel for checks, and one per channel for reactions. Players over their
+    # limit are dropped; a busy channel makes guesses wait up to max_defer.
+    def __init__(self, user_rate, user_burst, channel_rate, reaction_rate, max_defer=GUESS_MAX_DEFER):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.channel_rate = channel_rate
+        self.reaction_rate = reaction_rate
+        self.max_defer = max_defer
+        self.users = {}
+        self.channels = {}
+        self.reactions = {}
+        self.stats = Counter()
+
+    def _bucket(self, buckets, key, rate, burst):
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= 10_000:
+                # Forget players whose bucket has filled back up; they start full anyway
+                for k in [k for k, b in buckets.items() if b.idle()]:
+                    del buckets[k]
+            bucket = buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    async def admit(self, channel_id, user_id):
+        if not self._bucket(self.users, user_id, self.user_rate, self.user_burst).take():
+            self.stats["dropped_user"] += 1
+            return False
+        channel = self._bucket(self.channels, channel_id, self.channel_rate, self.channel_rate * 2)
+        wait = channel.reserve(self.max_defer)
+        if wait is None:
+            self.stats["dropped_channel"] += 1
+            return False
+        if wait:
+            self.stats["deferred"] += 1
+            await asyncio.sleep(wait)
+        self.stats["checked"] += 1
+        return True
+
+    def allow_reaction(self, channel_id):
+        if self._bucket(self.reactions, channel_id, self.reaction_rate, self.reaction_rate * 2).take():
+            self.stats["reactions"] += 1
+            return True
+        self.stats["reactions_dropped"] += 1
+        return False
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['checked']} checked, {s['deferred']} deferred, "
+                f"{s['dropped_user'] + s['dropped_channel']} dropped ({s['dropped_user']} player, {s['dropped_channel']} channel limit), "
+                f"{s['reactions']} reactions sent, {s['reactions_dropped']} skipped, "
+                f"{s['late_solves']} late answers in {s['late_solve_messages']} messages")
+
+guess_limiter = GuessLimiter(1 / COOLDOWN, GUESS_BURST, CHANNEL_GUESS_RATE, REACTION_RATE)
+
+# Correct answers after the riddle was solved, waiting to go out as one message
+late_solvers = {}
+
+def announce_late_solve(channel, solved_by, name):
+    guess_limiter.stats["late_solves"] += 1
+    if channel.id in late_solvers:
+        late_solvers[channel.id].append(name)
+    else:
+        late_solvers[channel.id] = [name]
+        asyncio.create_task(send_late_solves(channel, solved_by))
+
+async def send_late_solves(channel, solved_by):
+    try:
+        await asyncio.sleep(LATE_SOLVE_WINDOW)
+    finally:
+        names = late_solvers.pop(channel.id)
+    guess_limiter.stats["late_solve_messages"] += 1
+    if len(names) == 1:
+        await channel.send(f"✅ That’s correct, but {solved_by} already solved it!")
+    else:
+        shown = ", ".join(names[:10]) + (f" and {len(names) - 10} others" if len(names) > 10 else "")
+        await channel.send(f"✅ {shown} got it too, but {solved_by} already solved it!")
+
+async def react(message, emoji):
+    if not guess_limiter.allow_reaction(message.channel.id):
+        return
+    try:
+        await message.add_reaction(emoji)
+    except discord.HTTPException:
+        pass
+
+class NameResolver:
+    # User ID -> name for the leaderboards. Tries the gateway member and user
+    # caches, then names fetched earlier (kept for `ttl` seconds), and only
+    # then REST, with at most `concurrency` requests in flight.
+    def __init__(self, client, ttl=600, concurrency=5):
+        self.client = client
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.semaphore = None
+        self.cache = {}
+        self.fetches = 0
+
+    def cached(self, uid, guild=None):
+        member = guild.get_member(uid) if guild else None
+        if member:
+            return member.name
+        user = self.client.get_user(uid)
+        if user:
+            return user.name
+        entry = self.cache.get(uid)
+        if entry and entry[1] > time_module.monotonic():
+            return entry[0]
+        return None
+
+    async def _fetch(self, uid):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        async with self.semaphore:
+            self.fetches += 1
+            try:
+                user = await self.client.fetch_user(uid)
+            except discord.HTTPException:
+                return str(uid)
+        self.cache[uid] = (user.name, time_module.monotonic() + self.ttl)
+        return user.name
+
+    async def resolve(self, uids, guild=None):
+        names = {uid: self.cached(uid, guild) for uid in uids}
+        missing = [uid for uid, name in names.items() if name is None]
+        if missing:
+            # Drop expired entries while we're here so the cache can't grow forever
+            now = time_module.monotonic()
+            self.cache = {uid: entry for uid, entry in self.cache.items() if entry[1] > now}
+            for uid, name in zip(missing, await asyncio.gather(*(self._fetch(uid) for uid in missing))):
+                names[uid] = name
+        return names
+
+name_resolver = NameResolver(bot, NAME_CACHE_TTL, NAME_FETCH_CONCURRENCY)
+
+# Ticket transcripts
+def format_transcript_message(message):
+    timestamp = message.created_at.strftime('%Y-%m-%d %H:%M')
+    lines = [f"[{timestamp}] {message.author.display_name}: {message.content}"]
+    for attachment in message.attachments:
+        lines.append(f"    📎 {attachment.filename}: {attachment.url}")
+    for embed in message.embeds:
+        parts = [embed.title, embed.description, embed.url]
+        lines.append("    🔗 Embed: " + " | ".join(p for p in parts if p))
+    return "\n".join(lines) + "\n"
+
+class TranscriptWriter:
+    # Messages are written out as they come in. Each part is spooled in memory
+    # up to spool_size, then on disk, and a new part starts after part_size
+    # bytes of text, so memory stays flat however long the ticket is.
+    def __init__(self, name, part_size, spool_size, compress=False):
+        self.name = name
+        self.part_size = part_size
+        self.spool_size = spool_size
+        self.compress = compress
+        self.parts = []
+        self.raw = None
+        self.out = None
+        self.part_bytes = 0
+        self.messages = 0
+
+    def _open_part(self):
+        self.raw = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        self.out = gzip.GzipFile(fileobj=self.raw, mode='wb') if self.compress else self.raw
+        self.part_bytes = 0
+
+    def _close_part(self):
+        if self.compress:
+            self.out.close()  # flushes the gzip trailer, leaves raw open
+        self.raw.seek(0)
+        self.parts.append(self.raw)
+        self.raw = self.out = None
+
+    def write(self, text):
+        data = text.encode()
+        if self.raw is None:
+            self._open_part()
+        elif self.part_bytes and self.part_bytes + len(data) > self.part_size:
+            self._close_part()
+            self._open_part()
+        self.out.write(data)
+        self.part_bytes += len(data)
+
+    def add(self, message):
+        text = format_transcript_message(message)
+        self.write(text)
+        self.messages += 1
+        return text
+
+    def files(self):
+        if not self.messages and self.raw is None:
+            self.write("(No messages in ticket)")
+        self._close_part()
+        suffix = ".txt.gz" if self.compress else ".txt"
+        if len(self.parts) == 1:
+            names = [f"transcript-{self.name}{suffix}"]
+        else:
+            names = [f"transcript-{self.name}.part{i}{suffix}" for i in range(1, len(self.parts) + 1)]
+        # SpooledTemporaryFile is only an io.IOBase from Python 3.11; hand older
+        # versions the BytesIO/temp file underneath instead
+        fps = [part if isinstance(part, io.IOBase) else part._file for part in self.parts]
+        return [discord.File(fp=fp, filename=filename) for fp, filename in zip(fps, names)]
+
+    def close(self):
+        for part in self.parts + ([self.raw] if self.raw else []):
+            part.close()
+
+UPLOAD_HEADROOM = 64 * 1024  # bytes left for the message text and multipart framing
+
+def upload_limit(guild):
+    # Total bytes of attachments one message can carry in this guild
+    return getattr(guild, "filesize_limit", discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES) - UPLOAD_HEADROOM
+
+def upload_batches(files, limit):
+    # Files grouped into messages of at most 10 attachments and `limit` bytes
+    batch, size = [], 0
+    for f in files:
+        f.fp.seek(0, os.SEEK_END)
+        length = f.fp.tell()
+        f.fp.seek(0)
+        if batch and (len(batch) == 10 or size + length > limit):
+            yield batch
+            batch, size = [], 0
+        batch.append(f)
+        size += length
+    if batch:
+        yield batch
+
+@metrics.timed("transcript")
+async def build_transcript(channel, archived=None):
+    # No part may be bigger than one upload
+    part_size = min(TRANSCRIPT_PART_SIZE, upload_limit(getattr(channel, "guild", None)))
+    writer = TranscriptWriter(channel.name, part_size, TRANSCRIPT_SPOOL_SIZE, TRANSCRIPT_GZIP)
+    try:
+        # history() fetches 100 messages per request; each page is written out before the next
+        async for message in channel.history(limit=None, oldest_first=True):
+            text = writer.add(message)
+            if archived:
+                archived.add(message, text)
+        return writer.files()
+    except BaseException:
+        writer.close()
+        raise
+
+# Closed-ticket archive (TICKET_ARCHIVE). Transcripts are kept zlib-compressed
+# with an FTS5 index over channel name, topic, authors and text. The index
+# is contentless, so the text is only stored once, compressed. A ticket's
+# metadata and each ~256 KB chunk of its text are separate index rows, with
+# rowid = ticket ID << 12 | chunk; every search term is matched on its own
+# and the ticket IDs intersected, so terms can come from different rows.
+SEARCH_WORD = re.compile(r"\w+")
+
+class ArchivedTicket:
+    # Filled in by build_transcript on the loop (text goes to a spool file),
+    # then saved by TicketArchive.save in a thread
+    def __init__(self, guild_id, channel, closed_by):
+        self.guild_id = guild_id
+        self.channel = channel.name
+        self.topic = getattr(channel, "topic", None) or ""
+        self.closed_by = closed_by
+        self.closed_at = discord.utils.utcnow().isoformat()
+        self.authors = {}
+        self.messages = 0
+        self.text = tempfile.SpooledTemporaryFile(max_size=TRANSCRIPT_SPOOL_SIZE)
+
+    def add(self, message, text):
+        self.authors[message.author.display_name] = None
+        self.text.write(text.encode())
+        self.messages += 1
+
+class TicketArchive:
+    CHUNK = 256 * 1024
+    MAX_CHUNKS = 4095
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.saving = set()
+
+    def connect(self):
+        # On first use, under the lock; nothing is created until a ticket is closed or searched
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA busy_timeout=5000")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS tickets (id INTEGER PRIMARY KEY, guild_id INTEGER NOT NULL, "
+                              "channel TEXT, topic TEXT, authors TEXT, closed_by TEXT, closed_at TEXT NOT NULL, "
+                              "messages INTEGER, size INTEGER, transcript BLOB)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS tickets_closed ON tickets (guild_id, closed_at)")
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS ticket_text USING fts5("
+                              "channel, topic, authors, content, content='', tokenize='porter unicode61')")
+        return self.conn
+
+    def save_later(self, ticket):
+        task = asyncio.create_task(asyncio.to_thread(self.save, ticket))
+        self.saving.add(task)
+        task.add_done_callback(self._saved)
+        return task
+
+    def _saved(self, task):
+        self.saving.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"⚠️ Couldn't archive a ticket transcript: {task.exception()}")
+
+    def save(self, ticket):
+        compressor = zlib.compressobj(6)
+        blob, size = [], 0
+        ticket.text.seek(0)
+        try:
+            with self.lock:
+                self.connect().execute("BEGIN IMMEDIATE")
+                try:
+                    tid = self.conn.execute(
+                        "INSERT INTO tickets (guild_id, channel, topic, authors, closed_by, closed_at, messages) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (ticket.guild_id, ticket.channel, ticket.topic, ", ".join(ticket.authors), ticket.closed_by,
+                         ticket.closed_at, ticket.messages)).lastrowid
+                    self.conn.execute("INSERT INTO ticket_text (rowid, channel, topic, authors, content) VALUES (?, ?, ?, ?, '')",
+                                      (tid << 12, ticket.channel, ticket.topic, " ".join(ticket.authors)))
+                    chunk = 1
+                    while True:
+                        # Chunks end on a line break, so no word or character is cut in two
+                        data = ticket.text.read(self.CHUNK) + ticket.text.readline()
+                        if not data:
+                            break
+                        blob.append(compressor.compress(data))
+                        size += len(data)
+                        if chunk <= self.MAX_CHUNKS:  # past ~1 GB the text is kept but not indexed
+                            self.conn.execute("INSERT INTO ticket_text (rowid, content) VALUES (?, ?)",
+                                              (tid << 12 | chunk, data.decode(errors="replace")))
+                        chunk += 1
+                    blob.append(compressor.flush())
+                    self.conn.execute("UPDATE tickets SET transcript = ?, size = ? WHERE id = ?", (b"".join(blob), size, tid))
+                    self.conn.execute("COMMIT")
+                except BaseException:
+                    self.conn.execute("ROLLBACK")
+                    raise
+        finally:
+            ticket.text.close()
+        return tid
+
+    @staticmethod
+    def _match(column, text):
+        return [f'{column}"{word}"' for word in SEARCH_WORD.findall(text.lower())] if text else []
+
+    def search(self, guild_id, query=None, author=None, date=None, page=0, size=10):
+        # Returns (total matches, rows for the page), newest first; each row ends with a matching line
+        terms = self._match("", query) + self._match("authors : ", author)
+        where = ["guild_id = ?"] + ["id IN (SELECT rowid >> 12 FROM ticket_text WHERE ticket_text MATCH ?)"] * len(terms)
+        args = [guild_id] + terms
+        if date:
+            where.append("closed_at LIKE ?")
+            args.append(date + "%")
+        where = " AND ".join(where)
+        with self.lock:
+            total = self.connect().execute(f"SELECT COUNT(*) FROM tickets WHERE {where}", args).fetchone()[0]
+            rows = self.conn.execute(
+                f"SELECT id, channel, topic, authors, closed_by, closed_at, messages, transcript FROM tickets "
+                f"WHERE {where} ORDER BY closed_at DESC, id DESC LIMIT ? OFFSET ?", args + [size, page * size]).fetchall()
+        words = SEARCH_WORD.findall(query.lower()) if query else []
+        return total, [row[:-1] + (self.matching_line(row[-1], words),) for row in rows]
+
+    @staticmethod
+    def matching_line(blob, words):
+        # First transcript line containing a search word, decompressed only as far as needed
+        decompressor = zlib.decompressobj()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        first, rest = None, ""
+        for i in range(0, len(blob or b""), 64 * 1024):
+            rest += decoder.decode(decompressor.decompress(blob[i:i + 64 * 1024]))
+            *lines, rest = rest.split("\n")
+            for line in lines:
+                first = first or line
+                if not words or any(word in line.lower() for word in words):
+                    return line
+        return rest if rest and (not words or any(word in rest.lower() for word in words)) else first
+
+ticket_archive = TicketArchive(TICKET_ARCHIVE) if TICKET_ARCHIVE else None
+
+# Tickets. The "Tickets" category is looked up (or created) once per guild
+# under a per-guild lock and then reused by ID, so a rush of clicks can't
+# create duplicates. With TICKET_SPARES set, a few hidden channels are made
+# ahead of time and a ticket only has to rename one and set its permissions.
+TICKET_CATEGORY = "Tickets"
+SPARE_TICKET_NAME = "spare-ticket"
+
+class TicketService:
+    def __init__(self, spare_count=0):
+        self.spare_count = spare_count
+        self.category_ids = {}
+        self.locks = defaultdict(asyncio.Lock)
+        self.spares = defaultdict(deque)
+        self.refills = {}
+
+    async def category(self, guild):
+        category = guild.get_channel(self.category_ids.get(guild.id, 0))
+        if category:
+            return category
+        async with self.locks[guild.id]:
+            # Whoever held the lock before us may have just made it
+            category = guild.get_channel(self.category_ids.get(guild.id, 0))
+            if category:
+                return category
+            category = discord.utils.get(guild.categories, name=TICKET_CATEGORY) or await guild.create_category(TICKET_CATEGORY)
+            self.category_ids[guild.id] = category.id
+            # Spares left over from before a restart
+            self.spares[guild.id] = deque(c.id for c in category.text_channels if c.name == SPARE_TICKET_NAME)
+            return category
+
+    def overwrites(self, guild, user, topic):
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(view_channel=False),
+            user: discord.PermissionOverwrite(view_channel=True, send_messages=True),
+            guild.me: discord.PermissionOverwrite(view_channel=True)
+        }
+        role = guild.get_role(config.get("TOPIC_MAP", {}).get(topic.replace(" ", "_")) or 0)
+        if role:
+            overwrites[role] = discord.PermissionOverwrite(view_channel=True)
+        return overwrites
+
+    def take_spare(self, guild):
+        spares = self.spares[guild.id]
+        while spares:
+            channel = guild.get_channel(spares.popleft())
+            if channel:
+                return channel
+        return None
+
+    async def open(self, guild, user, topic):
+        name = f"ticket-{user.name}"
+        overwrites = self.overwrites(guild, user, topic)
+        category = await self.category(guild)
+        channel = self.take_spare(guild)
+        # The topic is kept on the channel itself, for the archive when the ticket closes
+        if channel:
+            await channel.edit(name=name, overwrites=overwrites, topic=topic.capitalize())
+        else:
+            channel = await category.create_text_channel(name=name, overwrites=overwrites, topic=topic.capitalize())
+        self.refill(guild)
+        return channel
+
+    def refill(self, guild):
+        if len(self.spares[guild.id]) < self.spare_count and guild.id not in self.refills:
+            self.refills[guild.id] = asyncio.create_task(self._refill(guild))
+
+    async def _refill(self, guild):
+        try:
+            category = await self.category(guild)
+            hidden = {
+                guild.default_role: discord.PermissionOverwrite(view_channel=False),
+                guild.me: discord.PermissionOverwrite(view_channel=True)
+            }
+            while len(self.spares[guild.id]) < self.spare_count:
+                channel = await category.create_text_channel(name=SPARE_TICKET_NAME, overwrites=hidden)
+                self.spares[guild.id].append(channel.id)
+        except discord.HTTPException as e:
+            print(f"⚠️ Couldn't create spare ticket channels in {guild.id}: {e}")
+        finally:
+            del self.refills[guild.id]
+
+tickets = TicketService(TICKET_SPARES)
 
 # Ticket System UI
 class TicketPanelView(View):
@@ -183,24 +2696,14 @@ class TicketPanelView(View):
         await self.create_ticket(interaction, "event information")
 
     async def create_ticket(self, interaction, topic):
-        role_id = config.get("TOPIC_MAP", {}).get(topic.replace(" ", "_"))
-        guild = interaction.guild
-
-        overwrites = {
-            guild.default_role: discord.PermissionOverwrite(view_channel=False),
-            interaction.user: discord.PermissionOverwrite(view_channel=True, send_messages=True),
-            guild.me: discord.PermissionOverwrite(view_channel=True)
-        }
-
-        if role_id:
-            role = guild.get_role(role_id)
-            if role:
-                overwrites[role] = discord.PermissionOverwrite(view_channel=True)
-
-        category = discord.utils.get(guild.categories, name="Tickets") or await guild.create_category("Tickets")
-        channel = await category.create_text_channel(name=f"ticket-{interaction.user.name}", overwrites=overwrites)
+        # Answer inside the interaction deadline first; making the channel takes a few REST calls
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            channel = await tickets.open(interaction.guild, interaction.user, topic)
+        except discord.HTTPException as e:
+            return await interaction.followup.send(f"❌ Couldn't create the ticket: {e.text or e}", ephemeral=True)
         await channel.send(f"{interaction.user.mention}, your ticket has been created.", view=ClaimView())
-        await interaction.response.send_message(f"✅ Created ticket: {channel.mention}", ephemeral=True)
+        await interaction.followup.send(f"✅ Created ticket: {channel.mention}", ephemeral=True)
 
 class ClaimView(View):
     def __init__(self):
@@ -214,21 +2717,19 @@ class ClaimView(View):
 
     @discord.ui.button(label="Close Ticket", style=discord.ButtonStyle.danger, custom_id="close_ticket")
     async def close(self, interaction: discord.Interaction, button: Button):
-        await interaction.response.send_message("🛑 Closing ticket in 15 seconds...")
-        await asyncio.sleep(15)
-
-        transcript = []
-        async for message in interaction.channel.history(limit=None, oldest_first=True):
-            timestamp = message.created_at.strftime('%Y-%m-%d %H:%M')
-            transcript.append(f"[{timestamp}] {message.author.display_name}: {message.content}")
-
-        transcript_text = "\n".join(transcript) or "(No messages in ticket)"
-        transcript_file = discord.File(
-            fp=io.StringIO(transcript_text),
-            filename=f"transcript-{interaction.channel.name}.txt"
-        )
+        await interaction.response.send_message(f"🛑 Closing ticket in {TICKET_CLOSE_DELAY} seconds...")
+        await asyncio.sleep(TICKET_CLOSE_DELAY)
+
+        archived = ArchivedTicket(interaction.guild.id, interaction.channel, interaction.user.name) if ticket_archive else None
+        try:
+            transcript_files = await build_transcript(interaction.channel, archived)
+        except BaseException:
+            if archived:
+                archived.text.close()
+            raise
+        if archived:
+            ticket_archive.save_later(archived)  # compressed and indexed in a thread while the upload goes on
 
-        config = load_json(CONFIG_FILE, {})
         closed_log_channel_id = config.get("CLOSED_TICKETS_CHANNEL_ID")
         archive_channel_id = config.get("TICKET_ARCHIVE_CHANNEL_ID")
 
@@ -243,46 +2744,118 @@ class ClaimView(View):
             )
             await closed_log_channel.send(embed=embed)
 
-        if archive_channel:
-            await archive_channel.send(
-                content=f"📎 Transcript for `{interaction.channel.name}`",
-                file=transcript_file
-            )
+        try:
+            if archive_channel:
+                for batch in upload_batches(transcript_files, upload_limit(interaction.guild)):
+                    await archive_channel.send(
+                        content=f"📎 Transcript for `{interaction.channel.name}`",
+                        files=batch
+                    )
+        finally:
+            for f in transcript_files:
+                f.close()
+                f.fp.close()  # File.close() leaves a file object it was handed open
         await interaction.channel.delete()
 
 
+class TicketSearchView(View):
+    PAGE_SIZE = 10
+
+    def __init__(self, user, guild_id, query=None, author=None, date=None):
+        super().__init__(timeout=300)
+        self.user = user
+        self.search = (guild_id, query, author, date)
+        self.page = 0
+        self.prev = Button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+        self.prev.callback = self.flip(-1)
+        self.next = Button(label="Next ▶", style=discord.ButtonStyle.secondary)
+        self.next.callback = self.flip(1)
+        self.add_item(self.prev)
+        self.add_item(self.next)
+
+    async def render(self):
+        total, rows = await asyncio.to_thread(ticket_archive.search, *self.search, self.page, self.PAGE_SIZE)
+        pages = math.ceil(total / self.PAGE_SIZE)
+        self.prev.disabled = self.page == 0
+        self.next.disabled = self.page >= pages - 1
+        if not total:
+            return "🔎 No archived tickets match."
+        lines = [f"🔎 {total} archived tickets (page {self.page + 1}/{pages}):"]
+        for _, channel, topic, authors, closed_by, closed_at, messages, line in rows:
+            lines.append(f"**{channel}** · {topic or 'no topic'} · closed {closed_at[:10]} by {closed_by} · {messages} messages")
+            lines.append(f"> {discord.utils.escape_markdown((line or '')[:150])}")
+        return "\n".join(lines)[:2000]
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.user.id:
+            await interaction.response.send_message("❌ Only the command user can page through these.", ephemeral=True)
+            return False
+        return True
+
+    def flip(self, step):
+        async def callback(interaction: discord.Interaction):
+            self.page = max(0, self.page + step)
+            await interaction.response.edit_message(content=await self.render(), view=self)
+        return callback
+
+
 # Riddle Commands
 @tree.command(name="setup", description="Set riddle and ticket panel channels")
 @app_commands.checks.has_permissions(administrator=True)
 @app_commands.describe(
     riddle_channel="Channel for daily riddles",
-    ticket_channel="Channel to post the ticket panel"
+    ticket_channel="Channel to post the ticket panel",
+    post_time="Time to post the daily riddle, HH:MM in UTC (default 00:00)",
+    riddle_role="Role to ping when a riddle is posted"
 )
-async def setup(interaction: discord.Interaction, riddle_channel: discord.TextChannel, ticket_channel: discord.TextChannel):
-    config["RIDDLE_CHANNEL_ID"] = riddle_channel.id
-    guild_id = str(interaction.guild_id)
-    if guild_id not in config:
-        config[guild_id] = {}
-    config[guild_id]["ticket_display"] = ticket_channel.id
-    save_json(CONFIG_FILE, config)
-    await interaction.response.send_message(f"✅ Setup complete:\n- Riddle Channel: {riddle_channel.mention}\n- Ticket Panel Channel: {ticket_channel.mention}", ephemeral=True)
+@metrics.timed("/setup")
+async def setup(interaction: discord.Interaction, riddle_channel: discord.TextChannel, ticket_channel: discord.TextChannel,
+                post_time: str = "00:00", riddle_role: discord.Role = None):
+    try:
+        post_at = parse_post_time(post_time)
+    except ValueError:
+        return await interaction.response.send_message("❌ Post time must look like 18:30.", ephemeral=True)
+    config.update_guild(
+        interaction.guild_id,
+        ticket_display=ticket_channel.id,
+        riddle_channel=riddle_channel.id,
+        riddle_time=post_at.strftime("%H:%M"),
+        riddle_role=riddle_role.id if riddle_role else None
+    )
+    await interaction.response.send_message(f"✅ Setup complete:\n- Riddle Channel: {riddle_channel.mention} (daily at {post_at.strftime('%H:%M')} UTC)\n- Ticket Panel Channel: {ticket_channel.mention}", ephemeral=True)
 
 @tree.command(name="current", description="Show the current riddle")
+@metrics.timed("/current")
 async def current(interaction: discord.Interaction):
-    config = load_json(CONFIG_FILE, {})
-    riddle = config.get("CURRENT_RIDDLE")
+    current_riddle = config.guild(interaction.guild_id).riddle
+    riddle = riddle_bank.get(current_riddle.id) if current_riddle and not current_riddle.solved_by else None
     if not riddle:
         return await interaction.response.send_message("❌ No active riddle.", ephemeral=True)
     await interaction.response.send_message(f"🧩 **Current Riddle:** {riddle['question']}")
 
-@tree.command(name="delriddle", description="Delete a riddle by selecting from the list")
+@tree.command(name="delriddle", description="Delete a riddle (admin only)")
 @app_commands.checks.has_permissions(administrator=True)
-async def delriddle(inter: discord.Interaction):
-    if not riddles:
+@app_commands.describe(riddle="Start typing to search; leave empty to browse page by page")
+@metrics.timed("/delriddle")
+async def delriddle(inter: discord.Interaction, riddle: str = None):
+    if not riddle_bank:
         return await inter.response.send_message("❌ No riddles to delete.", ephemeral=True)
-    await inter.response.send_message("🧩 Select a riddle to delete:", view=RiddleSelectView(inter), ephemeral=True)
+    if riddle is None:
+        view = RiddleDeleteView(inter.user)
+        return await inter.response.send_message(view.render(), view=view, ephemeral=True)
+    removed = riddle_bank.remove(int(riddle)) if riddle.isdigit() else None
+    if not removed:
+        return await inter.response.send_message("❌ Pick a riddle from the suggestions.", ephemeral=True)
+    save_json(RIDDLES_FILE, riddle_bank)
+    await inter.response.send_message(f"🗑️ Deleted: {removed['question']}", ephemeral=True)
+
+@delriddle.autocomplete("riddle")
+@metrics.timed("/delriddle autocomplete")
+async def delriddle_autocomplete(inter: discord.Interaction, current: str):
+    return [app_commands.Choice(name=r["question"][:100], value=str(r["id"])) for r in riddle_bank.search(current, 25)]
 
 @tree.command(name="score", description="Check your riddle score.")
+@metrics.timed("/score")
 async def score(interaction: discord.Interaction):
     score = scores.get(str(interaction.user.id), 0)
     await interaction.response.send_message(f"🏆 Your score is: **{score}**", ephemeral=True)
@@ -290,21 +2863,63 @@ async def score(interaction: discord.Interaction):
 @tree.command(name="addriddle", description="Add a new riddle (admin only)")
 @app_commands.checks.has_permissions(administrator=True)
 @app_commands.describe(prompt="The riddle question", answer="The correct answer to the riddle")
+@metrics.timed("/addriddle")
 async def addriddle(interaction: discord.Interaction, prompt: str, answer: str):
-    riddles.append({"question": prompt, "answer": answer})
-    save_json(RIDDLES_FILE, riddles)
+    if riddle_bank.find_duplicate(prompt):
+        return await interaction.response.send_message("⚠️ That riddle is already in the bank.", ephemeral=True)
+    riddle_bank.add({"question": prompt, "answer": answer})
+    save_json(RIDDLES_FILE, riddle_bank)
     await interaction.response.send_message("✅ Riddle added.", ephemeral=True)
 
+@tree.command(name="importriddles", description="Import riddles from a JSON, JSONL or CSV file (admin only)")
+@app_commands.checks.has_permissions(administrator=True)
+@app_commands.describe(file="JSON array or JSONL of question/answer objects, or CSV with question,answer columns")
+@metrics.timed("/importriddles")
+async def importriddles(interaction: discord.Interaction, file: discord.Attachment):
+    fmt = RIDDLE_IMPORT_FORMATS.get(os.path.splitext(file.filename)[1].lower())
+    if not fmt:
+        return await interaction.response.send_message("❌ Upload a .json, .jsonl or .csv file.", ephemeral=True)
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    source = json_array_items(attachment_text(file)) if fmt == "json" else attachment_lines(file)
+    try:
+        counts = await import_riddles(riddle_bank, source, fmt)
+    except (aiohttp.ClientError, UnicodeDecodeError, ValueError) as e:
+        # Riddles read before the error are kept
+        counts = None
+        error = e
+    if riddle_bank.changes:
+        save_json(RIDDLES_FILE, riddle_bank)
+    if counts is None:
+        return await interaction.followup.send(f"❌ Import stopped: {error}", ephemeral=True)
+    await interaction.followup.send(
+        f"📥 Added {counts['added']} riddles, skipped {counts['duplicates']} duplicates and {counts['invalid']} invalid lines.",
+        ephemeral=True)
+
 @tree.command(name="leaderboard", description="Show top 10 riddle masters")
+@metrics.timed("/leaderboard")
 async def leaderboard(inter: discord.Interaction):
     if not scores:
         return await inter.response.send_message("🏆 No scores yet.", ephemeral=True)
-    top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:10]
+    top = score_ranks.top(10)
     lines = [f"{i+1}. <@{uid}> — {pts} pts" for i, (uid, pts) in enumerate(top)]
     await inter.response.send_message("**🏆 Top 10 Riddle Masters**\n" + "\n".join(lines))
 
+@tree.command(name="rank", description="Show your riddle and word game rank")
+@metrics.timed("/rank")
+async def rank(interaction: discord.Interaction):
+    uid = str(interaction.user.id)
+    lines = []
+    for label, data, ranks in (("🧩 Riddles", scores, score_ranks), ("🔤 Word game", scoreboard, scoreboard_ranks)):
+        place = ranks.rank(uid)
+        if place:
+            lines.append(f"{label}: #{place} of {len(ranks)} with **{data[uid]}** pts")
+        else:
+            lines.append(f"{label}: not ranked yet")
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
 @tree.command(name="post_riddle", description="Post a new riddle immediately (admin only)")
 @app_commands.checks.has_permissions(administrator=True)
+@metrics.timed("/post_riddle")
 async def post_riddle(interaction: discord.Interaction):
     global last_riddle_command_time
     now = time_module.time()
@@ -312,155 +2927,126 @@ async def post_riddle(interaction: discord.Interaction):
         return await interaction.response.send_message("⏳ Please wait before trying again.", ephemeral=True)
 
     last_riddle_command_time = now
-    config = load_json(CONFIG_FILE, {})
-    channel = bot.get_channel(config.get("RIDDLE_CHANNEL_ID"))
-    if not channel or not riddles:
+    channel = bot.get_channel(config.guild(interaction.guild_id).riddle_channel)
+    if not channel or not riddle_bank:
         return await interaction.response.send_message("❌ Can't post riddle. Channel or riddles missing.", ephemeral=True)
 
-    riddle = random.choice(riddles)
-    riddle["solved_by"] = None
-    config["CURRENT_RIDDLE"] = riddle
-    config["LAST_RIDDLE_TIME"] = discord.utils.utcnow().isoformat()
-    save_json(CONFIG_FILE, config)
-
-    role = 1395573526823440464
-    mention = f"<@&{role}>" if role else ""
-    await channel.send(f"{mention} 🧠 **Riddle of the Day:** {riddle['question']}")
+    await post_riddle_to(interaction.guild_id, channel)
     await interaction.response.send_message("✅ Riddle posted.", ephemeral=True)
 
 # Combined on_message
 
 @bot.event
+@metrics.timed("on_message")
 async def on_message(message):
-    global guessed_letters, attempts_remaining, game_running, current_word, display_word
-
     if message.author.bot:
         return
 
     await bot.process_commands(message)
 
-    current_riddle = config.get("CURRENT_RIDDLE")
-    riddle_channel_id = 1378486916407758888
-    if current_riddle and message.channel.id == riddle_channel_id:
-        expected_answer = current_riddle["answer"]
-        similarity = nltk_similarity(expected_answer, message.content)
-
-@bot.event
-async def on_message(message):
-    global guessed_letters, attempts_remaining, game_running, current_word, display_word, riddles, config
-
-    if message.author.bot:
-        return
-
-    await bot.process_commands(message)
-
-    current_riddle = config.get("CURRENT_RIDDLE")
-    riddle_channel_id = 1378486916407758888  # still hardcoded — consider moving to config
-    if current_riddle and message.channel.id == riddle_channel_id:
-        expected_answer = current_riddle["answer"]
-        similarity = nltk_similarity(expected_answer, message.content)
-
-        if similarity >= 1.0:
+    section = config.guild(message.guild.id) if message.guild else None
+    current_riddle = section.riddle if section else None
+    matcher = None
+    if current_riddle and message.channel.id == section.riddle_channel:
+        matcher = riddle_matcher_for(current_riddle.id)
+    if matcher and await guess_limiter.admit(message.channel.id, message.author.id):
+        start = time_module.perf_counter()
+        correct = await nlp_pool.run(message.channel.id, (await matcher).matches, message.content)
+        metrics.observe("riddle_check", (time_module.perf_counter() - start) * 1000)
+        # The guess was checked against the snapshot from before the await; look again
+        posted = config.guild(message.guild.id).riddle
+        if correct and (not posted or posted.id != current_riddle.id):
+            pass  # A new riddle went up while this guess was being checked
+        elif correct:
             # ✅ Exact or full match
-            if current_riddle.get("solved_by"):
-                await message.channel.send(f"✅ That’s correct, but {current_riddle['solved_by']} already solved it!")
+            if SHARED_STATE and not posted.solved_by:
+                # Another process can be handling this guild too (e.g. while shards move); the database picks the winner
+                won, winner, points = await asyncio.to_thread(storage.claim_solve, message.guild.id, posted, message.author.name,
+                                                              str(message.author.id))
+                if won:
+                    scores.point_saved(str(message.author.id), points)
+                latest = config.guild(message.guild.id).riddle
+                if not latest or latest.id != posted.id:
+                    return
+                posted = latest if won else latest._replace(solved_by=latest.solved_by or winner)
+            if posted.solved_by:
+                await react(message, "🤏")
+                announce_late_solve(message.channel, posted.solved_by, message.author.display_name)
             else:
-                current_riddle["solved_by"] = message.author.name
-                config["CURRENT_RIDDLE"] = current_riddle
-                save_json(CONFIG_FILE, config)
-
-                uid = str(message.author.id)
-                scores[uid] = scores.get(uid, 0) + 1
-                save_json(SCORES_FILE, scores)
+                config.update_guild(message.guild.id, riddle=posted._replace(
+                    solved_by=message.author.name, solved_at=discord.utils.utcnow().isoformat()))
 
-                # Remove solved riddle from list and save
-                riddles = [r for r in riddles if r.get("question") != current_riddle.get("question")]
-                save_json(RIDDLES_FILE, riddles)
+                if not SHARED_STATE:  # otherwise claim_solve already saved the point
+                    award_point(scores, score_ranks, SCORES_FILE, str(message.author.id))
 
-                # Clear current riddle
-                config["CURRENT_RIDDLE"] = None
-                save_json(CONFIG_FILE, config)
+                # Retire the solved riddle so it never comes up again
+                riddle_bank.remove(posted.id)
+                save_json(RIDDLES_FILE, riddle_bank)
 
                 await message.channel.send(f"🎉 Correct, {message.author.mention}! You've been awarded a point.")
-
-            try:
-                await message.add_reaction("🤏")
-            except:
-                pass
+                try:
+                    await message.add_reaction("🤏")
+                except discord.HTTPException:
+                    pass
         else:
-            try:
-                await message.add_reaction("❌")
-            except:
-                pass
+            await react(message, "❌")
 
     # Word guessing game mode
-    if game_running and message.channel == game_channel:
+    game = word_games.get(message.channel.id)
+    if game and game.running:
         guess = message.content.lower().strip()
+        if WORD_GAME_OUTPUT == "live":
+            return await live_word_guess(game, message, guess)
 
-        if guess == current_word.lower():
-            uid = str(message.author.id)
-            scoreboard[uid] = scoreboard.get(uid, 0) + 1
-            save_json(SCOREBOARD_FILE, scoreboard)
+        if guess == game.lower:
+            award_point(scoreboard, scoreboard_ranks, SCOREBOARD_FILE, str(message.author.id))
             await message.channel.send(f"🎉 {message.author.mention} guessed the word correctly! +1 point.")
-            pick_new_word()
-            await message.channel.send(f"🔄 New word:\n{display_word}\nAttempts remaining: {attempts_remaining}")
-            save_game_state()
+            game.next_word()
+            await message.channel.send(f"🔄 New word:\n{game.display}\nAttempts remaining: {game.attempts}")
+            save_game_state(game)
         elif len(guess) == 1 and guess.isalpha():
-            if guess in guessed_letters:
+            hit = game.guess_letter(guess)
+            if hit is None:
                 await message.reply(f"⚠️ {guess} has already been guessed.")
                 return
-            guessed_letters.append(guess)
-            if guess in current_word.lower():
-                display_word = update_display_word()
-                await message.reply(f"✅ {guess} is in the word!\n{display_word}\nAttempts: {attempts_remaining}")
-                if '\_' not in display_word:
-                    uid = str(message.author.id)
-                    scoreboard[uid] = scoreboard.get(uid, 0) + 1
-                    save_json(SCOREBOARD_FILE, scoreboard)
+            if hit:
+                await message.reply(f"✅ {guess} is in the word!\n{game.display}\nAttempts: {game.attempts}")
+                if game.solved:
+                    award_point(scoreboard, scoreboard_ranks, SCOREBOARD_FILE, str(message.author.id))
                     await message.channel.send(f"🎉 {message.author.mention} completed the word! +1 point.")
-                    pick_new_word()
-                    await message.channel.send(f"🔄 New word:\n{display_word}\nAttempts remaining: {attempts_remaining}")
+                    game.next_word()
+                    await message.channel.send(f"🔄 New word:\n{game.display}\nAttempts remaining: {game.attempts}")
             else:
-                attempts_remaining -= 1
-                await message.reply(f"❌ {guess} is not in the word.\n{display_word}\nAttempts: {attempts_remaining}")
-                if attempts_remaining <= 0:
+                await message.reply(f"❌ {guess} is not in the word.\n{game.display}\nAttempts: {game.attempts}")
+                if game.attempts <= 0:
                     await message.channel.send("💀 Out of attempts! Moving to the next word...")
-                    pick_new_word()
-                    await message.channel.send(f"🔄 New word:\n{display_word}\nAttempts remaining: {attempts_remaining}")
-            save_game_state()
+                    game.next_word()
+                    await message.channel.send(f"🔄 New word:\n{game.display}\nAttempts remaining: {game.attempts}")
+            save_game_state(game)
 
 @tasks.loop(time=time(0, 0))
 async def riddle_loop():
-    config = load_json(CONFIG_FILE, {})
-    channel = 1378486916407758888
-    if not channel:
-        return
-
-    if not riddles:
-        return await channel.send("❌ No riddles available.")
-
-    prev = config.get("CURRENT_RIDDLE")
-    if prev:
-        await channel.send(f"⏱️ Time's up! The correct answer was: **{prev['answer']}**")
-
-    riddle = random.choice(riddles)
-    riddle["solved_by"] = None
-    config["CURRENT_RIDDLE"] = riddle
-    config["LAST_RIDDLE_TIME"] = discord.utils.utcnow().isoformat()
-    save_json(CONFIG_FILE, config)
-
-    role = 1395573526823440464
-    mention = f"<@&{role}>" if role else ""
-    await channel.send(f"{mention} 🧠 **Riddle of the Day:** {riddle['question']}")
-    await channel.send("You have 24 hours to solve it!")
+    # Runs at every guild's post time; every guild that is due gets a riddle
+    now = discord.utils.utcnow()
+    for guild_id, section in riddle_guild_sections():
+        if not riddle_due(section, now):
+            continue
+        channel = bot.get_channel(section.riddle_channel)
+        if not channel:
+            continue
+        if not riddle_bank:
+            await channel.send("❌ No riddles available.")
+            continue
+        await post_riddle_to(guild_id, channel, announce_previous=True)
+        await channel.send("You have 24 hours to solve it!")
 
 
 # Additional Commands
 @tree.command(name="ticketpanel", description="Post the ticket panel (admin only)")
 @app_commands.checks.has_permissions(administrator=True)
+@metrics.timed("/ticketpanel")
 async def ticketpanel(inter: discord.Interaction):
-    cfg = config.get(str(inter.guild_id), {})
-    channel_id = cfg.get("ticket_display")
+    channel_id = config.guild(inter.guild_id).ticket_display
     channel = bot.get_channel(channel_id) if channel_id else None
 
     if not channel:
@@ -476,43 +3062,97 @@ async def ticketpanel(inter: discord.Interaction):
 
 @tree.command(name="startgame", description="Start the word guessing game")
 @app_commands.checks.has_permissions(administrator=True)
-async def startgame(inter: discord.Interaction):
-    global game_running, game_channel
-    if game_running:
+@app_commands.describe(difficulty="Word difficulty (default: any)")
+@app_commands.choices(difficulty=[app_commands.Choice(name=d.title(), value=d) for d in WORD_DIFFICULTIES])
+@metrics.timed("/startgame")
+async def startgame(inter: discord.Interaction, difficulty: app_commands.Choice[str] = None):
+    game = word_games.get(inter.channel_id)
+    if game and game.running:
         await inter.response.send_message("⚠️ The game is already running.", ephemeral=True)
     else:
-        game_running = True
-        game_channel = inter.channel
-        pick_new_word()
-        await inter.response.send_message(f"✅ Game started!\n{display_word}\nAttempts: {attempts_remaining}")
-        save_game_state()
+        cursor = word_pool.cursor(difficulty.value if difficulty else None)
+        game = word_games[inter.channel_id] = WordGame(inter.channel_id, cursor.next(), cursor=cursor)
+        await inter.response.send_message(f"✅ Game started!\n{game.display}\nAttempts: {game.attempts}")
+        save_game_state(game)
 
 @tree.command(name="stopgame", description="Stop the word guessing game")
 @app_commands.checks.has_permissions(administrator=True)
+@metrics.timed("/stopgame")
 async def stopgame(inter: discord.Interaction):
-    global game_running
-    if not game_running:
+    game = word_games.pop(inter.channel_id, None)
+    if not game or not game.running:
         await inter.response.send_message("⚠️ No game is running.", ephemeral=True)
     else:
-        game_running = False
+        game.running = False
         await inter.response.send_message("🛑 Game stopped.")
-        save_game_state()
+        delete_game_state(game.channel_id)
+        if game.status:
+            game.status.refresh()
+
+@tree.command(name="searchtickets", description="Search closed ticket transcripts (admin only)")
+@app_commands.checks.has_permissions(administrator=True)
+@app_commands.describe(query="Words from the conversation, channel name or topic", author="Someone who wrote in the ticket",
+                       date="Day, month or year it was closed: 2025-01-31, 2025-01 or 2025")
+@metrics.timed("/searchtickets")
+async def searchtickets(interaction: discord.Interaction, query: str = None, author: str = None, date: str = None):
+    if not ticket_archive:
+        return await interaction.response.send_message("❌ The ticket archive is turned off.", ephemeral=True)
+    if date and not re.fullmatch(r"\d{4}(-\d{2}){0,2}", date):
+        return await interaction.response.send_message("❌ Date must look like 2025-01-31, 2025-01 or 2025.", ephemeral=True)
+    view = TicketSearchView(interaction.user, interaction.guild_id, query, author, date)
+    content = await view.render()
+    await interaction.response.send_message(content, view=view if not (view.prev.disabled and view.next.disabled) else None,
+                                            ephemeral=True)
 
 @tree.command(name="scoreboard", description="Show the word guessing scoreboard")
+@metrics.timed("/scoreboard")
 async def scoreboard_command(inter: discord.Interaction):
     if not scoreboard:
         await inter.response.send_message("📭 No scores yet.")
         return
 
-    sorted_scores = sorted(scoreboard.items(), key=lambda x: x[1], reverse=True)
-    lines = []
-    for i, (uid, score) in enumerate(sorted_scores[:10], 1):
-        user = await bot.fetch_user(int(uid))
-        lines.append(f"{i}. {user.name}: {score}")
+    top = scoreboard_ranks.top(10)
+    resolving = asyncio.ensure_future(name_resolver.resolve([int(uid) for uid, _ in top], inter.guild))
+    # Answer within the interaction deadline even when Discord is slow
+    done, _ = await asyncio.wait({resolving}, timeout=NAME_DEFER_AFTER)
+    if not done:
+        await inter.response.defer(thinking=True)
+    names = await resolving
+    lines = [f"{i}. {names[int(uid)]}: {score}" for i, (uid, score) in enumerate(top, 1)]
+
+    content = "🏆 **Top Word Guessers:**\n" + "\n".join(lines)
+    if inter.response.is_done():
+        await inter.followup.send(content)
+    else:
+        await inter.response.send_message(content)
 
-    await inter.response.send_message("🏆 **Top Word Guessers:**\n" + "\n".join(lines))
+@tree.command(name="botstats", description="Show performance metrics (admin only)")
+@app_commands.checks.has_permissions(administrator=True)
+@metrics.timed("/botstats")
+async def botstats(inter: discord.Interaction):
+    if not metrics.enabled:
+        return await inter.response.send_message("📊 Metrics are turned off (METRICS=false).", ephemeral=True)
+    report = metrics.report()
+    extra = (f"persistence: {persistence.stats()}\nnlp cache: {normalize_cache.stats()}\nguesses: {guess_limiter.summary()}")
+    content = f"📊 **Bot stats**\n```\n{report}\n```\n{extra}"
+    if len(content) > 2000:
+        # Too long for one message; send the full text as a file instead
+        return await inter.response.send_message("📊 **Bot stats**", file=discord.File(io.BytesIO(f"{report}\n\n{extra}".encode()), filename="botstats.txt"), ephemeral=True)
+    await inter.response.send_message(content, ephemeral=True)
+
+@tree.command(name="nlpcache", description="Show NLP cache statistics (admin only)")
+@app_commands.checks.has_permissions(administrator=True)
+@metrics.timed("/nlpcache")
+async def nlpcache(inter: discord.Interaction):
+    await inter.response.send_message(f"🧮 NLP cache: {normalize_cache.stats()}", ephemeral=True)
 
 # Error Handling
+@searchtickets.error
+@importriddles.error
+@delriddle.error
+@addriddle.error
+@botstats.error
+@nlpcache.error
 @startgame.error
 @stopgame.error
 @ticketpanel.error
@@ -522,25 +3162,69 @@ async def admin_error(interaction: discord.Interaction, error):
         await interaction.response.send_message("⛔ You must be an admin to use this command.", ephemeral=True)
 
 # Bot Ready
-@client.event
-async def on_ready():
-    print(f'Logged in as {client.user} (ID: {client.user.id})')
+nlp_warmup = None
+loop_lag_sampler = None
+
+def start_nlp_warmup():
+    # Load NLTK (if needed) and warm the cache without holding up the event loop
+    global nlp_warmup
+    nlp_warmup = asyncio.create_task(asyncio.to_thread(warm_normalize_cache, riddle_bank.to_list()))
 
-    # Set a custom status
-    await client.change_presence(activity=discord.Game(name="Solving Riddles!"))
-    
 @bot.event
 async def on_ready():
-    load_game_state()
-    await tree.sync()
+    global loop_lag_sampler
+    # on_ready fires again after every reconnect
+    first_ready = not startup.finished
+    if first_ready:
+        startup.mark("connect")
+        load_game_states()
+        migrate_legacy_riddle_config()
+        if metrics.enabled:
+            metrics.count_rest_calls(bot.http)
+            loop_lag_sampler = asyncio.create_task(metrics.sample_loop_lag())
+        if NLP_PRELOAD != "lazy" or nlp_resources.loaded:
+            start_nlp_warmup()
+        elif NLP_EXECUTOR != "process":  # worker processes keep caches of their own
+            # The first guess loads NLTK; warm the cache as soon as it has
+            loop = asyncio.get_running_loop()
+            nlp_resources.on_load.append(lambda: loop.call_soon_threadsafe(start_nlp_warmup))
+    if not persistence_loop.is_running():
+        persistence_loop.start()
+    if not storage and not config_watcher.is_running():
+        config_watcher.start()
+    if SHARED_STATE and not shard_sync.is_running():
+        shard_sync.start()
+    if not riddle_loop.is_running():
+        riddle_loop.change_interval(time=riddle_post_times())
+        riddle_loop.start()
+    if not SHARD_IDS or 0 in SHARD_IDS:
+        await tree.sync()  # commands are global; one process is enough
     bot.add_view(TicketPanelView())
     bot.add_view(ClaimView())
+    for guild in bot.guilds:
+        if config.guild(guild.id).ticket_display:
+            tickets.refill(guild)
+    if first_ready:
+        startup.mark("ready")
+        startup.finished = True
+        print(f"⏱️ Startup: {startup.report()}")
     print(f"✅ Logged in as {bot.user}")
 
 # Run bot
 if __name__ == "__main__":
-    if not TOKEN:
+    if "--migrate" in sys.argv:
+        migrated = (storage or SQLiteStorage(SQLITE_PATH)).migrate_json_files(force=True)
+        print(f"✅ Imported JSON files into {SQLITE_PATH}" if migrated else "⚠️ Nothing migrated")
+    elif not TOKEN:
         print("❌ DISCORD_TOKEN not set.")
     else:
         print("✅ Starting bot...")
-        bot.run(TOKEN)
+        if METRICS_HTTP and METRICS_ENABLED:
+            metrics.serve_http(PORT)
+            print(f"📈 Metrics at http://127.0.0.1:{PORT}/metrics")
+        try:
+            bot.run(TOKEN)
+        finally:
+            nlp_pool.shutdown()
+            persistence.flush_sync()
+            print(f"💾 Saved pending data: {persistence.stats()}")
@@ -0,0 +1,55 @@
+# Runs bot.py as several processes, each connecting its own group of gateway
+# shards, all sharing one SQLite database (SQLITE_PATH). A process that dies
+# is started again; Ctrl+C stops them all and lets each save its pending data.
+# Usage: python launcher.py --shards 4 --processes 2
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+BOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+RESTART_DELAY = 5  # seconds before a crashed process is started again
+
+def shard_groups(shards, processes):
+    return [list(range(shards))[i * shards // processes:(i + 1) * shards // processes] for i in range(processes)]
+
+def start(index, shards, group):
+    env = dict(os.environ, SHARD_COUNT=str(shards), SHARD_IDS=",".join(map(str, group)), STORAGE_BACKEND="sqlite",
+               PORT=str(int(os.getenv("PORT", 4000)) + index))
+    print(f"🚀 Starting shards {group[0]}-{group[-1]} of {shards}")
+    # Own session, so Ctrl+C reaches only the launcher, which passes it on once
+    return subprocess.Popen([sys.executable, BOT], env=env, start_new_session=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as several shard processes")
+    parser.add_argument("--shards", type=int, required=True, help="total gateway shards")
+    parser.add_argument("--processes", type=int, default=None, help="processes to spread them over (default: one per shard)")
+    args = parser.parse_args()
+    processes = args.processes or args.shards
+    if not 0 < processes <= args.shards:
+        parser.error("--processes must be between 1 and --shards")
+
+    groups = shard_groups(args.shards, processes)
+    children = [start(i, args.shards, group) for i, group in enumerate(groups)]
+    try:
+        while True:
+            time.sleep(1)
+            for i, child in enumerate(children):
+                if child.poll() is not None:
+                    print(f"⚠️ Shards {groups[i][0]}-{groups[i][-1]} exited with code {child.returncode}; "
+                          f"restarting in {RESTART_DELAY} s")
+                    time.sleep(RESTART_DELAY)
+                    children[i] = start(i, args.shards, groups[i])
+    except KeyboardInterrupt:
+        print("🛑 Stopping shard processes...")
+    finally:
+        for child in children:
+            if child.poll() is None:
+                child.send_signal(signal.SIGINT)
+        for child in children:
+            child.wait()
+
+if __name__ == "__main__":
+    main()